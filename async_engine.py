@@ -0,0 +1,139 @@
+"""
+Asyncio facade over the RAG stack
+Embedding, FAISS search and generation run on dedicated executors so an
+async web stack never blocks its event loop:
+
+    engine = AsyncRAGEngine.from_registry()
+    results = await engine.search("What is the inflation rate?")
+    answer = await engine.answer("What is Qatar's GDP growth rate?", timeout=10)
+    answers = await engine.answer_many(questions)
+
+Searches run on a thread pool (FAISS and torch release the GIL), or on a
+pool of processes that each load their own copy of the index with
+search_executor='process'. Generation runs on its own thread pool.
+Semaphores bound how many searches and answers are in flight.
+
+Cancellation: a cancelled call that has not started never runs, and an
+answer cancelled during retrieval skips generation. A running generation
+cannot be interrupted, so `timeout` is also passed down as the generation
+deadline and decoding stops close to it.
+"""
+
+import asyncio
+import functools
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+_process_store = None
+
+def _init_search_process(filepath, model_name, options):
+    global _process_store
+    from vector_store import VectorStore
+
+    _process_store = VectorStore(model_name=model_name, **options)
+    _process_store.load(filepath)
+    _process_store.vectorstore
+
+def _process_search(query, k):
+    return _process_store.search(query, k=k), _process_store.version
+
+class AsyncRAGEngine:
+    def __init__(self, index, answerer, search_workers=2, answer_workers=1,
+                 max_concurrent_searches=8, max_concurrent_answers=4,
+                 search_executor='thread', index_path=None, model_name=None, index_options=None):
+        # index is anything with .current (an index_versions.IndexReloader)
+        self.index = index
+        self.answerer = answerer
+        self.max_concurrent_searches = max_concurrent_searches
+        self.max_concurrent_answers = max_concurrent_answers
+
+        if search_executor == 'process':
+            import multiprocessing
+
+            # worker processes serve the index at index_path as of their
+            # start; they do not follow hot reloads
+            self._search_pool = ProcessPoolExecutor(
+                search_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_search_process,
+                initargs=(index_path, model_name, index_options or {})
+            )
+        elif search_executor == 'thread':
+            self._search_pool = ThreadPoolExecutor(search_workers, thread_name_prefix='rag-search')
+        else:
+            raise ValueError(f"Unknown search executor '{search_executor}', expected 'thread' or 'process'")
+        self.search_executor = search_executor
+        self._answer_pool = ThreadPoolExecutor(answer_workers, thread_name_prefix='rag-answer')
+
+        # asyncio primitives belong to a loop, so they are created on first use
+        self._search_slots = None
+        self._answer_slots = None
+
+    @classmethod
+    def from_registry(cls, **kwargs):
+        """Engine over the shared index and answer chain configured in config.py"""
+        import model_registry
+
+        return cls(model_registry.shared_index(), model_registry.shared_answerer(), **kwargs)
+
+    def _slots(self):
+        if self._search_slots is None:
+            self._search_slots = asyncio.Semaphore(self.max_concurrent_searches)
+            self._answer_slots = asyncio.Semaphore(self.max_concurrent_answers)
+        return self._search_slots, self._answer_slots
+
+    def _search_sync(self, query, k):
+        store = self.index.current
+        return store.search(query, k=k), store.version
+
+    async def _search(self, query, k):
+        search_slots, _ = self._slots()
+        loop = asyncio.get_running_loop()
+        if self.search_executor == 'process':
+            call = functools.partial(_process_search, query, k)
+        else:
+            call = functools.partial(self._search_sync, query, k)
+        async with search_slots:
+            return await loop.run_in_executor(self._search_pool, call)
+
+    async def search(self, query, k=5):
+        return (await self._search(query, k))[0]
+
+    async def answer(self, query, k=5, timeout=None):
+        started = time.perf_counter()
+        _, answer_slots = self._slots()
+        loop = asyncio.get_running_loop()
+
+        async def run():
+            results, version = await self._search(query, k)
+            async with answer_slots:
+                deadline_ms = None
+                if timeout is not None:
+                    deadline_ms = max(0.0, timeout - (time.perf_counter() - started)) * 1000
+                call = functools.partial(
+                    self.answerer.generate_answer_with_citations,
+                    query, results, index_version=version, deadline_ms=deadline_ms
+                )
+                return await loop.run_in_executor(self._answer_pool, call)
+
+        return await asyncio.wait_for(run(), timeout)
+
+    async def search_many(self, queries, k=5, return_exceptions=False):
+        return await asyncio.gather(
+            *(self.search(query, k) for query in queries), return_exceptions=return_exceptions
+        )
+
+    async def answer_many(self, queries, k=5, timeout=None, return_exceptions=False):
+        return await asyncio.gather(
+            *(self.answer(query, k, timeout) for query in queries), return_exceptions=return_exceptions
+        )
+
+    def close(self):
+        self._search_pool.shutdown(wait=False, cancel_futures=True)
+        self._answer_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
@@ -0,0 +1,450 @@
+"""
+Benchmark script for the Multi-Modal RAG system
+Each benchmark runs in-process or in fresh interpreters and prints a table
+
+Usage: python benchmark.py <name> [<name> ...]   (see BENCHMARKS below)
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+import config
+
+STARTUP_SNIPPETS = {
+    'import vector_store': "import vector_store",
+    'import llm_qa': "import llm_qa",
+    'evaluation (system stats)': (
+        "import evaluation, config\n"
+        "store = evaluation.VectorStore(model_name=config.EMBEDDING_MODEL)\n"
+        "store.load(config.VECTOR_STORE_PATH)\n"
+        "evaluation.evaluate_system_performance(store)"
+    ),
+    'quick_test (chunk counts)': (
+        "import quick_test, config\n"
+        "store = quick_test.VectorStore(model_name=config.EMBEDDING_MODEL)\n"
+        "store.load(config.VECTOR_STORE_PATH)\n"
+        "sum(1 for c in store.chunks if c['type'] == 'text')"
+    ),
+    'app (sidebar data)': (
+        "from vector_store import VectorStore\n"
+        "from llm_qa import LLMQA\n"
+        "import config\n"
+        "store = VectorStore(model_name=config.EMBEDDING_MODEL)\n"
+        "store.load(config.VECTOR_STORE_PATH)\n"
+        "LLMQA(model_name=config.LLM_MODEL)\n"
+        "len(store.chunks)"
+    ),
+}
+
+# Appended to a snippet to reproduce the old behaviour, where every entry
+# point paid for the embedding model and FAISS index up front.
+EAGER_SUFFIX = (
+    "\nfrom vector_store import VectorStore\n"
+    "import config\n"
+    "_s = VectorStore(model_name=config.EMBEDDING_MODEL)\n"
+    "_s.load(config.VECTOR_STORE_PATH)\n"
+    "_s.vectorstore"
+)
+
+def _time_snippet(snippet, repeats):
+    timings = []
+    for _ in range(repeats):
+        code = (
+            "import time, io, contextlib\n"
+            "_t0 = time.perf_counter()\n"
+            "with contextlib.redirect_stdout(io.StringIO()):\n"
+            + "".join(f"    {line}\n" for line in snippet.splitlines())
+            + "print(time.perf_counter() - _t0)"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=config.BASE_DIR, capture_output=True, text=True
+        )
+        if out.returncode != 0:
+            raise RuntimeError(out.stderr.strip().splitlines()[-1])
+        timings.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+def benchmark_startup(repeats=3):
+    """Cold-start time of each entry point, lazy vs. eager model loading"""
+    print("\n" + "="*70)
+    print("STARTUP BENCHMARK (median of fresh interpreters)")
+    print("="*70)
+    print(f"{'Entry point':<30}{'lazy':>12}{'eager':>12}{'speedup':>10}")
+
+    rows = []
+    for name, snippet in STARTUP_SNIPPETS.items():
+        try:
+            lazy = _time_snippet(snippet, repeats)
+            eager = _time_snippet(snippet + EAGER_SUFFIX, repeats)
+        except RuntimeError as e:
+            print(f"{name:<30}failed: {e}")
+            continue
+        rows.append({'entry_point': name, 'lazy_s': lazy, 'eager_s': eager})
+        print(f"{name:<30}{lazy*1000:>10.0f}ms{eager*1000:>10.0f}ms{eager/lazy:>9.1f}x")
+
+    return rows
+
+def _random_unit_vectors(n, dim, seed=0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim), dtype='float32')
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+def benchmark_sharding(corpus_sizes=(50_000, 200_000, 800_000), shard_counts=(1, 2, 4),
+                       dim=384, n_queries=50, k=5):
+    """Per-query scatter-gather latency as the corpus and shard count grow"""
+    from sharded_index import ShardedIndex
+
+    print("\n" + "="*70)
+    print(f"SHARDING BENCHMARK (synthetic {dim}-d corpus, process transport, k={k})")
+    print("="*70)
+    print(f"{'Corpus':>10}" + "".join(f"{f'{s} shard(s)':>14}" for s in shard_counts))
+
+    queries = _random_unit_vectors(n_queries, dim, seed=1)
+    rows = []
+    for size in corpus_sizes:
+        vectors = _random_unit_vectors(size, dim)
+        line = f"{size:>10,}"
+        for shards in shard_counts:
+            index = ShardedIndex(vectors, num_shards=shards, transport='process')
+            try:
+                index.search(queries[:1], k)  # warm the pipes
+                latencies = []
+                for q in queries:
+                    start = time.perf_counter()
+                    index.search(q, k)
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                index.close()
+            median = statistics.median(latencies)
+            rows.append({'corpus': size, 'shards': shards, 'median_s': median})
+            line += f"{median*1000:>12.2f}ms"
+        print(line)
+
+    return rows
+
+def _query_set():
+    """Our own query set: demo_queries.txt plus the evaluation queries"""
+    import os
+
+    queries = []
+    with open(os.path.join(config.BASE_DIR, 'demo_queries.txt'), 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('---'):
+                break
+            if line and not line.startswith('#'):
+                queries.append(line)
+    queries += [
+        "What is Qatar's GDP growth rate?",
+        "What are the fiscal policy recommendations?",
+        "What is the banking sector situation?",
+        "What are the main economic challenges?",
+        "What is the inflation rate?"
+    ]
+    return list(dict.fromkeys(queries))
+
+def _load_store(**kwargs):
+    from vector_store import VectorStore
+
+    store = VectorStore(model_name=config.EMBEDDING_MODEL, **kwargs)
+    store.load(config.VECTOR_STORE_PATH)
+    return store
+
+def _exact_top_k(corpus, queries, k):
+    import numpy as np
+
+    scores = queries @ corpus.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+def _recall(reference, candidate):
+    return statistics.mean(
+        len(set(ref) & set(cand)) / len(ref) for ref, cand in zip(reference, candidate)
+    )
+
+def benchmark_dims(dims=(32, 48, 64, 96, 128, 192, 256, 384), k=5):
+    """Recall@k of reduced-dimension embeddings against full 384-d search"""
+    import numpy as np
+    from projection import Projection
+
+    store = _load_store()
+    queries = _query_set()
+    corpus = np.asarray(
+        store.embeddings.embed_documents([c['content'] for c in store.chunks]), dtype='float32'
+    )
+    query_vectors = np.asarray(store.embeddings.embed_documents(queries), dtype='float32')
+    reference = _exact_top_k(corpus, query_vectors, k)
+
+    print("\n" + "="*70)
+    print(f"DIMENSIONALITY BENCHMARK ({len(corpus)} chunks, {len(queries)} queries, recall@{k})")
+    print("="*70)
+    print(f"{'Dims':>6}{'PCA':>10}{'Truncate':>10}{'Index size':>14}")
+
+    rows = []
+    for d in dims:
+        row = {'dims': d, 'index_bytes': len(corpus) * d * 4}
+        for method in ('pca', 'truncate'):
+            projection = Projection.fit(corpus, d, method=method)
+            found = _exact_top_k(
+                projection.transform(corpus), projection.transform(query_vectors), k
+            )
+            row[method] = _recall(reference, found)
+        rows.append(row)
+        print(f"{d:>6}{row['pca']:>10.3f}{row['truncate']:>10.3f}{row['index_bytes']/1024:>12.0f}KB")
+
+    return rows
+
+def benchmark_binary(synthetic_size=500_000, dim=384, k=10, candidate_factors=(5, 10, 20, 50)):
+    """Throughput and recall of the binary prefilter against the flat index"""
+    import faiss
+    import numpy as np
+    from binary_index import BinaryIndex
+
+    store = _load_store()
+    queries = _query_set()
+    corpus = store.index_vectors()
+    query_vectors = np.stack([store.embed_query(q) for q in queries])
+    k_real = min(k, len(corpus))
+
+    flat = faiss.IndexFlatL2(corpus.shape[1])
+    flat.add(corpus)
+    _, reference = flat.search(query_vectors, k_real)
+    binary = BinaryIndex(corpus)
+
+    print("\n" + "="*70)
+    print(f"BINARY PREFILTER BENCHMARK (recall@{k_real} on {len(corpus)} chunks, "
+          f"throughput on {synthetic_size:,} synthetic vectors)")
+    print("="*70)
+
+    synthetic = _random_unit_vectors(synthetic_size, dim)
+    synthetic_queries = _random_unit_vectors(50, dim, seed=1)
+    big_flat = faiss.IndexFlatL2(dim)
+    big_flat.add(synthetic)
+    big_binary = BinaryIndex(synthetic)
+
+    def qps(search):
+        start = time.perf_counter()
+        for q in synthetic_queries:
+            search(q)
+        return len(synthetic_queries) / (time.perf_counter() - start)
+
+    flat_qps = qps(lambda q: big_flat.search(q[None], k))
+    print(f"{'Mode':<22}{'Recall':>8}{'QPS':>10}{'Bytes scanned/query':>22}")
+    print(f"{'flat':<22}{1.0:>8.3f}{flat_qps:>10.1f}{synthetic.nbytes:>22,}")
+
+    rows = [{'mode': 'flat', 'recall': 1.0, 'qps': flat_qps}]
+    for factor in candidate_factors:
+        found = [[row for _, row in binary.search(q, k_real, candidates=factor * k_real)]
+                 for q in query_vectors]
+        recall = _recall(reference.tolist(), found)
+        rate = qps(lambda q: big_binary.search(q, k, candidates=factor * k))
+        scanned = big_binary.code_bytes + factor * k * dim * 4
+        rows.append({'mode': f'binary x{factor}', 'recall': recall, 'qps': rate})
+        print(f"{f'binary ({factor * k} cand.)':<22}{recall:>8.3f}{rate:>10.1f}{scanned:>22,}")
+
+    return rows
+
+def _answer_prompts(qa, store, k=5):
+    prompts = []
+    for query in _query_set():
+        chunks = [r['chunk'] for r in store.search(query, k=k)]
+        prompts.append(qa.build_prompt(query, chunks)[0])
+    return prompts
+
+def benchmark_batching(batch_sizes=(1, 4, 8), concurrency=8, rounds=2, max_wait_ms=20):
+    """LLM throughput and latency under concurrent load, per max batch size"""
+    from concurrent.futures import ThreadPoolExecutor
+    from llm_qa import LLMQA
+    from micro_batcher import MicroBatcher
+
+    store = _load_store()
+    qa = LLMQA(model_name=config.LLM_MODEL, lazy=False)
+    prompts = _answer_prompts(qa, store) * rounds
+
+    print("\n" + "="*70)
+    print(f"MICRO-BATCHING BENCHMARK ({len(prompts)} requests, {concurrency} concurrent callers)")
+    print("="*70)
+    print(f"{'Max batch':>10}{'Mean batch':>12}{'Req/s':>9}{'p50':>10}{'p95':>10}")
+
+    rows = []
+    for size in batch_sizes:
+        batcher = MicroBatcher(qa._generate_batch, max_batch_size=size, max_wait_ms=max_wait_ms)
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(batcher.run, prompts))
+            stats = batcher.metrics.snapshot()
+        finally:
+            batcher.close()
+        rows.append({'max_batch_size': size, **stats})
+        print(f"{size:>10}{stats['mean_batch_size']:>12.2f}{stats['throughput_rps']:>9.2f}"
+              f"{stats['latency_p50_ms']:>8.0f}ms{stats['latency_p95_ms']:>8.0f}ms")
+
+    return rows
+
+def _token_f1(prediction, reference):
+    pred, ref = prediction.lower().split(), reference.lower().split()
+    common = sum(min(pred.count(t), ref.count(t)) for t in set(pred))
+    if not pred or not ref or common == 0:
+        return float(pred == ref)
+    precision, recall = common / len(pred), common / len(ref)
+    return 2 * precision * recall / (precision + recall)
+
+def benchmark_backends(backends=('torch', 'torch-int8', 'onnx')):
+    """Answer latency and agreement with the float32 baseline, per backend"""
+    from llm_qa import LLMQA
+
+    store = _load_store()
+    queries = _query_set()
+    contexts = [[r['chunk'] for r in store.search(q, k=5)] for q in queries]
+    model_dirs = {'onnx': config.LLM_ONNX_DIR}
+
+    print("\n" + "="*70)
+    print(f"GENERATION BACKEND BENCHMARK ({len(queries)} queries, baseline: torch float32)")
+    print("="*70)
+    print(f"{'Backend':<12}{'Load':>8}{'p50':>10}{'p95':>10}{'Exact':>8}{'Token F1':>10}")
+
+    baseline = None
+    rows = []
+    for name in backends:
+        try:
+            start = time.perf_counter()
+            qa = LLMQA(model_name=config.LLM_MODEL, backend=name,
+                       model_dir=model_dirs.get(name), lazy=False)
+            load_time = time.perf_counter() - start
+        except Exception as e:
+            print(f"{name:<12}unavailable: {e}")
+            continue
+
+        qa.generate_answer(queries[0], contexts[0])  # warm-up
+        answers, latencies = [], []
+        for query, chunks in zip(queries, contexts):
+            start = time.perf_counter()
+            answers.append(qa.generate_answer(query, chunks))
+            latencies.append(time.perf_counter() - start)
+        if baseline is None:
+            baseline = answers
+
+        exact = statistics.mean(a.strip() == b.strip() for a, b in zip(answers, baseline))
+        f1 = statistics.mean(_token_f1(a, b) for a, b in zip(answers, baseline))
+        p50 = statistics.median(latencies)
+        p95 = sorted(latencies)[int(0.95 * (len(latencies) - 1))]
+        rows.append({'backend': name, 'load_s': load_time, 'p50_s': p50, 'p95_s': p95,
+                     'exact_match': exact, 'token_f1': f1})
+        print(f"{name:<12}{load_time:>7.1f}s{p50*1000:>8.0f}ms{p95*1000:>8.0f}ms{exact:>8.2f}{f1:>10.2f}")
+
+    return rows
+
+def benchmark_compression(budgets=(None, 384, 256, 128)):
+    """Input tokens, answer latency and agreement with uncompressed context, per budget"""
+    from context_compressor import ContextCompressor
+    from extractive import SentenceScorer
+    from llm_qa import LLMQA
+
+    store = _load_store()
+    queries = _query_set()
+    contexts = [[r['chunk'] for r in store.search(q, k=5)] for q in queries]
+    scorer = SentenceScorer(store.embeddings)
+    qa = LLMQA(model_name=config.LLM_MODEL, lazy=False)
+
+    print("\n" + "="*70)
+    print(f"CONTEXT COMPRESSION BENCHMARK ({len(queries)} queries, baseline: no compression)")
+    print("="*70)
+    print(f"{'Budget':>8}{'Tokens':>9}{'p50':>10}{'p95':>10}{'Exact':>8}{'Token F1':>10}")
+
+    baseline = None
+    rows = []
+    for budget in budgets:
+        qa.compressor = ContextCompressor(scorer, max_tokens=budget) if budget else None
+        qa.generate_answer(queries[0], contexts[0])  # warm-up
+        answers, latencies, tokens = [], [], []
+        for query, chunks in zip(queries, contexts):
+            start = time.perf_counter()
+            prompt, stats = qa.build_prompt(query, chunks)
+            answers.append(qa._generate(prompt).strip())
+            latencies.append(time.perf_counter() - start)
+            tokens.append(stats['prompt_overhead'] + stats['tokens_used'])
+        if baseline is None:
+            baseline = answers
+
+        exact = statistics.mean(a == b for a, b in zip(answers, baseline))
+        f1 = statistics.mean(_token_f1(a, b) for a, b in zip(answers, baseline))
+        p50 = statistics.median(latencies)
+        p95 = sorted(latencies)[int(0.95 * (len(latencies) - 1))]
+        label = budget or 'off'
+        rows.append({'budget': budget, 'input_tokens': statistics.mean(tokens), 'p50_s': p50,
+                     'p95_s': p95, 'exact_match': exact, 'token_f1': f1})
+        print(f"{label:>8}{statistics.mean(tokens):>9.0f}{p50*1000:>8.0f}ms{p95*1000:>8.0f}ms"
+              f"{exact:>8.2f}{f1:>10.2f}")
+
+    return rows
+
+def benchmark_search_load(concurrency=(1, 4, 16), rounds=5):
+    """Search latency under concurrent callers, unbounded vs through a SearchExecutor"""
+    from concurrent.futures import ThreadPoolExecutor
+    from micro_batcher import percentile
+    from search_executor import SearchExecutor
+
+    store = _load_store()
+    queries = _query_set() * rounds
+    executor = SearchExecutor(queue_timeout=60)
+
+    print("\n" + "="*70)
+    print(f"SEARCH LOAD BENCHMARK ({len(queries)} searches, executor concurrency "
+          f"{executor.max_concurrency} x {executor.faiss_threads} threads)")
+    print("="*70)
+    print(f"{'Callers':>8}{'Mode':>10}{'p50':>10}{'p99':>10}{'Wait p99':>11}")
+
+    rows = []
+    for callers in concurrency:
+        for mode in ('direct', 'executor'):
+            def timed(query):
+                start = time.perf_counter()
+                if mode == 'executor':
+                    executor.search(store, query, 5)
+                else:
+                    store.search(query, k=5)
+                return time.perf_counter() - start
+
+            with ThreadPoolExecutor(max_workers=callers) as pool:
+                latencies = list(pool.map(timed, queries))
+            wait_p99 = executor.stats()['wait_p99_ms'] if mode == 'executor' else 0.0
+            p50, p99 = percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000
+            rows.append({'callers': callers, 'mode': mode, 'p50_ms': p50, 'p99_ms': p99,
+                         'wait_p99_ms': wait_p99})
+            print(f"{callers:>8}{mode:>10}{p50:>8.1f}ms{p99:>8.1f}ms{wait_p99:>9.1f}ms")
+
+    return rows
+
+BENCHMARKS = {
+    'startup': benchmark_startup,
+    'sharding': benchmark_sharding,
+    'dims': benchmark_dims,
+    'binary': benchmark_binary,
+    'batching': benchmark_batching,
+    'backends': benchmark_backends,
+    'compression': benchmark_compression,
+    'search_load': benchmark_search_load,
+}
+
+def main(argv):
+    names = argv or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)}")
+        print(f"Available: {', '.join(BENCHMARKS)}")
+        sys.exit(1)
+
+    results = {}
+    for name in names:
+        start = time.perf_counter()
+        results[name] = BENCHMARKS[name]()
+        print(f"\n[{name}] finished in {time.perf_counter() - start:.1f}s")
+    return results
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
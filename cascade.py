@@ -0,0 +1,126 @@
+"""
+Confidence-gated answer cascade
+Routes each question down the cheapest path that can answer it:
+
+    not_found   best retrieval distance above `max_distance`: answer at once
+    extractive  best retrieved sentence scores at least `min_confidence`
+                against the query: return that sentence
+    llm         otherwise hand the results to the wrapped QA system
+
+Every decision is logged with its latency; metrics() summarizes them per
+route so the thresholds can be tuned.
+"""
+
+import threading
+import time
+from collections import deque
+
+from micro_batcher import percentile
+
+NOT_FOUND_ANSWER = "No relevant information found in the document."
+
+class CascadeQA:
+    def __init__(self, qa, scorer, max_distance=1.5, min_confidence=0.75, verbose=True):
+        self.qa = qa
+        self.scorer = scorer
+        # search scores are squared L2 distances between unit vectors,
+        # so lower is better (cosine similarity = 1 - distance / 2)
+        self.max_distance = max_distance
+        self.min_confidence = min_confidence
+        self.verbose = verbose
+
+        self.decisions = deque(maxlen=1000)
+        self._lock = threading.Lock()
+
+    def _route(self, query, search_results):
+        """Return (route, confidence, extractive answer or None)"""
+        if not search_results or search_results[0]['score'] > self.max_distance:
+            return 'not_found', None, None
+
+        chunks = [result['chunk'] for result in search_results]
+        confidence, index, sentence = self.scorer.best_sentence(query, chunks)
+        if index is not None and confidence >= self.min_confidence:
+            return 'extractive', confidence, (index, sentence)
+        return 'llm', confidence, None
+
+    def _record(self, query, route, search_results, confidence, started):
+        latency = time.perf_counter() - started
+        decision = {
+            'query': query,
+            'route': route,
+            'best_distance': search_results[0]['score'] if search_results else None,
+            'confidence': confidence,
+            'latency': latency,
+        }
+        with self._lock:
+            self.decisions.append(decision)
+        if self.verbose:
+            distance = decision['best_distance']
+            print(f"[cascade] route={route} "
+                  f"distance={'-' if distance is None else f'{distance:.3f}'} "
+                  f"confidence={'-' if confidence is None else f'{confidence:.3f}'} "
+                  f"latency={latency * 1000:.0f}ms")
+
+    def _direct_result(self, route, search_results, answer):
+        if route == 'not_found':
+            return {'answer': NOT_FOUND_ANSWER, 'citations': [], 'context_used': 0, 'route': route}
+
+        index, sentence = answer
+        result = search_results[index]
+        chunk = result['chunk']
+        citations = [{
+            'rank': 1,
+            'source': chunk['source'],
+            'page': chunk['page'],
+            'type': chunk['type'],
+            'relevance_score': result['score']
+        }]
+        return {'answer': sentence, 'citations': citations, 'context_used': 1, 'route': route}
+
+    def generate_answer_with_citations(self, query, search_results, index_version=None, deadline_ms=None):
+        started = time.perf_counter()
+        route, confidence, answer = self._route(query, search_results)
+        if route == 'llm':
+            result = self.qa.generate_answer_with_citations(
+                query, search_results, index_version=index_version, deadline_ms=deadline_ms
+            )
+            result = dict(result, route=route)
+        else:
+            result = self._direct_result(route, search_results, answer)
+        self._record(query, route, search_results, confidence, started)
+        return result
+
+    def stream_answer_with_citations(self, query, search_results, index_version=None, deadline_ms=None):
+        started = time.perf_counter()
+        route, confidence, answer = self._route(query, search_results)
+        if route != 'llm':
+            result = self._direct_result(route, search_results, answer)
+            self._record(query, route, search_results, confidence, started)
+            answer = result.pop('answer')
+            return dict(result, answer_stream=iter([answer]))
+
+        result = self.qa.stream_answer_with_citations(
+            query, search_results, index_version=index_version, deadline_ms=deadline_ms
+        )
+        stream = result.pop('answer_stream')
+
+        def timed():
+            # LLM path latency runs until the last token is streamed
+            yield from stream
+            self._record(query, route, search_results, confidence, started)
+
+        return dict(result, answer_stream=timed(), route=route)
+
+    def metrics(self):
+        with self._lock:
+            decisions = list(self.decisions)
+        routes = {}
+        for route in ('not_found', 'extractive', 'llm'):
+            latencies = [d['latency'] for d in decisions if d['route'] == route]
+            routes[route] = {
+                'count': len(latencies),
+                'share': len(latencies) / len(decisions) if decisions else 0.0,
+                'latency_p50_ms': percentile(latencies, 50) * 1000,
+                'latency_p95_ms': percentile(latencies, 95) * 1000,
+            }
+        return routes
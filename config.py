@@ -15,6 +15,128 @@ VECTOR_STORE_PATH = os.path.join(VECTOR_STORE_DIR, 'faiss_index')
 EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
 LLM_MODEL = 'google/flan-t5-base'
 
+# Number of FAISS shards (each in its own worker process); 1 = single index
+NUM_SHARDS = 1
+
+# 'flat' = exact FAISS search; 'binary' = Hamming prefilter + float re-scoring
+# of BINARY_CANDIDATES rows (None = 10 * k)
+SEARCH_MODE = 'flat'
+BINARY_CANDIDATES = None
+
+# Index snapshots kept under <VECTOR_STORE_PATH>_versions, and how often (in
+# seconds) running apps check the CURRENT pointer for a new one
+INDEX_VERSIONS_TO_KEEP = 3
+INDEX_RELOAD_INTERVAL = 5.0
+
+# Reduce stored embeddings to this many dimensions ('pca' or 'truncate');
+# None keeps all 384. See `python benchmark.py dims` for recall per size.
+EMBEDDING_DIMS = None
+EMBEDDING_PROJECTION = 'pca'
+
+# Concurrent answer generations are grouped into batches of up to
+# LLM_MAX_BATCH_SIZE prompts, waiting at most LLM_MAX_WAIT_MS for a batch
+# to fill; a batch size of 1 disables batching
+LLM_MAX_BATCH_SIZE = 8
+LLM_MAX_WAIT_MS = 20
+
+# flan-t5's input window; retrieved context is packed to fit it
+LLM_MAX_INPUT_TOKENS = 512
+
+# Answer model inference backend: 'torch' (float32), 'torch-int8' (dynamic
+# quantization) or 'onnx' (ONNX Runtime). LLM_MODEL_DIR is a local model
+# directory; 'onnx' needs one and exports into it if it is empty.
+# Compare backends with `python benchmark.py backends` (its ONNX model
+# lives in LLM_ONNX_DIR).
+LLM_BACKEND = 'torch'
+LLM_MODEL_DIR = None
+LLM_ONNX_DIR = os.path.join(DATA_DIR, 'models', 'flan-t5-base-onnx')
+
+# Persistent answer cache (None disables it). Entries expire after
+# ANSWER_CACHE_TTL seconds and are dropped when the index version changes.
+ANSWER_CACHE_PATH = os.path.join(DATA_DIR, 'cache', 'answers.sqlite')
+ANSWER_CACHE_MAX_ENTRIES = 5000
+ANSWER_CACHE_TTL = 7 * 24 * 3600
+
+# Semantic answer cache: paraphrased questions whose query embeddings are at
+# least SEMANTIC_CACHE_THRESHOLD cosine-similar reuse an answer (None
+# disables it). Hits whose retrieved chunks overlap the cached answer's by
+# less than SEMANTIC_CACHE_MIN_OVERLAP are treated as false hits.
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_MAX_ENTRIES = 1000
+SEMANTIC_CACHE_MIN_OVERLAP = 0.5
+
+# Answer cascade in front of the LLM. Questions whose best search distance is
+# above CASCADE_MAX_DISTANCE are answered "not found"; if the best retrieved
+# sentence has cosine similarity >= CASCADE_MIN_CONFIDENCE it is returned as
+# the answer without running flan-t5.
+CASCADE_ENABLED = True
+CASCADE_MAX_DISTANCE = 1.5
+CASCADE_MIN_CONFIDENCE = 0.75
+
+# Query-aware context compression: only the retrieved sentences most similar
+# to the question, up to this many tokens, are sent to the LLM (None disables)
+CONTEXT_COMPRESSION_TOKENS = 256
+
+# Per-request answer latency budget in milliseconds (None = unlimited).
+# Generation length adapts to the time left; when even LLM_MIN_NEW_TOKENS
+# would not fit, the best extractive sentence is returned instead.
+LLM_DEADLINE_MS = 8000
+LLM_MAX_NEW_TOKENS = 512
+LLM_MIN_NEW_TOKENS = 8
+
+# Queries run through encoder, search and generator at start-up (warmup.py)
+WARMUP_QUERIES = [
+    "What is Qatar's GDP growth rate?",
+    "What is the inflation rate?",
+]
+
+# Concurrent searches (search_executor.py): at most SEARCH_MAX_CONCURRENCY
+# run at once (None = half the cores, up to 4), each encoding the query and
+# searching FAISS with cpu_count divided by that many OpenMP threads (or
+# SEARCH_THREADS). Up to SEARCH_MAX_QUEUE more wait SEARCH_QUEUE_TIMEOUT
+# seconds before failing.
+SEARCH_MAX_CONCURRENCY = None
+SEARCH_THREADS = None
+SEARCH_MAX_QUEUE = 64
+SEARCH_QUEUE_TIMEOUT = 5.0
+
+# Local query service (query_service.py). Listens on SERVICE_SOCKET (a Unix
+# socket path) if set, otherwise on SERVICE_HOST:SERVICE_PORT. At most
+# SERVICE_MAX_CONCURRENCY requests run at once; up to SERVICE_MAX_QUEUE more
+# wait SERVICE_QUEUE_TIMEOUT seconds for a slot before getting a 503.
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8765
+SERVICE_SOCKET = None
+SERVICE_MAX_CONCURRENCY = 4
+SERVICE_MAX_QUEUE = 32
+SERVICE_QUEUE_TIMEOUT = 30.0
+
+# Seconds a request coalesced with an identical in-flight one waits for the
+# shared result before computing its own
+SINGLEFLIGHT_WAIT_TIMEOUT = 120.0
+
+# Pipelined ingestion (streaming_ingest.py): extracted chunks wait on a
+# queue of at most INGEST_QUEUE_SIZE and are embedded INGEST_BATCH_SIZE at a
+# time while extraction and OCR of later pages continue
+INGEST_BATCH_SIZE = 64
+INGEST_QUEUE_SIZE = 256
+
+# Pipelined ingestion checkpoints its progress, the extracted/OCR'd pages and
+# the partial index here every INGEST_CHECKPOINT_BATCHES batches, so a rerun
+# after a crash resumes instead of starting from page 1
+INGEST_CHECKPOINT_DIR = os.path.join(PROCESSED_DATA_DIR, 'ingest_checkpoint')
+INGEST_CHECKPOINT_BATCHES = 5
+
+# Watch-folder daemon (watch_ingest.py): PDFs in RAW_DATA_DIR whose size and
+# mtime have been stable for WATCH_DEBOUNCE seconds are ingested into the
+# live index, at most WATCH_WORKERS at a time, checking every
+# WATCH_POLL_INTERVAL seconds; PDFs gone for WATCH_DEBOUNCE seconds are
+# dropped from it. Ingested files are recorded in WATCH_STATE_PATH.
+WATCH_POLL_INTERVAL = 2.0
+WATCH_DEBOUNCE = 5.0
+WATCH_WORKERS = 2
+WATCH_STATE_PATH = os.path.join(PROCESSED_DATA_DIR, 'watch_state.json')
+
 def create_directories():
     directories = [
         DATA_DIR,
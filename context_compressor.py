@@ -0,0 +1,71 @@
+"""
+Query-aware context compression
+Keeps only the sentences of the retrieved chunks that are most similar to
+the query, up to a token budget, before the context is packed for the
+answer model. All sentences are scored in one batched matrix operation by
+extractive.SentenceScorer. Sentence token counts come from the token IDs
+stored per sentence at ingest, and the kept sentences' IDs are carried on
+the compressed chunk, so nothing is tokenized per query for indexed chunks.
+Chunks keep their positions (so citations still line up); a chunk with no
+surviving sentences ends up empty.
+"""
+
+class ContextCompressor:
+    def __init__(self, scorer, max_tokens=256, min_score=None):
+        self.scorer = scorer
+        self.max_tokens = max_tokens
+        # sentences scoring below min_score are dropped even within budget
+        self.min_score = min_score
+
+    def compress(self, query, chunks, count_tokens=None, tokenizer_name=None):
+        """
+        Return (compressed chunks, stats)
+        Sentence costs use the stored `tokenizer_name` token IDs where the
+        index has them and count_tokens(sentence) otherwise.
+        """
+        if count_tokens is None:
+            count_tokens = lambda text: len(text.split())
+
+        scored = self.scorer.score_with_tokens(query, chunks)
+        candidates = []
+        sentence_ids = []
+        for index, (sentences, scores, token_ids) in enumerate(scored):
+            sentence_ids.append(token_ids.get(tokenizer_name))
+            for position, (sentence, score) in enumerate(zip(sentences, scores)):
+                candidates.append((float(score), index, position, sentence))
+        candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+
+        kept = {}
+        used = 0
+        for score, index, position, sentence in candidates:
+            if self.min_score is not None and score < self.min_score:
+                break
+            ids = sentence_ids[index]
+            cost = len(ids[position]) if ids is not None else count_tokens(sentence)
+            if used + cost > self.max_tokens:
+                continue
+            used += cost
+            kept.setdefault(index, []).append((position, sentence))
+
+        compressed = []
+        for index, chunk in enumerate(chunks):
+            positions = sorted(kept.get(index, []))
+            # the chunk's token_ids describe the full text; the kept
+            # sentences' stored IDs replace them when the index has them
+            compressed_chunk = dict(
+                {key: value for key, value in chunk.items() if key != 'token_ids'},
+                content=" ".join(sentence for _, sentence in positions)
+            )
+            ids = sentence_ids[index]
+            if ids is not None:
+                compressed_chunk['token_ids'] = {
+                    tokenizer_name: [token for position, _ in positions for token in ids[position]]
+                }
+            compressed.append(compressed_chunk)
+
+        stats = {
+            'sentences_total': len(candidates),
+            'sentences_kept': sum(len(v) for v in kept.values()),
+            'compressed_tokens': used,
+        }
+        return compressed, stats
@@ -0,0 +1,112 @@
+"""
+Token-budgeted context packing for the answer model
+Fills the model's input window with the highest-value spans of the retrieved
+chunks instead of a fixed number of characters. Chunk token IDs come from
+the index (tokenized at ingest), so chunk text is never re-tokenized per
+query; only the question and the short source headers are.
+
+A span's value is positional only: rank_decay ** (retrieval rank + span
+position in its chunk). The query shapes it through the retrieval order,
+not through the span's own content; query-aware trimming happens earlier,
+in context_compressor.
+"""
+
+import threading
+
+class ContextPacker:
+    def __init__(self, tokenizer, tokenizer_name, max_input_tokens=512, span_tokens=64, rank_decay=0.5,
+                 dedupe_ngram=4, dedupe_threshold=0.8, safety_margin=8):
+        self.tokenizer = tokenizer
+        self.tokenizer_name = tokenizer_name
+        self.max_input_tokens = max_input_tokens
+        self.span_tokens = span_tokens
+        self.rank_decay = rank_decay
+        self.dedupe_ngram = dedupe_ngram
+        self.dedupe_threshold = dedupe_threshold
+        # decoded spans can re-tokenize slightly differently at the seams
+        self.safety_margin = safety_margin
+
+        self._header_cache = {}
+        self._cache_lock = threading.Lock()
+
+    def _count(self, text):
+        return len(self.tokenizer.encode(text, add_special_tokens=True))
+
+    def _header_tokens(self, source):
+        with self._cache_lock:
+            if source not in self._header_cache:
+                self._header_cache[source] = len(
+                    self.tokenizer.encode(f"[Source: {source}]\n", add_special_tokens=False)
+                ) + 2  # "\n\n" separator between sources
+            return self._header_cache[source]
+
+    def chunk_token_ids(self, chunk):
+        token_ids = chunk.get('token_ids', {}).get(self.tokenizer_name)
+        if token_ids is None:
+            token_ids = self.tokenizer.encode(chunk['content'], add_special_tokens=False)
+        return token_ids
+
+    def _shingles(self, token_ids):
+        n = self.dedupe_ngram
+        return {tuple(token_ids[i:i + n]) for i in range(max(1, len(token_ids) - n + 1))}
+
+    def pack(self, prompt_template, query, chunks):
+        """Return (prompt, stats) for `chunks` in retrieval order"""
+        overhead = self._count(prompt_template.format(context="", question=query))
+        budget = max(0, self.max_input_tokens - overhead - self.safety_margin)
+
+        spans = []
+        tokens_available = 0
+        for rank, chunk in enumerate(chunks):
+            token_ids = self.chunk_token_ids(chunk)
+            tokens_available += len(token_ids)
+            for position, start in enumerate(range(0, len(token_ids), self.span_tokens)):
+                value = self.rank_decay ** rank * self.rank_decay ** position
+                spans.append((value, rank, start, token_ids[start:start + self.span_tokens]))
+        spans.sort(key=lambda span: (-span[0], span[1], span[2]))
+
+        selected = {}
+        seen_shingles = set()
+        used = 0
+        duplicate_tokens = 0
+        for value, rank, start, token_ids in spans:
+            shingles = self._shingles(token_ids)
+            if len(shingles & seen_shingles) >= self.dedupe_threshold * len(shingles):
+                duplicate_tokens += len(token_ids)
+                continue
+            cost = len(token_ids)
+            if rank not in selected:
+                cost += self._header_tokens(chunks[rank]['source'])
+            if used + cost > budget:
+                continue
+            used += cost
+            seen_shingles |= shingles
+            selected.setdefault(rank, []).append((start, token_ids))
+
+        sections = []
+        for rank in sorted(selected):
+            # adjacent spans are decoded together: decoding them apart would
+            # put a space into any word or number cut by the seam ("2. 4")
+            runs = []
+            previous_end = None
+            for start, token_ids in sorted(selected[rank]):
+                if start == previous_end:
+                    runs[-1] = runs[-1] + list(token_ids)
+                else:
+                    runs.append(list(token_ids))
+                previous_end = start + len(token_ids)
+            pieces = [self.tokenizer.decode(run, skip_special_tokens=True).strip() for run in runs]
+            sections.append(f"[Source: {chunks[rank]['source']}]\n" + " ... ".join(pieces))
+
+        prompt = prompt_template.format(context="\n\n".join(sections), question=query)
+        context_tokens = sum(len(ids) for chunk_spans in selected.values() for _, ids in chunk_spans)
+        stats = {
+            'budget': budget,
+            'prompt_overhead': overhead,
+            'tokens_available': tokens_available,
+            'tokens_used': context_tokens,
+            'tokens_dropped': tokens_available - context_tokens,
+            'duplicate_tokens': duplicate_tokens,
+            'chunks_used': sorted(selected),
+        }
+        return prompt, stats
@@ -9,52 +9,62 @@ class DocumentProcessor:
         self.pdf_path = pdf_path
         self.doc = fitz.open(pdf_path)
         
+    def page_text_chunks(self, page_num):
+        page = self.doc[page_num]
+        text = page.get_text()
+        
+        if text.strip():
+            return [{
+                'type': 'text',
+                'content': text,
+                'page': page_num + 1,
+                'source': f'Page {page_num + 1}'
+            }]
+        return []
+    
     def extract_text_chunks(self):
         chunks = []
         
         for page_num in range(len(self.doc)):
-            page = self.doc[page_num]
-            text = page.get_text()
-            
-            if text.strip():
-                chunks.append({
-                    'type': 'text',
-                    'content': text,
-                    'page': page_num + 1,
-                    'source': f'Page {page_num + 1}'
-                })
+            chunks.extend(self.page_text_chunks(page_num))
         
         return chunks
     
+    def page_tables(self, page_num):
+        tables = []
+        page = self.doc[page_num]
+        
+        blocks = page.get_text("dict")["blocks"]
+        
+        for block in blocks:
+            if "lines" in block:
+                lines = block["lines"]
+                if len(lines) > 2:
+                    table_text = ""
+                    for line in lines:
+                        for span in line["spans"]:
+                            table_text += span["text"] + " "
+                        table_text += "\n"
+                    
+                    if table_text.strip():
+                        tables.append({
+                            'type': 'table',
+                            'content': table_text,
+                            'page': page_num + 1,
+                            'source': f'Table on Page {page_num + 1}'
+                        })
+        
+        return tables
+    
     def extract_tables(self):
         tables = []
         
         for page_num in range(len(self.doc)):
-            page = self.doc[page_num]
-            
-            blocks = page.get_text("dict")["blocks"]
-            
-            for block in blocks:
-                if "lines" in block:
-                    lines = block["lines"]
-                    if len(lines) > 2:
-                        table_text = ""
-                        for line in lines:
-                            for span in line["spans"]:
-                                table_text += span["text"] + " "
-                            table_text += "\n"
-                        
-                        if table_text.strip():
-                            tables.append({
-                                'type': 'table',
-                                'content': table_text,
-                                'page': page_num + 1,
-                                'source': f'Table on Page {page_num + 1}'
-                            })
+            tables.extend(self.page_tables(page_num))
         
         return tables
     
-    def extract_images_with_ocr(self, output_folder=None):
+    def _images_folder(self, output_folder):
         if output_folder is None:
             try:
                 import config
@@ -64,39 +74,65 @@ class DocumentProcessor:
         
         if not os.path.exists(output_folder):
             os.makedirs(output_folder)
+        return output_folder
+    
+    def page_images_with_ocr(self, page_num, output_folder):
+        images_data = []
+        page = self.doc[page_num]
+        image_list = page.get_images()
+        
+        for img_index, img in enumerate(image_list):
+            xref = img[0]
+            base_image = self.doc.extract_image(xref)
+            image_bytes = base_image["image"]
+          
+            image_filename = f"{output_folder}/page{page_num+1}_img{img_index+1}.png"
+            with open(image_filename, "wb") as image_file:
+                image_file.write(image_bytes)
+          
+            try:
+                img_pil = Image.open(io.BytesIO(image_bytes))
+                ocr_text = pytesseract.image_to_string(img_pil)
+                
+                if ocr_text.strip():
+                    images_data.append({
+                        'type': 'image',
+                        'content': ocr_text,
+                        'page': page_num + 1,
+                        'image_path': image_filename,
+                        'source': f'Image on Page {page_num + 1}'
+                    })
+            except Exception as e:
+                print(f"OCR failed on page {page_num + 1}: {e}")
+        
+        return images_data
+    
+    def extract_images_with_ocr(self, output_folder=None):
+        output_folder = self._images_folder(output_folder)
         
         images_data = []
         
         for page_num in range(len(self.doc)):
-            page = self.doc[page_num]
-            image_list = page.get_images()
-            
-            for img_index, img in enumerate(image_list):
-                xref = img[0]
-                base_image = self.doc.extract_image(xref)
-                image_bytes = base_image["image"]
-              
-                image_filename = f"{output_folder}/page{page_num+1}_img{img_index+1}.png"
-                with open(image_filename, "wb") as image_file:
-                    image_file.write(image_bytes)
-              
-                try:
-                    img_pil = Image.open(io.BytesIO(image_bytes))
-                    ocr_text = pytesseract.image_to_string(img_pil)
-                    
-                    if ocr_text.strip():
-                        images_data.append({
-                            'type': 'image',
-                            'content': ocr_text,
-                            'page': page_num + 1,
-                            'image_path': image_filename,
-                            'source': f'Image on Page {page_num + 1}'
-                        })
-                except Exception as e:
-                    print(f"OCR failed on page {page_num + 1}: {e}")
+            images_data.extend(self.page_images_with_ocr(page_num, output_folder))
         
         return images_data
     
+    def page_chunks(self, page_num, output_folder=None):
+        output_folder = self._images_folder(output_folder)
+        return (self.page_text_chunks(page_num)
+                + self.page_tables(page_num)
+                + self.page_images_with_ocr(page_num, output_folder))
+    
+    def iter_chunks(self, output_folder=None, start_page=0):
+        """
+        Yield chunks page by page (text, then tables, then OCR'd images), so
+        a consumer can embed early pages while later ones are extracted
+        """
+        output_folder = self._images_folder(output_folder)
+        
+        for page_num in range(start_page, len(self.doc)):
+            yield from self.page_chunks(page_num, output_folder)
+    
     def process_document(self):
         print(f"Processing document: {self.pdf_path}")
         
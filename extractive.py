@@ -0,0 +1,145 @@
+"""
+Sentence-level extractive scoring over retrieved chunks
+Chunks are split into sentences and all sentences are scored against the
+query with a single matrix-vector product. Sentence embeddings normally come
+from the index (VectorStore.index_sentences, computed at ingest); chunks
+without them are embedded here in one batched call and kept, keyed by chunk
+text. Used by CascadeQA for its fast path and by the context compressor.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+_PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n\s*')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"(\[])')
+# a period after these does not end a sentence ("Ms. Ament", "Fig. 3")
+_ABBREVIATIONS = {
+    'mr', 'mrs', 'ms', 'mmes', 'messrs', 'dr', 'prof', 'sr', 'jr', 'st', 'no', 'vs', 'fig', 'eq',
+    'e.g', 'i.e', 'etc', 'approx', 'dept', 'est', 'jan', 'feb', 'mar', 'apr',
+    'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+}
+
+def _ends_with_abbreviation(piece):
+    word = piece.rsplit(None, 1)[-1].rstrip('.').lower()
+    return word in _ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+def split_sentences(text, min_chars=20):
+    # PyMuPDF ends every visual line with a newline, so lines are joined and
+    # only blank lines or sentence punctuation end a sentence
+    sentences = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        pending = ""
+        for piece in _SENTENCE_END.split(" ".join(paragraph.split())):
+            if not piece:
+                continue
+            pending = f"{pending} {piece}" if pending else piece
+            if not _ends_with_abbreviation(pending):
+                sentences.append(pending)
+                pending = ""
+        if pending:
+            sentences.append(pending)
+    kept = [s for s in sentences if len(s) >= min_chars]
+    return kept or ([text.strip()] if text.strip() else [])
+
+class SentenceScorer:
+    def __init__(self, embeddings, max_cached_chunks=2000, lookup=None):
+        # `embeddings` is a LangChain embeddings object, or a callable
+        # returning one so the model only loads when first needed
+        self._embeddings = embeddings
+        # lookup(chunk) returns the ingest-time (sentences, vectors,
+        # token_ids) of a chunk (VectorStore.sentence_entry) or None
+        self.lookup = lookup
+        self.max_cached_chunks = max_cached_chunks
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        if hasattr(self._embeddings, 'embed_query'):
+            return self._embeddings
+        return self._embeddings()
+
+    def _embed(self, sentences):
+        import numpy as np
+
+        if not sentences:
+            return None
+        return np.asarray(self.embeddings.embed_documents(sentences), dtype='float32')
+
+    def _sentence_vectors(self, chunks):
+        stored = [self.lookup(chunk) if self.lookup is not None else None for chunk in chunks]
+        texts = [chunk['content'] for chunk, entry in zip(chunks, stored) if entry is None]
+        if not texts:
+            return stored
+        with self._lock:
+            missing = [text for text in dict.fromkeys(texts) if text not in self._cache]
+
+        if missing:
+            split = [split_sentences(text) for text in missing]
+            flat = [sentence for sentences in split for sentence in sentences]
+            vectors = self._embed(flat)
+            start = 0
+            with self._lock:
+                for text, sentences in zip(missing, split):
+                    # chunks without sentences have no vectors (vectors is
+                    # None when no chunk had any)
+                    chunk_vectors = vectors[start:start + len(sentences)] if sentences else None
+                    self._cache[text] = (sentences, chunk_vectors, {})
+                    start += len(sentences)
+                while len(self._cache) > self.max_cached_chunks:
+                    self._cache.popitem(last=False)
+
+        with self._lock:
+            entries = []
+            for chunk, entry in zip(chunks, stored):
+                if entry is None:
+                    text = chunk['content']
+                    # a concurrent call may have evicted it in between
+                    entry = self._cache.get(text)
+                    if entry is None:
+                        sentences = split_sentences(text)
+                        entry = (sentences, self._embed(sentences), {})
+                    else:
+                        self._cache.move_to_end(text)
+                entries.append(entry)
+        return entries
+
+    def score(self, query, chunks):
+        """
+        Return one (sentences, scores) pair per chunk, where scores are the
+        cosine similarities of each sentence to `query`
+        """
+        return [(sentences, scores) for sentences, scores, _ in self.score_with_tokens(query, chunks)]
+
+    def score_with_tokens(self, query, chunks):
+        """
+        Like score(), plus the ingest-time {tokenizer: [ids per sentence]} of
+        each chunk (empty for chunks split here)
+        """
+        import numpy as np
+
+        if not chunks:
+            return []
+        entries = self._sentence_vectors(chunks)
+        if not any(sentences for sentences, _, _ in entries):
+            return [([], np.zeros(0, dtype='float32'), {}) for _ in entries]
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype='float32')
+        matrix = np.concatenate([vectors for sentences, vectors, _ in entries if sentences])
+        scores = matrix @ query_vector
+
+        results = []
+        start = 0
+        for sentences, _, token_ids in entries:
+            results.append((sentences, scores[start:start + len(sentences)], token_ids))
+            start += len(sentences)
+        return results
+
+    def best_sentence(self, query, chunks):
+        """Return (score, chunk index, sentence) for the best-matching sentence"""
+        best = (float('-inf'), None, None)
+        for index, (sentences, scores) in enumerate(self.score(query, chunks)):
+            if len(scores) and float(scores.max()) > best[0]:
+                top = int(scores.argmax())
+                best = (float(scores[top]), index, sentences[top])
+        return best
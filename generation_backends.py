@@ -0,0 +1,110 @@
+"""
+Pluggable inference backends for the flan-t5 answer model
+
+    torch       float32 transformers model (the original behaviour)
+    torch-int8  same model with Linear layers dynamically quantized to int8 (CPU)
+    onnx        ONNX Runtime encoder/decoder exported with optimum; decoding
+                reuses cached decoder key/values (decoder_with_past)
+
+Every backend exposes `tokenizer`, `model` (anything with .generate), `device`
+and `pipeline(**kwargs)`, so LLMQA does not care which one it runs on.
+Export an ONNX model directory once with:
+
+    python generation_backends.py export <model_dir> [--model <name>]
+"""
+
+import os
+
+class TorchBackend:
+    name = 'torch'
+
+    def __init__(self, model_name, model_dir=None):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+        source = model_dir or model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(source)
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(source)
+        self.device = 0 if torch.cuda.is_available() else -1
+
+    @property
+    def device_name(self):
+        return 'GPU' if self.device == 0 else 'CPU'
+
+    def pipeline(self, **kwargs):
+        from transformers import pipeline
+
+        return pipeline(
+            "text2text-generation",
+            model=self.model,
+            tokenizer=self.tokenizer,
+            device=self.device,
+            framework='pt',
+            **kwargs
+        )
+
+class Int8Backend(TorchBackend):
+    name = 'torch-int8'
+
+    def __init__(self, model_name, model_dir=None):
+        import torch
+
+        super().__init__(model_name, model_dir)
+        # dynamic quantization only has CPU kernels
+        self.device = -1
+        self.model = torch.quantization.quantize_dynamic(
+            self.model.eval(), {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+class OnnxBackend(TorchBackend):
+    name = 'onnx'
+
+    def __init__(self, model_name, model_dir=None):
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError as e:
+            raise ImportError("The onnx backend needs: pip install optimum[onnxruntime]") from e
+        from transformers import AutoTokenizer
+
+        if model_dir is None:
+            raise ValueError("The onnx backend loads from a local model directory (model_dir)")
+        if not os.path.exists(os.path.join(model_dir, 'encoder_model.onnx')):
+            print(f"No ONNX export in {model_dir}, exporting {model_name}...")
+            export_onnx(model_name, model_dir)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = ORTModelForSeq2SeqLM.from_pretrained(model_dir, use_cache=True)
+        self.device = -1
+
+BACKENDS = {
+    backend.name: backend for backend in (TorchBackend, Int8Backend, OnnxBackend)
+}
+
+def load_backend(name, model_name, model_dir=None):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown generation backend '{name}', expected one of {list(BACKENDS)}")
+    return BACKENDS[name](model_name, model_dir)
+
+def export_onnx(model_name, model_dir):
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer
+
+    os.makedirs(model_dir, exist_ok=True)
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True, use_cache=True)
+    model.save_pretrained(model_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+    print(f"Exported {model_name} to {model_dir}")
+
+if __name__ == "__main__":
+    import argparse
+    import config
+
+    parser = argparse.ArgumentParser(description="Generation backend utilities")
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export', help="export an ONNX encoder/decoder model directory")
+    export.add_argument('model_dir')
+    export.add_argument('--model', default=config.LLM_MODEL)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export_onnx(args.model, args.model_dir)
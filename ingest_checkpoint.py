@@ -0,0 +1,181 @@
+"""
+Checkpointed, resumable pipelined ingestion
+Wraps streaming_ingest so that a crash part-way through a large PDF only
+loses the work done since the last checkpoint. The checkpoint directory
+holds:
+
+    pages.jsonl   chunks of every extracted page (text, tables and OCR
+                  output), appended as pages finish so no page is OCR'd twice
+    index/        the partial vector store, published as a versioned
+                  snapshot (index_versions) so it is never half-written
+    state.json    the PDF and embedding model the checkpoint belongs to, and
+                  the first page not yet fully indexed
+
+On resume the partial index is loaded and pages before the recorded one are
+skipped. Cached pages are replayed without re-extraction, and chunks whose
+key (page, position on the page and content) is already in the index are
+dropped, so work overlapping the checkpoint
+never duplicates a chunk. A checkpoint for a different PDF or model is
+discarded.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import index_versions
+
+def chunk_key(chunk, position):
+    """
+    Stable identity of an extracted chunk, independent of its chunk_id
+    `position` is the chunk's index among its page's chunks, so identical
+    chunks on one page (e.g. a repeated caption) stay distinct.
+    """
+    digest = hashlib.sha1()
+    for value in (chunk.get('page'), position, chunk.get('type'), chunk.get('source'),
+                  chunk.get('content')):
+        digest.update(str(value).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def page_positions(chunks):
+    """Yield (position within its page, chunk) for chunks in extraction order"""
+    counts = {}
+    for chunk in chunks:
+        position = counts.get(chunk.get('page'), 0)
+        counts[chunk.get('page')] = position + 1
+        yield position, chunk
+
+def file_fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_json(path, payload):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.state.')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class IngestCheckpoint:
+    def __init__(self, directory):
+        self.directory = directory
+        self.state_path = os.path.join(directory, 'state.json')
+        self.pages_path = os.path.join(directory, 'pages.jsonl')
+        self.index_path = os.path.join(directory, 'index', 'faiss_index')
+
+    def load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def matches(self, identity):
+        state = self.load_state()
+        return state is not None and state.get('identity') == identity
+
+    def reset(self, identity):
+        self.clear()
+        os.makedirs(self.directory)
+        _write_json(self.state_path, {'identity': identity, 'next_page': 0, 'chunks': 0})
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def cached_pages(self):
+        pages = {}
+        try:
+            with open(self.pages_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a line torn by a crash; that page is extracted again
+                        continue
+                    pages[entry['page']] = entry['chunks']
+        except FileNotFoundError:
+            pass
+        return pages
+
+    def record_page(self, page_num, chunks):
+        line = json.dumps({'page': page_num, 'chunks': chunks}, ensure_ascii=False)
+        with open(self.pages_path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    def save(self, store, identity, next_page):
+        # index first: a state file never points past the saved index
+        store.save(self.index_path, keep=1)
+        _write_json(self.state_path, {
+            'identity': identity,
+            'next_page': next_page,
+            'chunks': len(store.chunks),
+            'index_version': store.version,
+        })
+        print(f"Checkpoint: {len(store.chunks)} chunks, resume at page {next_page + 1}")
+
+def resumable_ingest(pdf_path, store, checkpoint_dir, batch_size=64, queue_size=256,
+                     checkpoint_every=5, resume=True):
+    """
+    Pipelined ingestion of `pdf_path` into the empty `store`, checkpointing
+    to `checkpoint_dir` and resuming from it when it matches
+    Returns the checkpoint and all of the store's chunks. Call
+    checkpoint.clear() once the finished index has been published.
+    """
+    from document_processor import DocumentProcessor
+    from streaming_ingest import StreamingIngest
+
+    checkpoint = IngestCheckpoint(checkpoint_dir)
+    identity = {'pdf': file_fingerprint(pdf_path), 'embedding_model': store.model_name}
+    start_page = 0
+    if resume and checkpoint.matches(identity):
+        if index_versions.index_exists(checkpoint.index_path):
+            store.load(checkpoint.index_path)
+            start_page = checkpoint.load_state()['next_page']
+        print(f"Resuming from page {start_page + 1} with {len(store.chunks)} chunks already indexed")
+    else:
+        checkpoint.reset(identity)
+
+    # the index holds each page's chunks in extraction order (a prefix of
+    # the page for the page being indexed at the crash), so counting them
+    # per page recovers their positions
+    indexed = {chunk_key(chunk, position) for position, chunk in page_positions(store.chunks)}
+    cached = checkpoint.cached_pages()
+    processor = DocumentProcessor(pdf_path)
+
+    def chunks():
+        for page_num in range(start_page, len(processor.doc)):
+            page = cached.get(page_num)
+            if page is None:
+                page = processor.page_chunks(page_num)
+                checkpoint.record_page(page_num, page)
+            for position, chunk in enumerate(page):
+                key = chunk_key(chunk, position)
+                if key not in indexed:
+                    indexed.add(key)
+                    yield chunk
+
+    batches = 0
+
+    def on_batch(batch):
+        nonlocal batches
+        batches += 1
+        if batches % checkpoint_every == 0:
+            # chunks arrive in page order, so every page before the last
+            # chunk's page is fully indexed
+            checkpoint.save(store, identity, next_page=batch[-1]['page'] - 1)
+
+    streaming = StreamingIngest(store, batch_size=batch_size, queue_size=queue_size)
+    try:
+        streaming.run(chunks(), on_batch=on_batch)
+    finally:
+        processor.close()
+    streaming.print_report()
+    return checkpoint, store.chunks
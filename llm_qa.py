@@ -1,30 +1,168 @@
-from langchain_huggingface import HuggingFacePipeline
-from langchain_community.llms import HuggingFacePipeline
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline
-import torch
+import threading
+import time
+from collections import deque
+
+from micro_batcher import percentile
+
+# torch, transformers and langchain are imported when the model is first
+# needed, so SimpleQA users and `import llm_qa` stay lightweight.
+
+ERROR_ANSWER = "Sorry, I encountered an error generating the answer."
+
+class DeadlineMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.met = 0
+        self.overruns = 0
+        self.limited = 0
+        self.fallbacks = 0
+        self.overrun_ms = deque(maxlen=1000)
+
+    def record(self, deadline, limited=False, fallback=False):
+        late = time.perf_counter() - deadline
+        with self._lock:
+            self.requests += 1
+            self.limited += limited
+            self.fallbacks += fallback
+            if late > 0:
+                self.overruns += 1
+                self.overrun_ms.append(late * 1000)
+            else:
+                self.met += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'met': self.met,
+                'overruns': self.overruns,
+                'limited': self.limited,
+                'fallbacks': self.fallbacks,
+                'overrun_p95_ms': percentile(list(self.overrun_ms), 95),
+            }
+
+class DecodeSpeed:
+    """
+    Generation time modelled as fixed + per_token * output tokens, fitted by
+    least squares over recent calls. The fixed part (encoder pass, call
+    overhead) does not grow with the answer, so folding it into a per-token
+    rate would overestimate the cost of long answers after short ones.
+    """
+
+    def __init__(self, window=50):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self.fixed_seconds = None
+        self.seconds_per_token = None
+
+    def record(self, seconds, tokens):
+        with self._lock:
+            self._samples.append((max(1, tokens), seconds))
+            n = len(self._samples)
+            mean_tokens = sum(t for t, _ in self._samples) / n
+            mean_seconds = sum(s for _, s in self._samples) / n
+            spread = sum((t - mean_tokens) ** 2 for t, _ in self._samples)
+            slope = None
+            if n >= 3 and spread > 0:
+                slope = sum((t - mean_tokens) * (s - mean_seconds) for t, s in self._samples) / spread
+            if slope is None or slope <= 0:
+                # answer lengths too few or too alike to separate the two
+                # costs yet; charging everything per token is the safe side
+                self.fixed_seconds = 0.0
+                self.seconds_per_token = mean_seconds / mean_tokens
+            else:
+                self.seconds_per_token = slope
+                self.fixed_seconds = max(0.0, mean_seconds - slope * mean_tokens)
+
+    def tokens_within(self, seconds):
+        """Output tokens that fit in `seconds`, or None before any call was timed"""
+        with self._lock:
+            if self.seconds_per_token is None:
+                return None
+            return int(max(0.0, seconds - self.fixed_seconds) / self.seconds_per_token)
+
+    def typical_tokens(self, pct=95):
+        """`pct` percentile of recent answer lengths, or None without samples"""
+        with self._lock:
+            if not self._samples:
+                return None
+            return percentile([t for t, _ in self._samples], pct)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'samples': len(self._samples),
+                'fixed_seconds': self.fixed_seconds,
+                'seconds_per_token': self.seconds_per_token,
+            }
 
 class LLMQA:
-    def __init__(self, model_name='google/flan-t5-base'):
-        print(f"Loading LLM model via LangChain: {model_name}")
-        
-        device = 0 if torch.cuda.is_available() else -1
-        device_name = 'GPU' if device == 0 else 'CPU'
-        
-        try:
-            tokenizer = AutoTokenizer.from_pretrained(model_name)
-            model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-            
-            pipe = pipeline(
-                "text2text-generation",
-                model=model,
-                tokenizer=tokenizer,
-                max_length=512,
-                device=device,
-                temperature=0.7
+    def __init__(self, model_name='google/flan-t5-base', lazy=True,
+                 max_batch_size=1, max_wait_ms=20,
+                 max_input_tokens=512, max_context_chunks=5,
+                 backend='torch', model_dir=None, answer_cache=None,
+                 compressor=None, deadline_ms=None, max_new_tokens=512,
+                 min_new_tokens=8, extractive_scorer=None):
+        self.model_name = model_name
+        self._llm = None
+        self._load_lock = threading.Lock()
+
+        # optional answer_cache.AnswerCache consulted by the *_with_citations
+        # methods before retrieval results are sent to the model
+        self.answer_cache = answer_cache
+
+        # inference backend from generation_backends ('torch', 'torch-int8',
+        # 'onnx'); model_dir points at a local copy / ONNX export
+        self.backend = backend
+        self.model_dir = model_dir
+
+        # the context is packed to the model's input limit with the
+        # tokenizer (see context_packer) rather than cut by characters
+        self.max_input_tokens = max_input_tokens
+        self.max_context_chunks = max_context_chunks
+        # optional context_compressor.ContextCompressor that keeps only the
+        # query-relevant sentences of each chunk before packing
+        self.compressor = compressor
+        self.tokenizer = None
+        self.packer = None
+
+        # per-request latency budget (overridable per call). With a deadline
+        # max_new_tokens is cut to what fits the time left, estimated from
+        # the fixed and per-token cost of recent generations (DecodeSpeed),
+        # and generation stops at the deadline (max_time). If not even
+        # min_new_tokens fit, the best extractive sentence
+        # (extractive_scorer) is returned instead. Answers a limit actually
+        # cut short are not cached.
+        self.deadline_ms = deadline_ms
+        self.max_new_tokens = max_new_tokens
+        self.min_new_tokens = min_new_tokens
+        self.extractive_scorer = extractive_scorer
+        self.decode_speed = DecodeSpeed()
+        self.deadline_metrics = DeadlineMetrics()
+        # time-to-first-token of streamed answers, in seconds
+        self.ttft = deque(maxlen=1000)
+
+        # max_batch_size > 1 routes generations through a MicroBatcher so
+        # concurrent requests share one batched generate call. Streamed
+        # answers (stream_answer_with_citations, used by app.py) are not
+        # batched: a streamer follows a single sequence, so each stream runs
+        # its own generate call, and at most max_batch_size of those decode
+        # at once (_stream_slots) so concurrent sessions do not oversubscribe
+        # the CPU.
+        self._stream_slots = threading.BoundedSemaphore(max(1, max_batch_size))
+        self.batcher = None
+        if max_batch_size > 1:
+            from micro_batcher import MicroBatcher
+
+            self.batcher = MicroBatcher(
+                self._generate_requests,
+                max_batch_size=max_batch_size,
+                max_wait_ms=max_wait_ms,
+                name='llm-batcher'
             )
-            self.llm = HuggingFacePipeline(pipeline=pipe)
-        
-            self.prompt_template = """Based on the following context, answer the question. If the answer is not in the context, say "I cannot find this information in the document."
+
+        self.prompt_template = """Based on the following context, answer the question. If the answer is not in the context, say "I cannot find this information in the document."
 
 Context:
 {context}
@@ -32,6 +170,49 @@ Context:
 Question: {question}
 
 Answer:"""
+
+        if not lazy:
+            self.load()
+
+    @property
+    def is_loaded(self):
+        return self._llm is not None
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            self.load()
+        return self._llm
+
+    def load(self):
+        # instances may be shared across sessions (model_registry), so only
+        # the first concurrent caller actually loads the model
+        with self._load_lock:
+            if self._llm is None:
+                self._load()
+        return self
+
+    def _load(self):
+        from langchain_community.llms import HuggingFacePipeline
+        from context_packer import ContextPacker
+        from generation_backends import load_backend
+
+        print(f"Loading LLM model via LangChain: {self.model_name} ({self.backend} backend)")
+        
+        try:
+            backend = load_backend(self.backend, self.model_name, self.model_dir)
+            device_name = backend.device_name
+            tokenizer = backend.tokenizer
+            
+            pipe = backend.pipeline(
+                max_length=512,
+                temperature=0.7
+            )
+            self.tokenizer = tokenizer
+            self.packer = ContextPacker(
+                tokenizer, self.model_name, max_input_tokens=self.max_input_tokens
+            )
+            self._llm = HuggingFacePipeline(pipeline=pipe)
             
             print(f"LangChain LLM loaded on {device_name}")
             
@@ -39,35 +220,313 @@ Answer:"""
             print(f"Error loading model: {e}")
             raise
     
-    def generate_answer(self, query, context_chunks):
-        context_text = "\n\n".join([
-            f"[Source: {chunk['source']}]\n{chunk['content'][:500]}"
-            for chunk in context_chunks[:3]
-        ])
-        
-        prompt = self.prompt_template.format(
-            context=context_text,
-            question=query
-        )
+    def build_prompt(self, query, context_chunks):
+        """Return (prompt, context stats) packed to the model's input budget"""
+        self.load()
+        chunks = context_chunks[:self.max_context_chunks]
+        compression = None
+        if self.compressor is not None:
+            chunks, compression = self.compressor.compress(
+                query, chunks, count_tokens=self._count_tokens, tokenizer_name=self.model_name
+            )
         
+        prompt, stats = self.packer.pack(self.prompt_template, query, chunks)
+        if compression is not None:
+            stats['compression'] = compression
+        return prompt, stats
+
+    def _count_tokens(self, text):
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def generate_answer(self, query, context_chunks, deadline_ms=None):
+        return self._answer(query, context_chunks, self._deadline(deadline_ms))[0]
+
+    def _deadline(self, deadline_ms, started=None):
+        deadline_ms = deadline_ms if deadline_ms is not None else self.deadline_ms
+        if deadline_ms is None:
+            return None
+        return (started or time.perf_counter()) + deadline_ms / 1000
+
+    def _decoding_limits(self, deadline):
+        """
+        Generation kwargs fitting the time left before `deadline`: {} without
+        a deadline, None when the extractive fallback should answer instead
+        """
+        if deadline is None:
+            return {}
+        remaining = deadline - time.perf_counter()
+        max_new_tokens = self.max_new_tokens
+        fits = self.decode_speed.tokens_within(max(remaining, 0))
+        if fits is not None:
+            max_new_tokens = min(max_new_tokens, fits)
+        if max_new_tokens < self.min_new_tokens or remaining <= 0:
+            if self.extractive_scorer is not None:
+                return None
+            max_new_tokens = self.min_new_tokens
+        return {'max_new_tokens': max_new_tokens, 'max_time': max(remaining, 0.01)}
+
+    def _capped(self, limits, tokens, elapsed):
+        """True if a deadline limit, not the model, ended the generation"""
+        if not limits:
+            return False
+        # re-encoding the decoded text can come out a token short
+        hit_token_cap = (limits['max_new_tokens'] < self.max_new_tokens
+                         and tokens >= limits['max_new_tokens'] - 1)
+        return hit_token_cap or elapsed >= limits['max_time']
+
+    def _needs_own_limits(self, limits):
+        # a budget at or above what answers usually take (or any budget
+        # before there is history) goes through the batcher, which enforces
+        # the deadline with max_time; tighter ones get their own generate
+        # call so they do not cut a whole batch short
+        typical = self.decode_speed.typical_tokens()
+        return typical is not None and limits['max_new_tokens'] < typical
+
+    def _fallback_answer(self, query, context_chunks):
+        _, index, sentence = self.extractive_scorer.best_sentence(query, context_chunks)
+        return sentence if index is not None else "I cannot find this information in the document."
+
+    def _answer(self, query, context_chunks, deadline=None):
+        """Return (answer, context stats, ok); extractive fallbacks are not ok to cache"""
+        stats = None
         try:
-            result = self.llm.invoke(prompt)
-            answer = result.strip()
+            prompt, stats = self.build_prompt(query, context_chunks)
+            limits = self._decoding_limits(deadline)
+            capped = False
+            if limits is None:
+                answer = self._fallback_answer(query, context_chunks)
+                stats['deadline_fallback'] = True
+            elif limits and (self.batcher is None or self._needs_own_limits(limits)):
+                answer, capped = self._generate_limited(prompt, limits)
+                answer = answer.strip()
+            elif self.batcher is not None:
+                answer, capped = self.batcher.run((prompt, deadline))
+                answer = answer.strip()
+            else:
+                answer = self._generate(prompt).strip()
+            if capped:
+                stats['deadline_limited'] = True
+            if deadline is not None:
+                self.deadline_metrics.record(deadline, limited=capped, fallback=limits is None)
             
         except Exception as e:
             print(f"Error generating answer: {e}")
-            answer = "Sorry, I encountered an error generating the answer."
+            answer = ERROR_ANSWER
+            return answer, stats, False
         
-        return answer
+        return answer, stats, limits is not None and not capped
+
+    def _generate(self, prompt):
+        if self.batcher is not None:
+            return self.batcher.run((prompt, None))[0]
+        return self._generate_limited(prompt, {})[0]
+
+    def _generate_limited(self, prompt, limits):
+        """Return (answer, whether a deadline limit cut it short)"""
+        # requests whose token budget is below the usual answer length
+        # bypass the batcher: their decoding limits are per request
+        pipe = self.llm.pipeline
+        start = time.perf_counter()
+        answer = pipe(prompt, **limits)[0]['generated_text']
+        elapsed = time.perf_counter() - start
+        tokens = self._count_tokens(answer)
+        self.decode_speed.record(elapsed, tokens)
+        return answer, self._capped(limits, tokens, elapsed)
+
+    def _generate_requests(self, requests):
+        """MicroBatcher batch_fn: (prompt, deadline or None) pairs -> (answer, capped) pairs"""
+        deadlines = [deadline for _, deadline in requests if deadline is not None]
+        if not deadlines:
+            return [(answer, False) for answer in self._generate_batch([prompt for prompt, _ in requests])]
+
+        # the batch decodes together, so it stops at its tightest deadline;
+        # if that cuts it short, every answer in it is treated as capped
+        max_time = max(min(deadlines) - time.perf_counter(), 0.01)
+        start = time.perf_counter()
+        answers = self._generate_batch([prompt for prompt, _ in requests], max_time=max_time)
+        capped = time.perf_counter() - start >= max_time
+        return [(answer, capped) for answer in answers]
+
+    def _generate_batch(self, prompts, **generation):
+        pipe = self.llm.pipeline
+        start = time.perf_counter()
+        outputs = [
+            output['generated_text'] for output in pipe(prompts, batch_size=len(prompts), **generation)
+        ]
+        # a batch decodes until its longest answer is done
+        self.decode_speed.record(
+            time.perf_counter() - start, max(self._count_tokens(output) for output in outputs)
+        )
+        return outputs
+
+    def _stream(self, prompt, on_complete=None, deadline=None, limits=None, outcome=None):
+        # outcome (the result dict handed to the caller) gets
+        # 'deadline_limited' if a limit cut the answer short
+        from transformers import TextIteratorStreamer
+
+        pipe = self.llm.pipeline
+        inputs = self.tokenizer(
+            prompt, return_tensors='pt', truncation=True, max_length=self.max_input_tokens
+        ).to(pipe.model.device)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors = []
+        generation = {'max_length': 512}
+        if limits:
+            generation = dict(limits)
+
+        def run():
+            try:
+                with self._stream_slots:
+                    pipe.model.generate(**inputs, streamer=streamer, **generation)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        start = time.perf_counter()
+        worker = threading.Thread(target=run, name='llm-stream', daemon=True)
+        worker.start()
+        first = True
+        pieces = []
+        for text in streamer:
+            if not text:
+                continue
+            if first:
+                self.ttft.append(time.perf_counter() - start)
+                first = False
+            pieces.append(text)
+            yield text
+        worker.join()
+        capped = False
+        if not errors and pieces:
+            elapsed = time.perf_counter() - start
+            tokens = self._count_tokens("".join(pieces))
+            self.decode_speed.record(elapsed, tokens)
+            capped = self._capped(limits, tokens, elapsed)
+        if capped and outcome is not None:
+            outcome['deadline_limited'] = True
+        if deadline is not None:
+            self.deadline_metrics.record(deadline, limited=capped)
+        if errors:
+            print(f"Error generating answer: {errors[0]}")
+            yield ERROR_ANSWER
+        elif on_complete is not None and not capped:
+            on_complete("".join(pieces).strip())
+
+    def deadline_stats(self):
+        return dict(self.deadline_metrics.snapshot(), **self.decode_speed.snapshot())
+
+    def batch_metrics(self):
+        return self.batcher.metrics.snapshot() if self.batcher is not None else None
+
+    def streaming_metrics(self):
+        values = list(self.ttft)
+        return {
+            'streams': len(values),
+            'ttft_p50_ms': percentile(values, 50) * 1000,
+            'ttft_p95_ms': percentile(values, 95) * 1000,
+        }
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
     
-    def generate_answer_with_citations(self, query, search_results):
+    def generate_answer_with_citations(self, query, search_results, index_version=None, deadline_ms=None):
+        # index_version is the version of the index that produced
+        # search_results; a new version invalidates cached answers.
+        # deadline_ms overrides the instance's latency budget.
+        deadline = self._deadline(deadline_ms)
+        cache_key = self._cache_key(query, search_results)
+        if cache_key is not None:
+            cached = self.answer_cache.get(cache_key, index_version)
+            if cached is not None:
+                return dict(cached, cached=True)
         
         context_chunks = [result['chunk'] for result in search_results]
         
-        answer = self.generate_answer(query, context_chunks)
+        answer, stats, ok = self._answer(query, context_chunks, deadline)
+        citations = self._citations(search_results, stats)
+        
+        result = {
+            'answer': answer,
+            'citations': citations,
+            'context_used': len(citations),
+            'context_tokens': stats
+        }
+        for flag in ('deadline_fallback', 'deadline_limited'):
+            if stats and stats.get(flag):
+                result[flag] = True
+        if cache_key is not None and ok:
+            self.answer_cache.put(cache_key, result, index_version)
+        return result
+
+    def stream_answer_with_citations(self, query, search_results, index_version=None, deadline_ms=None):
+        """
+        Like generate_answer_with_citations, but returns before generation:
+        'answer_stream' is a generator yielding text as it is decoded, while
+        citations are available immediately.
+        """
+        deadline = self._deadline(deadline_ms)
+        cache_key = self._cache_key(query, search_results)
+        if cache_key is not None:
+            cached = self.answer_cache.get(cache_key, index_version)
+            if cached is not None:
+                answer = cached.pop('answer')
+                return dict(cached, answer_stream=iter([answer]), cached=True)
+
+        context_chunks = [result['chunk'] for result in search_results]
+        try:
+            prompt, stats = self.build_prompt(query, context_chunks)
+            limits = self._decoding_limits(deadline)
+            answer = self._fallback_answer(query, context_chunks) if limits is None else None
+        except Exception as e:
+            print(f"Error generating answer: {e}")
+            citations = self._citations(search_results, None)
+            return {
+                'answer_stream': iter([ERROR_ANSWER]),
+                'citations': citations,
+                'context_used': len(citations),
+                'context_tokens': None
+            }
+
+        citations = self._citations(search_results, stats)
+        result = {
+            'citations': citations,
+            'context_used': len(citations),
+            'context_tokens': stats
+        }
+        if limits is None:
+            self.deadline_metrics.record(deadline, fallback=True)
+            return dict(result, answer_stream=iter([answer]), deadline_fallback=True)
+
+        on_complete = None
+        if cache_key is not None:
+            def on_complete(answer):
+                self.answer_cache.put(cache_key, dict(result, answer=answer), index_version)
+
+        streamed = dict(result)
+        streamed['answer_stream'] = self._stream(prompt, on_complete, deadline, limits, outcome=streamed)
+        return streamed
+
+    def _cache_key(self, query, search_results):
+        if self.answer_cache is None:
+            return None
+        chunk_ids = [r['chunk'].get('chunk_id') for r in search_results[:self.max_context_chunks]]
+        if not chunk_ids or None in chunk_ids:
+            return None
+        from answer_cache import make_key
+
+        model = f"{self.model_name}:{self.backend}"
+        if self.compressor is not None:
+            model += f":compressed-{self.compressor.max_tokens}"
+        return make_key(query, chunk_ids, self.prompt_template, model)
+
+    def _citations(self, search_results, stats):
+        # cite the chunks that actually made it into the prompt
+        used = stats['chunks_used'] if stats else range(min(3, len(search_results)))
        
         citations = []
-        for i, result in enumerate(search_results[:3]):
+        for i, index in enumerate(used):
+            result = search_results[index]
             chunk = result['chunk']
             citations.append({
                 'rank': i + 1,
@@ -76,18 +535,13 @@ Answer:"""
                 'type': chunk['type'],
                 'relevance_score': result['score']
             })
-        
-        return {
-            'answer': answer,
-            'citations': citations,
-            'context_used': len(context_chunks)
-        }
+        return citations
 
 class SimpleQA:
     def __init__(self):
         print()
     
-    def generate_answer_with_citations(self, query, search_results):
+    def generate_answer_with_citations(self, query, search_results, index_version=None, deadline_ms=None):
         if not search_results:
             return {
                 'answer': "No relevant information found in the document.",
@@ -122,6 +576,12 @@ class SimpleQA:
             'context_used': len(search_results)
         }
 
+    def stream_answer_with_citations(self, query, search_results, index_version=None, deadline_ms=None):
+        result = self.generate_answer_with_citations(query, search_results)
+        answer = result.pop('answer')
+        result['answer_stream'] = iter([answer])
+        return result
+
 if __name__ == "__main__":
 
     test_results = [
@@ -146,7 +606,7 @@ if __name__ == "__main__":
     ]
     try:
         print("\n1. Test ")
-        qa = LLMQA()
+        qa = LLMQA(lazy=False)
         result = qa.generate_answer_with_citations("What is Qatar's growth?", test_results)
         print(f"\nAnswer: {result['answer']}")
         print(f"Citations: {len(result['citations'])} sources")
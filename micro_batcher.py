@@ -0,0 +1,138 @@
+"""
+Dynamic micro-batching in front of a batch function
+Callers submit single items from any thread; a worker thread groups waiting
+items into a batch of up to `max_batch_size`, waiting at most `max_wait_ms`
+after the oldest item arrived, runs batch_fn once and routes each output
+back to its caller's Future.
+"""
+
+import queue
+import statistics
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+class BatchMetrics:
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.window = window
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+        self._batch_sizes = []
+        self._queue_waits = []
+        self._latencies = []
+
+    def _keep(self, values, new):
+        values.extend(new)
+        del values[:-self.window]
+
+    def record_batch(self, size, queue_waits, latencies, failed=False):
+        with self._lock:
+            self.requests += size
+            self.batches += 1
+            self.errors += size if failed else 0
+            self._keep(self._batch_sizes, [size])
+            self._keep(self._queue_waits, queue_waits)
+            self._keep(self._latencies, latencies)
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = time.perf_counter() - self.started
+            return {
+                'requests': self.requests,
+                'batches': self.batches,
+                'errors': self.errors,
+                'mean_batch_size': statistics.mean(self._batch_sizes) if self._batch_sizes else 0.0,
+                'throughput_rps': self.requests / elapsed if elapsed > 0 else 0.0,
+                'queue_wait_p50_ms': percentile(self._queue_waits, 50) * 1000,
+                'latency_p50_ms': percentile(self._latencies, 50) * 1000,
+                'latency_p95_ms': percentile(self._latencies, 95) * 1000,
+            }
+
+class MicroBatcher:
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=20, name='micro-batcher'):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self.metrics = BatchMetrics()
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, item):
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def run(self, item, timeout=None):
+        return self.submit(item).result(timeout)
+
+    def close(self):
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(_STOP)
+                self._thread.join()
+                self._thread = None
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [entry for entry in self._collect(first) if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            waits = [started - enqueued for _, _, enqueued in batch]
+            try:
+                outputs = self.batch_fn([item for item, _, _ in batch])
+                if len(outputs) != len(batch):
+                    raise RuntimeError(f"batch_fn returned {len(outputs)} outputs for {len(batch)} inputs")
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                failed = True
+            else:
+                for (_, future, _), output in zip(batch, outputs):
+                    future.set_result(output)
+                failed = False
+
+            finished = time.perf_counter()
+            self.metrics.record_batch(
+                len(batch), waits, [finished - enqueued for _, _, enqueued in batch], failed
+            )
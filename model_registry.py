@@ -0,0 +1,303 @@
+"""
+Process-wide registry of loaded models and indexes
+Streamlit sessions (and any other callers in the process) acquire shared
+instances keyed by their configuration instead of loading their own copy of
+MiniLM, flan-t5 or the FAISS index.
+
+References are tracked per holder rather than per acquire: a caller that
+may go away (a Streamlit session) registers a Holder on the instances it
+uses with hold(). A holder stops counting once release() is called or once
+it is garbage collected with the session state. evict_unused() then closes
+every instance that was held and has no live holders left. Instances that
+were never held (long-running services, or dependencies acquired inside
+other factories) stay loaded until evicted explicitly.
+"""
+
+import threading
+import weakref
+
+class Holder:
+    """Handle representing one user of shared instances (e.g. a session)"""
+
+class _Entry:
+    def __init__(self):
+        self.value = None
+        self.error = None
+        self.holders = weakref.WeakSet()
+        self.held = False
+        self.ready = threading.Event()
+
+class ModelRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def acquire(self, key, factory):
+        """
+        Return the instance for `key`, calling factory() if none is loaded
+        Concurrent callers for the same key wait for a single load. Use
+        hold() to count a reference to the result.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            creator = entry is None
+            if creator:
+                entry = self._entries[key] = _Entry()
+
+        if creator:
+            try:
+                entry.value = factory()
+            except Exception as e:
+                entry.error = e
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                raise
+            finally:
+                entry.ready.set()
+        else:
+            entry.ready.wait()
+            if entry.error is not None:
+                raise entry.error
+        return entry.value
+
+    def hold(self, holder, *values):
+        """Count `holder` as a reference to the loaded instances `values`"""
+        with self._lock:
+            for entry in self._entries.values():
+                if any(entry.value is value for value in values if value is not None):
+                    entry.holders.add(holder)
+                    entry.held = True
+
+    def release(self, holder):
+        """Drop every reference `holder` has (also happens when it is collected)"""
+        with self._lock:
+            for entry in self._entries.values():
+                entry.holders.discard(holder)
+
+    def evict(self, key, force=False):
+        """Drop `key` if unreferenced (or `force`); returns True if evicted"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry.ready.is_set():
+                return False
+            if len(entry.holders) > 0 and not force:
+                return False
+            del self._entries[key]
+
+        if hasattr(entry.value, 'close'):
+            entry.value.close()
+        print(f"Evicted {key[0]} {key[1:]}")
+        return True
+
+    def evict_unused(self):
+        """Evict instances that were held but have no live holders left"""
+        with self._lock:
+            unused = [
+                key for key, entry in self._entries.items()
+                if entry.held and len(entry.holders) == 0
+            ]
+        return [key for key in unused if self.evict(key)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                key: {'refs': len(entry.holders), 'loaded': entry.ready.is_set()}
+                for key, entry in self._entries.items()
+            }
+
+registry = ModelRegistry()
+
+def embeddings_key(model_name):
+    return ('embeddings', model_name)
+
+def llm_key(model_name, **options):
+    return ('llm', model_name) + tuple(sorted(options.items()))
+
+def index_key(filepath, model_name, **options):
+    return ('index', filepath, model_name) + tuple(sorted(options.items()))
+
+def get_embeddings(model_name):
+    from vector_store import load_embeddings
+
+    return registry.acquire(embeddings_key(model_name), lambda: load_embeddings(model_name))
+
+def get_llm(model_name, **options):
+    """Shared LLMQA for `model_name`; the model itself loads on first use"""
+    from llm_qa import LLMQA
+
+    return registry.acquire(
+        llm_key(model_name, **options),
+        lambda: LLMQA(model_name=model_name, **options)
+    )
+
+def get_index(filepath, model_name, poll_interval=5.0, **options):
+    """
+    Shared IndexReloader serving the live version of the index at `filepath`
+    The embedding model is taken from the registry when first needed, so
+    every index and cache in the process uses the same MiniLM instance.
+    """
+    from index_versions import IndexReloader
+    from vector_store import VectorStore
+
+    def factory():
+        store = VectorStore(
+            model_name=model_name,
+            embeddings_loader=get_embeddings,
+            **options
+        )
+        store.load(filepath)
+        return IndexReloader(store, filepath, poll_interval=poll_interval).start()
+
+    key = index_key(filepath, model_name, poll_interval=poll_interval, **options)
+    return registry.acquire(key, factory)
+
+def shared_index():
+    """get_index() for the index and search settings in config.py"""
+    import config
+
+    return get_index(
+        config.VECTOR_STORE_PATH,
+        config.EMBEDDING_MODEL,
+        poll_interval=config.INDEX_RELOAD_INTERVAL,
+        num_shards=config.NUM_SHARDS,
+        search_mode=config.SEARCH_MODE,
+        binary_candidates=config.BINARY_CANDIDATES
+    )
+
+def get_answer_cache(path, max_entries, ttl_seconds):
+    from answer_cache import AnswerCache
+
+    return registry.acquire(
+        ('answer_cache', path, max_entries, ttl_seconds),
+        lambda: AnswerCache(path, max_entries=max_entries, ttl_seconds=ttl_seconds)
+    )
+
+def get_compressor(max_tokens):
+    from context_compressor import ContextCompressor
+
+    scorer = shared_sentence_scorer()
+    return registry.acquire(
+        ('compressor', max_tokens),
+        lambda: ContextCompressor(scorer, max_tokens=max_tokens)
+    )
+
+def shared_llm():
+    import config
+
+    compressor = None
+    if config.CONTEXT_COMPRESSION_TOKENS:
+        compressor = get_compressor(config.CONTEXT_COMPRESSION_TOKENS)
+
+    answer_cache = None
+    if config.ANSWER_CACHE_PATH:
+        answer_cache = get_answer_cache(
+            config.ANSWER_CACHE_PATH, config.ANSWER_CACHE_MAX_ENTRIES, config.ANSWER_CACHE_TTL
+        )
+
+    return get_llm(
+        config.LLM_MODEL,
+        max_batch_size=config.LLM_MAX_BATCH_SIZE,
+        max_wait_ms=config.LLM_MAX_WAIT_MS,
+        max_input_tokens=config.LLM_MAX_INPUT_TOKENS,
+        backend=config.LLM_BACKEND,
+        model_dir=config.LLM_MODEL_DIR,
+        answer_cache=answer_cache,
+        compressor=compressor,
+        deadline_ms=config.LLM_DEADLINE_MS,
+        max_new_tokens=config.LLM_MAX_NEW_TOKENS,
+        min_new_tokens=config.LLM_MIN_NEW_TOKENS,
+        extractive_scorer=shared_sentence_scorer()
+    )
+
+def shared_semantic_cache():
+    """SemanticCache in front of shared_llm(), encoding with the live index's MiniLM"""
+    import config
+    from semantic_cache import SemanticCache
+
+    qa = shared_llm()
+
+    # the index is looked up per query, so building the cache does not load it
+    return registry.acquire(
+        ('semantic_cache', config.SEMANTIC_CACHE_THRESHOLD, config.SEMANTIC_CACHE_MAX_ENTRIES,
+         config.SEMANTIC_CACHE_MIN_OVERLAP),
+        lambda: SemanticCache(
+            qa,
+            lambda query: shared_index().current.embed_query(query),
+            threshold=config.SEMANTIC_CACHE_THRESHOLD,
+            max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES,
+            min_chunk_overlap=config.SEMANTIC_CACHE_MIN_OVERLAP
+        )
+    )
+
+def shared_sentence_scorer():
+    """extractive.SentenceScorer using the live index's embedding model"""
+    import config
+    from extractive import SentenceScorer
+
+    return registry.acquire(
+        ('sentence_scorer', config.EMBEDDING_MODEL),
+        lambda: SentenceScorer(
+            lambda: shared_index().current.embeddings,
+            lookup=lambda chunk: shared_index().current.sentence_entry(chunk)
+        )
+    )
+
+def shared_cascade():
+    """CascadeQA in front of the semantic cache (if enabled) and shared_llm()"""
+    import config
+    from cascade import CascadeQA
+
+    qa = shared_semantic_cache() if config.SEMANTIC_CACHE_THRESHOLD else shared_llm()
+    scorer = shared_sentence_scorer()
+
+    return registry.acquire(
+        ('cascade', config.CASCADE_MAX_DISTANCE, config.CASCADE_MIN_CONFIDENCE),
+        lambda: CascadeQA(
+            qa,
+            scorer,
+            max_distance=config.CASCADE_MAX_DISTANCE,
+            min_confidence=config.CASCADE_MIN_CONFIDENCE
+        )
+    )
+
+def shared_answerer():
+    """The configured answer chain: cascade, then semantic cache, then shared_llm()"""
+    import config
+
+    if config.CASCADE_ENABLED:
+        return shared_cascade()
+    if config.SEMANTIC_CACHE_THRESHOLD:
+        return shared_semantic_cache()
+    return shared_llm()
+
+def shared_singleflight():
+    """Process-wide SingleFlight so identical concurrent questions share work"""
+    from singleflight import SingleFlight
+
+    return registry.acquire(('singleflight',), SingleFlight)
+
+def shared_search_executor():
+    """Process-wide SearchExecutor bounding concurrent searches and their FAISS threads"""
+    import config
+    from search_executor import SearchExecutor
+
+    return registry.acquire(
+        ('search_executor',),
+        lambda: SearchExecutor(
+            max_concurrency=config.SEARCH_MAX_CONCURRENCY,
+            max_queue=config.SEARCH_MAX_QUEUE,
+            queue_timeout=config.SEARCH_QUEUE_TIMEOUT,
+            faiss_threads=config.SEARCH_THREADS
+        )
+    )
+
+def shared_warmup():
+    """Started Warmup loading the shared index and LLM in the background"""
+    import config
+    from warmup import Warmup
+
+    return registry.acquire(
+        ('warmup',),
+        lambda: Warmup(shared_index, shared_llm, config.WARMUP_QUERIES).start()
+    )
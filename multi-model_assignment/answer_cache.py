@@ -0,0 +1,164 @@
+"""
+Persistent answer cache (SQLite)
+Answers are keyed by the normalized query, the retrieved chunk IDs, the
+prompt template and the model name, and tagged with the index version they
+were generated against; lookups only match entries of the caller's version.
+Entries expire after `ttl_seconds` and the least recently used are evicted
+beyond `max_entries`. Entries of older versions are pruned once a newer
+published version is seen, so a store still serving an old version during a
+reload (or another process sharing the file) does not wipe the new one.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+UNVERSIONED = 'unversioned'
+
+def normalize_query(query):
+    return re.sub(r'\s+', ' ', query).strip().strip('?!.').strip().lower()
+
+def make_key(query, chunk_ids, prompt_template, model_name):
+    payload = json.dumps(
+        [normalize_query(query), sorted(chunk_ids), prompt_template, model_name]
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def is_newer_version(index_version, than):
+    """True if `index_version` supersedes `than` (None: nothing seen yet)"""
+    # published versions are UTC timestamps, so they sort by publication
+    if index_version == UNVERSIONED:
+        return than is None
+    return than in (None, UNVERSIONED) or index_version > than
+
+class AnswerCache:
+    def __init__(self, path, max_entries=5000, ttl_seconds=7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # opened on first use in each process: prefork_server builds the
+        # cache before forking, and a SQLite connection must not be shared
+        # with (or used by) a forked child
+        self._conn = None
+        self._pid = None
+        self._index_version = None
+
+    def _connection(self):
+        # caller holds self._lock. A connection inherited from the parent is
+        # dropped without closing it, which would disturb the parent's.
+        if self._pid != os.getpid():
+            self._conn = self._open()
+            self._pid = os.getpid()
+        return self._conn
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " key TEXT NOT NULL, index_version TEXT NOT NULL, result TEXT NOT NULL,"
+            " created REAL NOT NULL, last_access REAL NOT NULL,"
+            " PRIMARY KEY (key, index_version))"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS answers_lru ON answers (last_access)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        return conn
+
+    def _newest_version(self):
+        row = self._connection().execute("SELECT value FROM meta WHERE name = 'index_version'").fetchone()
+        return row[0] if row else None
+
+    def _observe_version(self, index_version):
+        # caller holds self._lock; returns False for a superseded version.
+        # The newest version is re-read because another process sharing the
+        # file may have seen a newer one.
+        self._index_version = self._newest_version()
+        if not is_newer_version(index_version, self._index_version):
+            return index_version == self._index_version
+        conn = self._connection()
+        conn.execute(
+            "DELETE FROM answers WHERE index_version != ?", (index_version,)
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES ('index_version', ?)", (index_version,)
+        )
+        self._index_version = index_version
+        return True
+
+    def get(self, key, index_version=None):
+        index_version = index_version or UNVERSIONED
+        now = time.time()
+        with self._lock:
+            self._observe_version(index_version)
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT result FROM answers"
+                " WHERE key = ? AND index_version = ? AND created >= ?",
+                (key, index_version, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute(
+                "UPDATE answers SET last_access = ? WHERE key = ? AND index_version = ?",
+                (now, key, index_version)
+            )
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, result, index_version=None):
+        index_version = index_version or UNVERSIONED
+        now = time.time()
+        with self._lock:
+            if not self._observe_version(index_version):
+                # would be pruned as soon as it is written
+                return
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO answers"
+                " (key, index_version, result, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, index_version, json.dumps(result), now, now)
+            )
+            conn.execute(
+                "DELETE FROM answers WHERE created < ?", (now - self.ttl_seconds,)
+            )
+            conn.execute(
+                "DELETE FROM answers WHERE rowid IN ("
+                " SELECT rowid FROM answers ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute("DELETE FROM answers")
+
+    def stats(self):
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'index_version': self._index_version,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._pid = None
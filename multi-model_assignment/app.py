@@ -1,43 +1,91 @@
 import streamlit as st
-import os
-from vector_store import VectorStore
 from llm_qa import LLMQA, SimpleQA
+from index_versions import index_exists
+import model_registry
 import config
+from search_executor import Busy
+from singleflight import publish_stream, request_key
 
 st.set_page_config(
     page_title="RAG multi-model"
 )
 
-if 'vector_store' not in st.session_state:
-    st.session_state.vector_store = None
+if 'index_reloader' not in st.session_state:
+    st.session_state.index_reloader = None
 if 'qa_system' not in st.session_state:
     st.session_state.qa_system = None
+if 'semantic_cache' not in st.session_state:
+    st.session_state.semantic_cache = None
+if 'cascade' not in st.session_state:
+    st.session_state.cascade = None
+if 'flights' not in st.session_state:
+    st.session_state.flights = None
+if 'search_executor' not in st.session_state:
+    st.session_state.search_executor = None
+if 'warmup' not in st.session_state:
+    st.session_state.warmup = None
+if 'warmup_seen' not in st.session_state:
+    st.session_state.warmup_seen = None
 if 'loaded' not in st.session_state:
     st.session_state.loaded = False
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 
-if not st.session_state.loaded:
-    faiss_file = os.path.join(config.VECTOR_STORE_PATH, "index.faiss")
-    if os.path.exists(faiss_file) or os.path.exists(f"{config.VECTOR_STORE_PATH}.faiss"):
-        with st.spinner("Loading pre-processed data..."):
-            try:
-                vector_store = VectorStore(model_name=config.EMBEDDING_MODEL)
-                vector_store.load(config.VECTOR_STORE_PATH)
-                st.session_state.vector_store = vector_store
-                
-                try:
-                    qa_system = LLMQA(model_name=config.LLM_MODEL)
-                    st.session_state.qa_system = qa_system
-                except:
-                    st.warning("Using simple QA (LLM model failed to load)")
-                    st.session_state.qa_system = SimpleQA()
-                
-                st.session_state.loaded = True
-                
-            except Exception as e:
-                st.error(f"Error loading data: {e}")
-                st.session_state.loaded = False
+# The index, MiniLM and flan-t5 load and warm up on a shared background
+# thread, so the page renders right away and shows progress per component.
+if st.session_state.warmup is None and index_exists(config.VECTOR_STORE_PATH):
+    st.session_state.warmup = model_registry.shared_warmup()
+
+warmup = st.session_state.warmup
+if not st.session_state.loaded and warmup is not None and warmup.ready('index'):
+    try:
+        # The index reloader and LLM are process-wide and shared by every
+        # session, so a session only attaches to them once the index is in.
+        # Newly published index versions are swapped in by the reloader in
+        # the background.
+        st.session_state.index_reloader = model_registry.shared_index()
+        st.session_state.qa_system = model_registry.shared_llm()
+        if config.SEMANTIC_CACHE_THRESHOLD:
+            st.session_state.semantic_cache = model_registry.shared_semantic_cache()
+        if config.CASCADE_ENABLED:
+            st.session_state.cascade = model_registry.shared_cascade()
+        st.session_state.flights = model_registry.shared_singleflight()
+        st.session_state.search_executor = model_registry.shared_search_executor()
+        # the holder goes away with this session's state, which releases
+        # the session's references to the shared instances
+        st.session_state.model_holder = model_registry.Holder()
+        model_registry.registry.hold(
+            st.session_state.model_holder,
+            warmup,
+            st.session_state.index_reloader,
+            st.session_state.qa_system,
+            st.session_state.semantic_cache,
+            st.session_state.cascade,
+        )
+        
+        st.session_state.loaded = True
+        
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        st.session_state.loaded = False
+
+STATE_ICONS = {'pending': '⏳', 'loading': '🔄', 'ready': '✅', 'failed': '❌', 'skipped': '➖'}
+
+@st.fragment(run_every=None if warmup is None or warmup.done else 1.0)
+def show_readiness():
+    for name, info in warmup.status().items():
+        took = f" ({info['seconds']:.1f}s)" if info['seconds'] is not None else ""
+        st.caption(f"{STATE_ICONS[info['state']]} {name}: {info['state']}{took}")
+        if info['error']:
+            st.caption(f"  {info['error']}")
+    # rerun the whole page when the index comes in (attaching this session
+    # and enabling the chat) and when warm-up finishes (to stop polling)
+    seen = st.session_state.warmup_seen
+    progress = (warmup.ready('index'), warmup.done)
+    if progress != seen:
+        st.session_state.warmup_seen = progress
+        if seen is not None:
+            st.rerun()
 
 st.title(" Multi-Modal RAG ")
 st.markdown("Ask questions about the Qatar IMF Report")
@@ -45,14 +93,61 @@ st.markdown("Ask questions about the Qatar IMF Report")
 with st.sidebar:
     st.header("file Status")
     
+    if warmup is not None:
+        show_readiness()
+    
     if st.session_state.loaded:
         st.success(" Ready to use ")
 
-        if st.session_state.vector_store:
-            total = len(st.session_state.vector_store.chunks)
-            text_count = sum(1 for c in st.session_state.vector_store.chunks if c['type'] == 'text')
-            table_count = sum(1 for c in st.session_state.vector_store.chunks if c['type'] == 'table')
-            image_count = sum(1 for c in st.session_state.vector_store.chunks if c['type'] == 'image')
+        if st.session_state.index_reloader:
+            vector_store = st.session_state.index_reloader.current
+            total = len(vector_store.chunks)
+            text_count = sum(1 for c in vector_store.chunks if c['type'] == 'text')
+            table_count = sum(1 for c in vector_store.chunks if c['type'] == 'table')
+            image_count = sum(1 for c in vector_store.chunks if c['type'] == 'image')
+            st.caption(f"Index version: {vector_store.version or 'unversioned'}")
+
+        qa_system = st.session_state.qa_system
+        if isinstance(qa_system, LLMQA) and qa_system.ttft:
+            ttft = qa_system.streaming_metrics()
+            st.caption(f"Time to first token: {ttft['ttft_p50_ms']:.0f}ms p50, "
+                       f"{ttft['ttft_p95_ms']:.0f}ms p95")
+
+        if isinstance(qa_system, LLMQA) and qa_system.deadline_ms:
+            deadlines = qa_system.deadline_stats()
+            if deadlines['requests']:
+                st.caption(f"Latency budget: {deadlines['met']}/{deadlines['requests']} met, "
+                           f"{deadlines['limited']} shortened, {deadlines['fallbacks']} extractive fallbacks")
+
+        if st.session_state.semantic_cache:
+            cache_stats = st.session_state.semantic_cache.stats()
+            st.caption(f"Semantic cache: {cache_stats['hit_rate']:.0%} hit rate, "
+                       f"{cache_stats['suspect_hits']} suspected false hits")
+
+        if st.session_state.flights:
+            flights = st.session_state.flights.stats()
+            if flights['coalesced']:
+                st.caption(f"Coalesced requests: {flights['coalesced']} "
+                           f"({flights['coalesced_share']:.0%} of requests shared in-flight work)")
+
+        if st.session_state.cascade:
+            with st.expander("Answer routing"):
+                for route, info in st.session_state.cascade.metrics().items():
+                    st.caption(f"{route}: {info['count']} | "
+                               f"p50 {info['latency_p50_ms']:.0f}ms, p95 {info['latency_p95_ms']:.0f}ms")
+
+        if st.session_state.search_executor:
+            search = st.session_state.search_executor.stats()
+            st.caption(f"Search queue: {search['queue_depth']} waiting, "
+                       f"wait p99 {search['wait_p99_ms']:.0f}ms, "
+                       f"search p99 {search['latency_p99_ms']:.0f}ms")
+
+        with st.expander("Shared models"):
+            for key, info in model_registry.registry.stats().items():
+                st.caption(f"{key[0]}: {key[1:]} | sessions: {info['refs']}")
+            if st.button("Unload models no session uses"):
+                evicted = model_registry.registry.evict_unused()
+                st.caption(f"Unloaded {len(evicted)} instances")
         
         
         st.markdown("---")
@@ -60,6 +155,9 @@ with st.sidebar:
             st.session_state.chat_history = []
             st.rerun()
     
+    elif warmup is not None and not warmup.failed('index'):
+        st.info("Loading the index...")
+    
     else:
         st.error(" Data Not Found!")
         st.markdown("---")
@@ -108,29 +206,85 @@ if st.session_state.loaded:
         with st.chat_message("user"):
             st.markdown(query)
         
+        qa_system = st.session_state.qa_system
+        if isinstance(qa_system, LLMQA) and not qa_system.is_loaded:
+            with st.spinner("Loading answer model..."):
+                try:
+                    qa_system.load()
+                except Exception:
+                    st.warning("Using simple QA (LLM model failed to load)")
+                    st.session_state.qa_system = SimpleQA()
+        
         with st.chat_message("assistant"):
-            with st.spinner("Searching and generating answer..."):
-                search_results = st.session_state.vector_store.search(query, k=5)
+            with st.spinner("Searching..."):
+                vector_store = st.session_state.index_reloader.current
+                # identical questions asked at the same moment in other
+                # sessions share one search and one generation
+                flights = st.session_state.flights
+                # searches from all sessions go through one bounded executor
+                try:
+                    search_results = flights.do(
+                        request_key('search', query, 5, vector_store.version),
+                        st.session_state.search_executor.search, vector_store, query, 5
+                    )
+                except Busy:
+                    st.error("The system is busy right now, please ask again in a moment.")
+                    st.stop()
                 
-                result = st.session_state.qa_system.generate_answer_with_citations(
-                    query, search_results
-                )
+                # the cascade answers "not found" and confident extractive
+                # questions itself; paraphrases of answered questions are
+                # served by the semantic cache in front of the LLM
+                answerer = st.session_state.qa_system
+                if isinstance(answerer, LLMQA):
+                    answerer = (st.session_state.cascade or st.session_state.semantic_cache
+                                or answerer)
                 
-                st.markdown(result['answer'])
+                answer_key = request_key('answer', query, 5, vector_store.version)
+                pending, leader = flights.claim(answer_key)
+                result = None
+                if not leader:
+                    try:
+                        shared = pending.result(timeout=config.SINGLEFLIGHT_WAIT_TIMEOUT)
+                        result = dict(shared, answer_stream=iter([shared['answer']]))
+                    except Exception:
+                        # the other session's answer failed; answer it here instead
+                        result = None
                 
-                with st.expander("View Citations"):
-                    for cite in result['citations']:
-                        st.markdown(
-                            f"**{cite['source']}** | "
-                            f"Type: {cite['type']} | "
-                            f"Relevance: {cite['relevance_score']:.3f}"
+                if result is None:
+                    try:
+                        result = answerer.stream_answer_with_citations(
+                            query, search_results, index_version=vector_store.version
                         )
-                
-                st.session_state.chat_history.append({
-                    "role": "assistant",
-                    "content": result['answer'],
-                    "citations": result['citations']
-                })
+                    except Exception as e:
+                        if leader:
+                            flights.finish(answer_key, error=e)
+                        raise
+                    if leader:
+                        result = publish_stream(flights, answer_key, result)
+            
+            # citations are known once the context is packed, so render them
+            # now while the answer streams into the container above them
+            answer_container = st.container()
+            
+            with st.expander("View Citations"):
+                for cite in result['citations']:
+                    st.markdown(
+                        f"**{cite['source']}** | "
+                        f"Type: {cite['type']} | "
+                        f"Relevance: {cite['relevance_score']:.3f}"
+                    )
+            
+            with answer_container:
+                answer = st.write_stream(result['answer_stream'])
+            
+            st.session_state.chat_history.append({
+                "role": "assistant",
+                "content": answer,
+                "citations": result['citations']
+            })
+
+elif warmup is not None and not warmup.failed('index'):
+    st.info("Loading the document index, the chat opens as soon as it is ready.")
 
 else:
     st.info(" Follow steps")
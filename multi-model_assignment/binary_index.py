@@ -0,0 +1,55 @@
+"""
+Two-stage retrieval: sign-bit binary codes prefilter, float re-scoring
+Each normalized embedding is reduced to one bit per dimension (packed 8 per
+byte). A query scans the codes with Hamming distance (XOR + popcount), keeps
+the closest candidates and re-scores only those exactly in float. Scores are
+squared L2 distances, matching the flat FAISS index.
+"""
+
+import numpy as np
+
+# popcount of every byte value, for numpy versions without np.bitwise_count
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype='uint8')
+
+def pack_signs(vectors):
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+def popcount(packed):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(packed).sum(axis=-1, dtype='int32')
+    return _POPCOUNT[packed].sum(axis=-1, dtype='int32')
+
+class BinaryIndex:
+    def __init__(self, vectors):
+        self.vectors = np.ascontiguousarray(vectors, dtype='float32')
+        self.codes = pack_signs(self.vectors)
+
+    @property
+    def ntotal(self):
+        return len(self.vectors)
+
+    @property
+    def code_bytes(self):
+        return self.codes.nbytes
+
+    def hamming(self, query):
+        return popcount(np.bitwise_xor(self.codes, pack_signs(query)))
+
+    def search(self, query, k, candidates=None):
+        """Return the k best (squared L2 distance, row) pairs for one query"""
+        query = np.asarray(query, dtype='float32').reshape(-1)
+        k = min(k, self.ntotal)
+        if k == 0:
+            return []
+        n_candidates = min(self.ntotal, max(k, candidates or 10 * k))
+
+        distances = self.hamming(query)
+        if n_candidates < self.ntotal:
+            rows = np.argpartition(distances, n_candidates - 1)[:n_candidates]
+        else:
+            rows = np.arange(self.ntotal)
+
+        # unit vectors: ||q - v||^2 = 2 - 2 q.v
+        scores = 2.0 - 2.0 * (self.vectors[rows] @ query)
+        best = np.argsort(scores)[:k]
+        return [(float(scores[i]), int(rows[i])) for i in best]
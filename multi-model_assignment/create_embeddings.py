@@ -1,9 +1,10 @@
+import argparse
 import json
 import os
 from vector_store import VectorStore
 import config
 
-def main():
+def main(dims=config.EMBEDDING_DIMS, projection_method=config.EMBEDDING_PROJECTION):
     print("STEP 2: Creating Embeddings")
     print()
     print()
@@ -32,13 +33,24 @@ def main():
     print()
     print()
     
+    if dims:
+        print(f"Reducing embeddings to {dims} dims ({projection_method})")
+    
     vector_store = VectorStore(model_name=config.EMBEDDING_MODEL)
-    vector_store.create_embeddings(chunks)
+    vector_store.create_embeddings(chunks, dims=dims, projection_method=projection_method)
+    vector_store.tokenize_chunks(config.LLM_MODEL)
+    vector_store.index_sentences()
     
-    vector_store.save(config.VECTOR_STORE_PATH)
+    vector_store.save(config.VECTOR_STORE_PATH, keep=config.INDEX_VERSIONS_TO_KEEP)
     
     print("COMPLETE")
     print(f"\nTotal vectors: {len(chunks)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Embed processed chunks into the FAISS index")
+    parser.add_argument('--dims', type=int, default=config.EMBEDDING_DIMS,
+                        help="reduce stored embeddings to this many dimensions")
+    parser.add_argument('--projection', choices=['pca', 'truncate'],
+                        default=config.EMBEDDING_PROJECTION)
+    args = parser.parse_args()
+    main(dims=args.dims, projection_method=args.projection)
\ No newline at end of file
@@ -0,0 +1,179 @@
+"""
+Versioned vector store snapshots with an atomic "current" pointer
+
+    <filepath>_versions/
+        20261019-071812-123456/      immutable snapshot (index/, index_chunks.pkl, ...),
+                                     named by its UTC publication time
+        CURRENT                      name of the live snapshot
+
+A snapshot is written to a temporary directory and renamed into place, then
+CURRENT is swapped with os.replace, so readers never see a partial index.
+Stores saved before versioning (a bare <filepath> directory) still load.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+POINTER_NAME = 'CURRENT'
+SNAPSHOT_PREFIX = 'index'
+
+def versions_dir(filepath):
+    return f"{filepath}_versions"
+
+def snapshot_prefix(filepath, version):
+    return os.path.join(versions_dir(filepath), version, SNAPSHOT_PREFIX)
+
+def current_version(filepath):
+    try:
+        with open(os.path.join(versions_dir(filepath), POINTER_NAME), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def resolve(filepath):
+    """Return (path prefix to load, version) for the live index"""
+    version = current_version(filepath)
+    if version is None:
+        return filepath, None
+    return snapshot_prefix(filepath, version), version
+
+def index_exists(filepath):
+    path, _ = resolve(filepath)
+    return os.path.exists(os.path.join(path, "index.faiss")) or os.path.exists(f"{path}.faiss")
+
+def list_versions(filepath):
+    root = versions_dir(filepath)
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if os.path.isdir(os.path.join(root, name)) and not name.startswith('.')
+    )
+
+def _new_version(root):
+    # UTC, so names sort in publication order across DST changes; prune(),
+    # list_versions() and the answer cache rely on that
+    while True:
+        now = time.time()
+        version = time.strftime('%Y%m%d-%H%M%S', time.gmtime(now)) + f"-{int(now * 1e6) % 1_000_000:06d}"
+        if not os.path.exists(os.path.join(root, version)):
+            return version
+        time.sleep(1e-6)
+
+def _write_pointer(root, version):
+    fd, tmp_path = tempfile.mkstemp(dir=root, prefix=f".{POINTER_NAME}.")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, POINTER_NAME))
+
+def publish(filepath, write_snapshot, keep=3):
+    """Write a new snapshot with write_snapshot(prefix) and make it current"""
+    root = versions_dir(filepath)
+    os.makedirs(root, exist_ok=True)
+
+    staging = tempfile.mkdtemp(dir=root, prefix='.staging-')
+    try:
+        write_snapshot(os.path.join(staging, SNAPSHOT_PREFIX))
+        version = _new_version(root)
+        os.rename(staging, os.path.join(root, version))
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    _write_pointer(root, version)
+    prune(filepath, keep=keep)
+    return version
+
+def prune(filepath, keep=3):
+    """Delete all but the newest `keep` snapshots (never the current one)"""
+    current = current_version(filepath)
+    versions = list_versions(filepath)
+    for version in versions[:max(0, len(versions) - keep)]:
+        if version != current:
+            shutil.rmtree(os.path.join(versions_dir(filepath), version), ignore_errors=True)
+
+class IndexReloader:
+    """
+    Holds the live VectorStore and swaps in new published versions
+
+    A background thread polls the CURRENT pointer. A new version is fully
+    loaded (reusing the running store's embedding model) before the swap, so
+    callers that grabbed `current` keep using the old store undisturbed;
+    it is closed after `grace_period` seconds.
+    """
+
+    def __init__(self, store, filepath, poll_interval=5.0, grace_period=60.0, on_swap=None):
+        self.filepath = filepath
+        self.poll_interval = poll_interval
+        self.grace_period = grace_period
+        self.on_swap = on_swap
+        self.reloads = 0
+        self.last_error = None
+
+        self._store = store
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def current(self):
+        with self._lock:
+            return self._store
+
+    @property
+    def version(self):
+        return self.current.version
+
+    def start(self):
+        # restartable, e.g. in a worker forked after stop()
+        self._stop.clear()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='index-reloader', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        self.current.close()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            self.check()
+
+    def check(self):
+        """Reload if a newer version has been published; returns True on swap"""
+        version = current_version(self.filepath)
+        if version is None or version == self.current.version:
+            return False
+
+        try:
+            store = self.current.with_shared_models()
+            store.load(self.filepath)
+            store.vectorstore  # load the index now, not on a user's query
+        except Exception as e:
+            self.last_error = e
+            print(f"Index reload to {version} failed: {e}")
+            return False
+
+        with self._lock:
+            old, self._store = self._store, store
+        self.reloads += 1
+        print(f"Swapped in vector store version {store.version}")
+
+        if self.on_swap is not None:
+            self.on_swap(store)
+        timer = threading.Timer(self.grace_period, old.close)
+        timer.daemon = True
+        timer.start()
+        return True
@@ -0,0 +1,188 @@
+"""
+In-process DAG pipeline runner with stage-level caching
+Stages declare the files they read and write. A stage depends on the
+stages producing its inputs (plus any listed in `after`). Before running,
+a stage is fingerprinted from its code, its params and the contents of its
+inputs. If the fingerprint matches the last successful run and every output
+still exists, the stage is skipped. Stages whose dependencies are done run
+concurrently on a thread pool, and every run ends with a per-stage timing
+report.
+
+Fingerprints live in a JSON state file next to the outputs.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+class Stage:
+    def __init__(self, name, fn, inputs=(), outputs=(), after=(), params=None):
+        self.name = name
+        self.fn = fn
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.after = list(after)
+        # anything else the result depends on (e.g. config values)
+        self.params = params or {}
+
+    def fingerprint(self):
+        digest = hashlib.sha256()
+        try:
+            digest.update(inspect.getsource(self.fn).encode('utf-8'))
+        except (OSError, TypeError):
+            digest.update(repr(self.fn).encode('utf-8'))
+        digest.update(json.dumps(self.params, sort_keys=True, default=str).encode('utf-8'))
+        for path in sorted(self.inputs):
+            digest.update(path.encode('utf-8'))
+            _hash_path(digest, path)
+        return digest.hexdigest()
+
+def _hash_path(digest, path):
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                digest.update(os.path.relpath(full, path).encode('utf-8'))
+                _hash_file(digest, full)
+    elif os.path.exists(path):
+        _hash_file(digest, path)
+    else:
+        digest.update(b'<missing>')
+
+def _hash_file(digest, path):
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+
+class Pipeline:
+    def __init__(self, stages, state_path):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        producers = {output: stage.name for stage in stages for output in stage.outputs}
+        self.deps = {
+            stage.name: sorted(
+                {producers[path] for path in stage.inputs if path in producers} | set(stage.after)
+            )
+            for stage in stages
+        }
+        unknown = {dep for deps in self.deps.values() for dep in deps if dep not in self.stages}
+        if unknown:
+            raise ValueError(f"Unknown stage dependencies: {sorted(unknown)}")
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        visiting, done = set(), set()
+
+        def visit(name, path):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline has a cycle: {' -> '.join(path + [name])}")
+            visiting.add(name)
+            for dep in self.deps[name]:
+                visit(dep, path + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name, [])
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_state(self, state):
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.pipeline-state.')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def _selected(self, targets):
+        if not targets:
+            return set(self.stages)
+        selected = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}', expected one of {list(self.stages)}")
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.deps[name])
+        return selected
+
+    def _up_to_date(self, stage, fingerprint, state):
+        return (state.get(stage.name, {}).get('fingerprint') == fingerprint
+                and all(os.path.exists(path) for path in stage.outputs))
+
+    def run(self, targets=None, force=False, max_workers=4):
+        """
+        Run `targets` (default: every stage) and their dependencies
+        Returns {stage: {'status': 'ran'|'skipped'|'failed'|'blocked', 'seconds': ...}}.
+        """
+        selected = self._selected(targets)
+        state = self._load_state()
+        report = {}
+
+        def execute(stage):
+            start = time.perf_counter()
+            fingerprint = stage.fingerprint()
+            if not force and self._up_to_date(stage, fingerprint, state):
+                return 'skipped', fingerprint, time.perf_counter() - start
+            print(f"\n[pipeline] running {stage.name}")
+            stage.fn()
+            return 'ran', fingerprint, time.perf_counter() - start
+
+        remaining = set(selected)
+        running = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pipeline') as pool:
+            while remaining or running:
+                for name in sorted(remaining):
+                    deps = self.deps[name]
+                    if any(report.get(dep, {}).get('status') in ('failed', 'blocked') for dep in deps):
+                        report[name] = {'status': 'blocked', 'seconds': 0.0}
+                        remaining.discard(name)
+                    elif all(dep in report for dep in deps if dep in selected):
+                        running[pool.submit(execute, self.stages[name])] = name
+                        remaining.discard(name)
+                if not running:
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        status, fingerprint, seconds = future.result()
+                    except Exception as e:
+                        print(f"[pipeline] {name} failed: {e}")
+                        report[name] = {'status': 'failed', 'seconds': 0.0, 'error': str(e)}
+                        state.pop(name, None)
+                        continue
+                    report[name] = {'status': status, 'seconds': seconds}
+                    state[name] = {'fingerprint': fingerprint, 'finished': time.time()}
+                self._save_state(state)
+
+        self.print_report(report)
+        return report
+
+    def print_report(self, report):
+        print("\n" + "="*70)
+        print("PIPELINE REPORT")
+        print("="*70)
+        print(f"{'Stage':<20}{'Status':<10}{'Time':>10}")
+        for name in self.stages:
+            if name in report:
+                entry = report[name]
+                print(f"{name:<20}{entry['status']:<10}{entry['seconds']:>9.1f}s")
+        total = sum(entry['seconds'] for entry in report.values())
+        print(f"{'total stage time':<30}{total:>9.1f}s")
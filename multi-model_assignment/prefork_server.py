@@ -0,0 +1,191 @@
+"""
+Preload-then-fork serving of the query service
+The parent process loads MiniLM, flan-t5 and the FAISS index once, binds
+the listening socket, then forks N workers that serve query_service
+requests from that shared socket. The workers share the parent's model
+pages copy-on-write, so N workers cost much less than N copies.
+
+Keeping those pages shared:
+  * everything is loaded before fork and gc.freeze() moves it into the
+    permanent generation, so the cyclic GC never touches (and dirties)
+    the headers of objects the workers inherit
+  * tensor and array data live in buffers separate from their Python
+    objects, so refcount updates on those objects do not copy the weights
+  * nothing runs a forward pass in the parent, so no torch/OpenMP thread
+    pools exist at fork time; each worker creates its own, and its search
+    executor sets the FAISS thread count on the threads that search
+
+Hot reloads break the sharing: each worker runs its own IndexReloader, so
+when a new index version is published every worker loads a private copy of
+it, and memory grows to N copies of the index until the workers are
+restarted (restart the server after publishing to share it again). The
+models are not reloaded and stay shared.
+
+Per-process RSS and PSS (from /proc/<pid>/smaps_rollup) are printed after
+start-up and every --report-interval seconds; PSS splits shared pages
+between the processes mapping them, so the sum of PSS against the sum of
+RSS shows the saving. Linux only. With NUM_SHARDS > 1 each worker starts its
+own shard processes on its first search.
+
+Usage: python prefork_server.py [--workers N] [--host H] [--port P | --socket PATH]
+"""
+
+import gc
+import os
+import signal
+import sys
+import time
+
+MEMORY_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+def memory_usage(pid):
+    """Memory of `pid` in bytes from /proc (Rss/Pss/Shared_*/Private_*)"""
+    usage = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in MEMORY_FIELDS:
+                    usage[name] = int(rest.split()[0]) * 1024
+    except FileNotFoundError:
+        # kernels before 4.14: only RSS is cheap to get
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    usage['Rss'] = int(line.split()[1]) * 1024
+    return usage
+
+def memory_report(processes):
+    """Print and return per-process memory for {pid: role}"""
+    mb = 1024 * 1024
+    rows = []
+    print(f"\n{'PID':>8}  {'Role':<8}{'RSS':>10}{'PSS':>10}{'Shared':>10}{'Private':>10}")
+    for pid, role in processes.items():
+        try:
+            usage = memory_usage(pid)
+        except OSError:
+            continue
+        shared = usage.get('Shared_Clean', 0) + usage.get('Shared_Dirty', 0)
+        private = usage.get('Private_Clean', 0) + usage.get('Private_Dirty', 0)
+        rows.append(dict(usage, pid=pid, role=role))
+        print(f"{pid:>8}  {role:<8}{usage.get('Rss', 0) / mb:>8.0f}MB{usage.get('Pss', 0) / mb:>8.0f}MB"
+              f"{shared / mb:>8.0f}MB{private / mb:>8.0f}MB")
+
+    rss = sum(row.get('Rss', 0) for row in rows)
+    pss = sum(row.get('Pss', 0) for row in rows)
+    if pss:
+        print(f"Total RSS {rss / mb:.0f}MB, total PSS {pss / mb:.0f}MB "
+              f"({(rss - pss) / mb:.0f}MB counted more than once is shared)")
+    return rows
+
+def preload():
+    """Load every shared model and the index in this (parent) process"""
+    import model_registry
+
+    reloader = model_registry.shared_index()
+    store = reloader.current
+    store.vectorstore
+    store.embeddings
+    llm = model_registry.shared_llm().load()
+    answerer = model_registry.shared_answerer()
+    flights = model_registry.shared_singleflight()
+
+    # the reloader's poll thread would not survive the fork; each worker
+    # restarts it (and so loads new versions privately). The answer cache opens its SQLite connection in each
+    # worker on first use.
+    reloader.stop()
+
+    gc.collect()
+    gc.freeze()
+    return reloader, llm, answerer, flights
+
+def _serve(server, service, reloader):
+    import model_registry
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    reloader.start()
+    service.search_executor = model_registry.shared_search_executor()
+    try:
+        server.serve_forever()
+    finally:
+        os._exit(0)
+
+def main():
+    import argparse
+    import config
+    from query_service import QueryService, make_server
+
+    parser = argparse.ArgumentParser(description="Pre-forked local RAG query service")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--host', default=config.SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=config.SERVICE_PORT)
+    parser.add_argument('--socket', default=config.SERVICE_SOCKET,
+                        help="serve on this Unix socket path instead of TCP")
+    parser.add_argument('--report-interval', type=float, default=300,
+                        help="seconds between memory reports (0 disables)")
+    args = parser.parse_args()
+
+    print("Preloading models and index...")
+    reloader, llm, answerer, flights = preload()
+    service = QueryService(
+        reloader,
+        answerer,
+        llm=llm,
+        max_concurrency=config.SERVICE_MAX_CONCURRENCY,
+        max_queue=config.SERVICE_MAX_QUEUE,
+        queue_timeout=config.SERVICE_QUEUE_TIMEOUT,
+        flights=flights
+    ).load()
+    server = make_server(service, args.host, args.port, args.socket)
+
+    workers = {}
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            _serve(server, service, reloader)
+        workers[pid] = 'worker'
+
+    for _ in range(args.workers):
+        spawn()
+    print(f"Serving on {args.socket or f'http://{args.host}:{args.port}'} with {args.workers} workers")
+
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    time.sleep(1)
+    memory_report({os.getpid(): 'parent', **workers})
+    next_report = time.time() + args.report_interval
+    try:
+        while not stopping:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if pid in workers:
+                del workers[pid]
+                print(f"Worker {pid} exited ({status}), starting a new one")
+                spawn()
+            if args.report_interval and time.time() >= next_report:
+                memory_report({os.getpid(): 'parent', **workers})
+                next_report = time.time() + args.report_interval
+            time.sleep(0.5)
+    finally:
+        print("\nShutting down workers")
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+        for pid in list(workers):
+            os.waitpid(pid, 0)
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Dimensionality reduction for stored embeddings
+A Projection maps normalized embeddings to fewer dimensions and re-normalizes
+them, so L2 distances in the reduced space still rank like cosine similarity.
+"""
+
+import numpy as np
+
+METHODS = ('pca', 'truncate')
+
+class Projection:
+    def __init__(self, mean, components, method='pca'):
+        self.mean = np.asarray(mean, dtype='float32')
+        self.components = np.ascontiguousarray(components, dtype='float32')
+        self.method = method
+
+    @property
+    def input_dim(self):
+        return self.components.shape[1]
+
+    @property
+    def output_dim(self):
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, vectors, dims, method='pca'):
+        vectors = np.asarray(vectors, dtype='float32')
+        input_dim = vectors.shape[1]
+        if not 0 < dims <= input_dim:
+            raise ValueError(f"dims must be in 1..{input_dim}, got {dims}")
+        if method not in METHODS:
+            raise ValueError(f"Unknown projection method '{method}', expected one of {METHODS}")
+
+        if method == 'truncate':
+            return cls(np.zeros(input_dim), np.eye(input_dim)[:dims], method)
+
+        mean = vectors.mean(axis=0)
+        # rows of vt are the principal axes, ordered by explained variance
+        _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+        if vt.shape[0] < dims:
+            raise ValueError(f"PCA to {dims} dims needs at least {dims} vectors, got {len(vectors)}")
+        return cls(mean, vt[:dims], method)
+
+    def transform(self, vectors):
+        vectors = np.asarray(vectors, dtype='float32')
+        reduced = (vectors - self.mean) @ self.components.T
+        norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+        return reduced / np.maximum(norms, 1e-12)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez(f, mean=self.mean, components=self.components, method=self.method)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['mean'], data['components'], str(data['method']))
@@ -0,0 +1,359 @@
+"""
+Local RAG query service
+Loads the shared index and answer models once and serves search and answer
+requests from any number of local clients (Streamlit frontends, batch jobs,
+evaluation) over HTTP on localhost or a Unix socket.
+
+    GET  /health    process is up
+    GET  /ready     index and answer model are loaded (503 until then)
+    GET  /stats     admission, cache and latency metrics
+    POST /search    {"query": ..., "k": 5}
+    POST /answer    {"query": ..., "k": 5, "deadline_ms": null}
+
+At most `max_concurrency` requests run at once and up to `max_queue` more
+wait for a slot; beyond that, or after `queue_timeout` seconds of waiting,
+requests are rejected with 503 so clients can back off.
+
+Usage: python query_service.py [--host H] [--port P | --socket PATH]
+"""
+
+import http.client
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from search_executor import Busy
+from singleflight import SingleFlight, request_key
+
+class AdmissionControl:
+    def __init__(self, max_concurrency=4, max_queue=32, queue_timeout=30.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @contextmanager
+    def slot(self):
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise Busy("request queue is full")
+            self.waiting += 1
+
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self.waiting -= 1
+            if not acquired:
+                self.rejected += 1
+            else:
+                self.active += 1
+        if not acquired:
+            raise Busy("timed out waiting for a free slot")
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active': self.active,
+                'waiting': self.waiting,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+            }
+
+def _request_args(request):
+    """(query, keyword arguments) from a POST body; ValueError if malformed"""
+    if not isinstance(request, dict) or not isinstance(request.get('query'), str):
+        raise ValueError("expected a JSON object with a 'query' string")
+    unknown = set(request) - {'query', 'k', 'deadline_ms'}
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    args = {}
+    if 'k' in request:
+        k = request['k']
+        if isinstance(k, bool) or not isinstance(k, int) or k < 1:
+            raise ValueError("'k' must be a positive integer")
+        args['k'] = k
+    if request.get('deadline_ms') is not None:
+        deadline_ms = request['deadline_ms']
+        if isinstance(deadline_ms, bool) or not isinstance(deadline_ms, (int, float)) or deadline_ms <= 0:
+            raise ValueError("'deadline_ms' must be a positive number or null")
+        args['deadline_ms'] = deadline_ms
+    return request['query'], args
+
+def _public_results(results):
+    # token IDs are an ingest-time detail and would dominate the payload
+    return [
+        dict(r, chunk={key: value for key, value in r['chunk'].items() if key != 'token_ids'})
+        for r in results
+    ]
+
+class QueryService:
+    def __init__(self, index, answerer, llm=None, max_concurrency=4, max_queue=32, queue_timeout=30.0,
+                 flights=None, search_executor=None):
+        # index is anything with .current (an index_versions.IndexReloader),
+        # or a callable returning one; a callable is first called in load(),
+        # so a missing index shows up on /ready instead of at startup
+        self._index = index
+        self.answerer = answerer
+        self.llm = llm
+        self.admission = AdmissionControl(max_concurrency, max_queue, queue_timeout)
+        # identical concurrent requests share one computation (and one slot)
+        self.flights = flights or SingleFlight()
+        # optional search_executor.SearchExecutor bounding concurrent searches
+        self.search_executor = search_executor
+        self.started = time.time()
+        self.load_error = None
+        self._ready = threading.Event()
+
+    @property
+    def index(self):
+        if callable(self._index):
+            self._index = self._index()
+        return self._index
+
+    def load(self):
+        try:
+            self.index.current.vectorstore
+            if self.llm is not None:
+                self.llm.load()
+            self._ready.set()
+            print("Query service ready")
+        except Exception as e:
+            self.load_error = str(e)
+            print(f"Error loading models: {e}")
+        return self
+
+    def warm_up(self):
+        """Load the index and answer model in the background; /ready reports progress"""
+        threading.Thread(target=self.load, name='service-warm-up', daemon=True).start()
+        return self
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def search(self, query, k=5):
+        store = self.index.current
+        key = request_key('search', query, k, store.version)
+        return self.flights.do(key, self._search, store, query, k)
+
+    def _search(self, store, query, k):
+        with self.admission.slot():
+            results = self._run_search(store, query, k)
+        return {'results': _public_results(results), 'index_version': store.version}
+
+    def answer(self, query, k=5, deadline_ms=None):
+        store = self.index.current
+        key = request_key('answer', query, k, store.version)
+        return self.flights.do(key, self._answer, store, query, k, deadline_ms)
+
+    def _answer(self, store, query, k, deadline_ms):
+        with self.admission.slot():
+            results = self._run_search(store, query, k)
+            answer = self.answerer.generate_answer_with_citations(
+                query, results, index_version=store.version, deadline_ms=deadline_ms
+            )
+        return dict(answer, index_version=store.version)
+
+    def _run_search(self, store, query, k):
+        if self.search_executor is not None:
+            return self.search_executor.search(store, query, k)
+        return store.search(query, k=k)
+
+    def stats(self):
+        stats = {
+            'uptime_s': time.time() - self.started,
+            'ready': self.ready,
+            'index_version': self.index.current.version if self.ready else None,
+            'admission': self.admission.stats(),
+            'coalescing': self.flights.stats(),
+            'search': self.search_executor.stats() if self.search_executor else None,
+        }
+        for name, method in (('cache', 'stats'), ('routes', 'metrics')):
+            if hasattr(self.answerer, method):
+                stats[name] = getattr(self.answerer, method)()
+        if self.llm is not None:
+            stats['deadlines'] = self.llm.deadline_stats()
+            stats['batching'] = self.llm.batch_metrics()
+        return stats
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, {'status': 'ok'})
+            elif self.path == '/ready':
+                if service.ready:
+                    self._send(200, {'ready': True})
+                else:
+                    self._send(503, {'ready': False, 'error': service.load_error})
+            elif self.path == '/stats':
+                self._send(200, service.stats())
+            else:
+                self._send(404, {'error': f"unknown path {self.path}"})
+
+        def do_POST(self):
+            routes = {'/search': service.search, '/answer': service.answer}
+            if self.path not in routes:
+                self._send(404, {'error': f"unknown path {self.path}"})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                query, args = _request_args(json.loads(self.rfile.read(length) or b'{}'))
+            except ValueError as e:
+                self._send(400, {'error': str(e)})
+                return
+            if self.path == '/search':
+                args.pop('deadline_ms', None)
+            if not service.ready:
+                self._send(503, {'error': "service is still loading"})
+                return
+
+            try:
+                self._send(200, routes[self.path](query, **args))
+            except Busy as e:
+                self._send(503, {'error': str(e)})
+            except Exception as e:
+                print(f"Error handling {self.path}: {e}")
+                self._send(500, {'error': str(e)})
+
+    return Handler
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects an (address, port) client address
+        return request, ('local', 0)
+
+def make_server(service, host='127.0.0.1', port=8765, socket_path=None):
+    handler = make_handler(service)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return UnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+class QueryClient:
+    def __init__(self, host='127.0.0.1', port=8765, socket_path=None, timeout=120):
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _request(self, method, path, payload=None):
+        if self.socket_path:
+            conn = _UnixConnection(self.socket_path, self.timeout)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            body = json.dumps(payload) if payload is not None else None
+            conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            return response.status, json.loads(response.read() or b'{}')
+        finally:
+            conn.close()
+
+    def _call(self, method, path, payload=None):
+        status, result = self._request(method, path, payload)
+        if status != 200:
+            raise RuntimeError(f"{path} failed ({status}): {result.get('error')}")
+        return result
+
+    def health(self):
+        try:
+            return self._request('GET', '/health')[0] == 200
+        except OSError:
+            return False
+
+    def ready(self):
+        try:
+            return self._request('GET', '/ready')[0] == 200
+        except OSError:
+            return False
+
+    def stats(self):
+        return self._call('GET', '/stats')
+
+    def search(self, query, k=5):
+        return self._call('POST', '/search', {'query': query, 'k': k})['results']
+
+    def answer(self, query, k=5, deadline_ms=None):
+        return self._call('POST', '/answer', {'query': query, 'k': k, 'deadline_ms': deadline_ms})
+
+def main():
+    import argparse
+    import config
+    import model_registry
+
+    parser = argparse.ArgumentParser(description="Local RAG query service")
+    parser.add_argument('--host', default=config.SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=config.SERVICE_PORT)
+    parser.add_argument('--socket', default=config.SERVICE_SOCKET,
+                        help="serve on this Unix socket path instead of TCP")
+    parser.add_argument('--max-concurrency', type=int, default=config.SERVICE_MAX_CONCURRENCY)
+    parser.add_argument('--max-queue', type=int, default=config.SERVICE_MAX_QUEUE)
+    args = parser.parse_args()
+
+    service = QueryService(
+        # built in load(): a missing index is reported on /ready
+        model_registry.shared_index,
+        model_registry.shared_answerer(),
+        llm=model_registry.shared_llm(),
+        max_concurrency=args.max_concurrency,
+        max_queue=args.max_queue,
+        queue_timeout=config.SERVICE_QUEUE_TIMEOUT,
+        flights=model_registry.shared_singleflight(),
+        search_executor=model_registry.shared_search_executor()
+    ).warm_up()
+    server = make_server(service, args.host, args.port, args.socket)
+    print(f"Serving on {args.socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+if __name__ == "__main__":
+    main()
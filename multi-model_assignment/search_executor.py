@@ -0,0 +1,109 @@
+"""
+Bounded, backpressured execution of VectorStore searches
+Concurrent sessions share the CPU, so at most `max_concurrency` searches run
+at once and each runs with cpu_count // max_concurrency threads (or
+`faiss_threads`), so running searches do not oversubscribe the cores. The
+cap covers the FAISS search and, once torch is loaded, the query encoding:
+both use OpenMP, whose thread count is set on the thread that runs the
+search, not process-wide, so answer generation on other threads keeps its
+full torch pool.
+Excess searches queue for up to `queue_timeout` seconds (at most `max_queue`
+of them) and are then rejected with Busy.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from micro_batcher import percentile
+
+class Busy(Exception):
+    pass
+
+_thread_settings = threading.local()
+
+def configure_threads(faiss_threads):
+    """Set the FAISS and torch (OpenMP) thread counts for searches run by the calling thread"""
+    if getattr(_thread_settings, 'faiss_threads', None) != faiss_threads:
+        import faiss
+
+        faiss.omp_set_num_threads(faiss_threads)
+        _thread_settings.faiss_threads = faiss_threads
+    # torch is only capped once something (the embedding model) loaded it;
+    # importing it here would slow down searches that never encode
+    torch = sys.modules.get('torch')
+    if torch is not None and getattr(_thread_settings, 'torch_threads', None) != faiss_threads:
+        torch.set_num_threads(faiss_threads)
+        _thread_settings.torch_threads = faiss_threads
+
+class SearchExecutor:
+    def __init__(self, max_concurrency=None, max_queue=64, queue_timeout=5.0,
+                 faiss_threads=None):
+        cpus = os.cpu_count() or 1
+        self.max_concurrency = max_concurrency or max(1, min(4, cpus // 2))
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.faiss_threads = faiss_threads or max(1, cpus // self.max_concurrency)
+
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._waits = deque(maxlen=1000)
+        self._latencies = deque(maxlen=1000)
+
+    def search(self, store, query, k=5):
+        """store.search(query, k) once a slot is free; raises Busy under overload"""
+        enqueued = time.perf_counter()
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise Busy("search queue is full")
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        started = time.perf_counter()
+        with self._lock:
+            self.waiting -= 1
+            self._waits.append(started - enqueued)
+            if acquired:
+                self.active += 1
+            else:
+                self.timeouts += 1
+        if not acquired:
+            raise Busy(f"no search slot free after {self.queue_timeout:g}s")
+
+        try:
+            configure_threads(self.faiss_threads)
+            return store.search(query, k=k)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self._latencies.append(time.perf_counter() - started)
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            waits, latencies = list(self._waits), list(self._latencies)
+            return {
+                'max_concurrency': self.max_concurrency,
+                'threads_per_search': self.faiss_threads,
+                'active': self.active,
+                'queue_depth': self.waiting,
+                'peak_queue_depth': self.peak_waiting,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'wait_p50_ms': percentile(waits, 50) * 1000,
+                'wait_p99_ms': percentile(waits, 99) * 1000,
+                'latency_p50_ms': percentile(latencies, 50) * 1000,
+                'latency_p99_ms': percentile(latencies, 99) * 1000,
+            }
@@ -0,0 +1,181 @@
+"""
+Semantic answer cache for paraphrased questions
+Wraps a QA system (same *_with_citations interface) and keeps the query
+embeddings of answered questions in a small FAISS inner-product index. A new
+query whose embedding is within `threshold` cosine similarity of a cached
+one reuses that answer. Query embeddings come from the VectorStore's MiniLM
+encoder, so no extra model is loaded.
+
+False-hit diagnostics: every hit compares the chunks retrieved for the new
+query with those behind the cached answer; low overlap marks the hit as
+suspect (and, with reject_suspect, falls through to generation).
+
+Entries belong to one index version. A newer version empties the cache;
+requests still finishing on an older one during a reload neither read nor
+add entries, so they cannot wipe the newer version's.
+"""
+
+import threading
+from collections import deque
+
+from answer_cache import UNVERSIONED, is_newer_version
+from llm_qa import ERROR_ANSWER
+
+class SemanticCache:
+    def __init__(self, qa, encode_query, threshold=0.92, max_entries=1000,
+                 min_chunk_overlap=0.5, reject_suspect=True):
+        self.qa = qa
+        self.encode_query = encode_query
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.min_chunk_overlap = min_chunk_overlap
+        self.reject_suspect = reject_suspect
+
+        self.hits = 0
+        self.misses = 0
+        self.suspect_hits = 0
+        self.events = deque(maxlen=200)
+
+        self._lock = threading.Lock()
+        self._entries = []
+        self._index = None
+        self._index_version = None
+
+    def _rebuild(self):
+        import faiss
+        import numpy as np
+
+        self._index = None
+        if self._entries:
+            vectors = np.stack([entry['vector'] for entry in self._entries])
+            self._index = faiss.IndexFlatIP(vectors.shape[1])
+            self._index.add(vectors)
+
+    def _check_version(self, index_version):
+        # caller holds self._lock; False for a superseded version
+        index_version = index_version or UNVERSIONED
+        if index_version == self._index_version:
+            return True
+        if not is_newer_version(index_version, self._index_version):
+            return False
+        self._entries = []
+        self._index = None
+        self._index_version = index_version
+        return True
+
+    def _lookup(self, query, vector, search_results, index_version):
+        with self._lock:
+            if not self._check_version(index_version) or self._index is None:
+                self.misses += 1
+                return None
+            similarities, rows = self._index.search(vector[None], 1)
+            similarity, row = float(similarities[0][0]), int(rows[0][0])
+            if row < 0 or similarity < self.threshold:
+                self.misses += 1
+                self.events.append({'query': query, 'outcome': 'miss', 'similarity': similarity})
+                return None
+
+            entry = self._entries[row]
+            retrieved = {r['chunk'].get('chunk_id') for r in search_results}
+            union = retrieved | entry['chunk_ids']
+            overlap = len(retrieved & entry['chunk_ids']) / len(union) if union else 1.0
+            suspect = overlap < self.min_chunk_overlap
+            self.events.append({
+                'query': query,
+                'outcome': 'suspect' if suspect else 'hit',
+                'matched': entry['query'],
+                'similarity': similarity,
+                'chunk_overlap': overlap,
+            })
+            if suspect:
+                self.suspect_hits += 1
+                if self.reject_suspect:
+                    self.misses += 1
+                    return None
+            self.hits += 1
+            return dict(entry['result'], cached=True, semantic_match=entry['query'],
+                        similarity=similarity)
+
+    def _store(self, query, vector, search_results, result, index_version):
+        if (result.get('answer', '').endswith(ERROR_ANSWER) or result.get('deadline_fallback')
+                or result.get('deadline_limited')):
+            return
+        with self._lock:
+            if not self._check_version(index_version):
+                return
+            self._entries.append({
+                'query': query,
+                'vector': vector,
+                'chunk_ids': {r['chunk'].get('chunk_id') for r in search_results},
+                'result': result,
+            })
+            if len(self._entries) > self.max_entries:
+                del self._entries[:len(self._entries) - self.max_entries]
+                self._rebuild()
+            elif self._index is None:
+                self._rebuild()
+            else:
+                self._index.add(vector[None])
+
+    def _encode(self, query):
+        import numpy as np
+
+        return np.ascontiguousarray(self.encode_query(query), dtype='float32')
+
+    def generate_answer_with_citations(self, query, search_results, index_version=None, deadline_ms=None):
+        vector = self._encode(query)
+        cached = self._lookup(query, vector, search_results, index_version)
+        if cached is not None:
+            return cached
+
+        result = self.qa.generate_answer_with_citations(
+            query, search_results, index_version=index_version, deadline_ms=deadline_ms
+        )
+        self._store(query, vector, search_results, result, index_version)
+        return result
+
+    def stream_answer_with_citations(self, query, search_results, index_version=None, deadline_ms=None):
+        vector = self._encode(query)
+        cached = self._lookup(query, vector, search_results, index_version)
+        if cached is not None:
+            answer = cached.pop('answer')
+            return dict(cached, answer_stream=iter([answer]))
+
+        result = self.qa.stream_answer_with_citations(
+            query, search_results, index_version=index_version, deadline_ms=deadline_ms
+        )
+        stream = result.pop('answer_stream')
+
+        def record():
+            pieces = []
+            for text in stream:
+                pieces.append(text)
+                yield text
+            self._store(query, vector, search_results,
+                        dict(result, answer="".join(pieces).strip()), index_version)
+
+        return dict(result, answer_stream=record())
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            hit_similarities = [e['similarity'] for e in self.events if e['outcome'] == 'hit']
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'suspect_hits': self.suspect_hits,
+                'suspect_rate': self.suspect_hits / (self.hits + self.suspect_hits)
+                                if self.hits + self.suspect_hits else 0.0,
+                'min_hit_similarity': min(hit_similarities) if hit_similarities else None,
+            }
+
+    def recent_events(self, outcome=None):
+        with self._lock:
+            return [e for e in self.events if outcome is None or e['outcome'] == outcome]
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._index = None
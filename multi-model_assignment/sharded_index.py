@@ -0,0 +1,154 @@
+"""
+Sharded exact-search index with scatter-gather queries
+Each shard holds a slice of the corpus vectors in its own FAISS index and is
+reached through a transport: ProcessTransport runs it in a worker process,
+LocalTransport is an in-process stand-in with the same interface.
+"""
+
+import heapq
+import multiprocessing as mp
+import threading
+
+class ShardServer:
+    """Flat L2 index over one slice of the corpus, keyed by global row id"""
+
+    def __init__(self, vectors, ids, threads=None):
+        import faiss
+        import numpy as np
+
+        if threads is not None:
+            faiss.omp_set_num_threads(threads)
+        vectors = np.ascontiguousarray(vectors, dtype='float32')
+        self.ids = np.asarray(ids, dtype='int64')
+        self.index = faiss.IndexFlatL2(vectors.shape[1])
+        self.index.add(vectors)
+
+    def search(self, queries, k):
+        k = min(k, self.index.ntotal)
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+        distances, rows = self.index.search(queries, k)
+        return [
+            [(float(d), int(self.ids[r])) for d, r in zip(dist_row, row) if r != -1]
+            for dist_row, row in zip(distances, rows)
+        ]
+
+class LocalTransport:
+    """Serves a shard from the calling process (single-box stand-in)"""
+
+    def __init__(self, vectors, ids, threads=None):
+        # shares the caller's FAISS thread pool, so `threads` is not applied
+        self.server = ShardServer(vectors, ids)
+        self._pending = None
+
+    def submit(self, queries, k):
+        self._pending = self.server.search(queries, k)
+
+    def result(self):
+        result, self._pending = self._pending, None
+        return result
+
+    def close(self):
+        self.server = None
+
+def _shard_worker(conn, vectors, ids, threads):
+    server = ShardServer(vectors, ids, threads)
+    conn.send('ready')
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        queries, k = message
+        try:
+            conn.send(('ok', server.search(queries, k)))
+        except Exception as e:
+            conn.send(('error', repr(e)))
+    conn.close()
+
+class ProcessTransport:
+    """Serves a shard from a dedicated worker process over a pipe"""
+
+    def __init__(self, vectors, ids, threads=1):
+        # spawn, not fork: the parent usually has torch threads running
+        ctx = mp.get_context('spawn')
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_shard_worker,
+            args=(child_conn, vectors, ids, threads),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        if self.conn.recv() != 'ready':
+            raise RuntimeError("Shard worker failed to start")
+
+    def submit(self, queries, k):
+        self.conn.send((queries, k))
+
+    def result(self):
+        status, payload = self.conn.recv()
+        if status != 'ok':
+            raise RuntimeError(f"Shard search failed: {payload}")
+        return payload
+
+    def close(self):
+        if self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.conn.close()
+
+TRANSPORTS = {
+    'process': ProcessTransport,
+    'local': LocalTransport,
+}
+
+class ShardedIndex:
+    def __init__(self, vectors, num_shards, transport='process', threads_per_shard=1):
+        import numpy as np
+
+        vectors = np.ascontiguousarray(vectors, dtype='float32')
+        num_shards = max(1, min(num_shards, len(vectors)))
+        transport_cls = TRANSPORTS[transport]
+
+        self.dimension = vectors.shape[1]
+        self.ntotal = len(vectors)
+        # one request/reply round per shard at a time: each transport has a
+        # single pipe (or pending slot), so overlapping searches from
+        # different threads would read each other's replies
+        self._lock = threading.Lock()
+        self.shards = []
+        try:
+            for ids in np.array_split(np.arange(len(vectors)), num_shards):
+                self.shards.append(transport_cls(vectors[ids], ids, threads_per_shard))
+        except Exception:
+            self.close()
+            raise
+
+        print(f"Sharded index: {self.ntotal} vectors across {len(self.shards)} {transport} shards")
+
+    def search(self, queries, k):
+        """Return, per query row, the k best (distance, global_row) pairs"""
+        import numpy as np
+
+        queries = np.ascontiguousarray(queries, dtype='float32').reshape(-1, self.dimension)
+
+        # scatter to every shard before gathering so the shards work in parallel
+        with self._lock:
+            for shard in self.shards:
+                shard.submit(queries, k)
+            partials = [shard.result() for shard in self.shards]
+
+        return [
+            heapq.nsmallest(k, (hit for partial in partials for hit in partial[q]))
+            for q in range(len(queries))
+        ]
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        self.shards = []
@@ -0,0 +1,93 @@
+"""
+Single-flight coalescing of identical concurrent requests
+The first caller for a key (the leader) computes the result; callers that
+arrive with the same key while it is in flight wait for and share that
+result instead of repeating the work. Nothing is cached once the call
+completes, since the answer and semantic caches cover that.
+"""
+
+import copy
+import threading
+from concurrent.futures import Future
+
+from answer_cache import normalize_query
+
+def request_key(kind, query, *parts):
+    return (kind, normalize_query(query)) + tuple(parts)
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def claim(self, key):
+        """
+        Return (future, leader). The leader must call finish(key, ...) when
+        done; everyone else waits on the future.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.executed += 1
+            return future, True
+
+    def finish(self, key, result=None, error=None):
+        with self._lock:
+            future = self._calls.pop(key, None)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, *args, timeout=None, **kwargs):
+        future, leader = self.claim(key)
+        if not leader:
+            # callers may modify what they get back
+            return copy.copy(future.result(timeout))
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            requests = self.executed + self.coalesced
+            return {
+                'in_flight': len(self._calls),
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'coalesced_share': self.coalesced / requests if requests else 0.0,
+            }
+
+def publish_stream(flights, key, result):
+    """
+    Leader side of a streamed answer: wraps result['answer_stream'] so the
+    callers waiting on `key` get the complete answer once it has streamed
+    """
+    stream = result.pop('answer_stream')
+
+    def relay():
+        pieces = []
+        completed = False
+        try:
+            for text in stream:
+                pieces.append(text)
+                yield text
+            completed = True
+        finally:
+            if completed:
+                flights.finish(key, dict(result, answer="".join(pieces).strip()))
+            else:
+                flights.finish(key, error=RuntimeError("the shared answer did not complete"))
+
+    return dict(result, answer_stream=relay())
@@ -0,0 +1,59 @@
+"""
+Tests for binary_index.py
+Run with: python -m pytest test_binary_index.py
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from binary_index import BinaryIndex, _POPCOUNT, pack_signs, popcount
+
+def _corpus(seed=0, rows=2000, dims=64):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((rows, dims)).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def _exact(vectors, query, k):
+    distances = ((vectors - query) ** 2).sum(axis=1)
+    rows = np.argsort(distances)[:k]
+    return [(float(distances[row]), int(row)) for row in rows]
+
+def test_hamming_distance_counts_differing_signs():
+    codes = pack_signs(np.array([[1.0, -1.0, 1.0, 1.0, -1.0, -1.0, 1.0, 1.0, 1.0]]))
+    assert codes.shape == (1, 2)
+    index = BinaryIndex(np.array([[1.0] * 9, [-1.0] * 9], dtype='float32'))
+    assert list(index.hamming(np.array([1.0, -1.0, 1.0, 1.0, -1.0, -1.0, 1.0, 1.0, 1.0]))) == [3, 6]
+    packed = np.arange(256, dtype='uint8').reshape(16, 16)
+    assert list(popcount(packed)) == list(_POPCOUNT[packed].sum(axis=1))
+
+def test_scanning_every_candidate_is_exact_search():
+    vectors = _corpus()
+    index = BinaryIndex(vectors)
+    for query in vectors[:5] + 0.01:
+        query = query / np.linalg.norm(query)
+        got = index.search(query, 10, candidates=index.ntotal)
+        expected = _exact(vectors, query, 10)
+        assert [row for _, row in got] == [row for _, row in expected]
+        np.testing.assert_allclose([d for d, _ in got], [d for d, _ in expected], atol=1e-5)
+
+def test_prefilter_finds_most_exact_neighbours():
+    vectors = _corpus(seed=1)
+    index = BinaryIndex(vectors)
+    rng = np.random.default_rng(2)
+    recall = []
+    for row in rng.choice(len(vectors), 20, replace=False):
+        # a paraphrase-like query close to a stored vector
+        query = vectors[row] + 0.3 * rng.standard_normal(vectors.shape[1]).astype('float32') / 8
+        query /= np.linalg.norm(query)
+        got = {r for _, r in index.search(query, 10, candidates=200)}
+        expected = {r for _, r in _exact(vectors, query, 10)}
+        assert row in got
+        recall.append(len(got & expected) / 10)
+    # random 64-dim data is a hard case for 64-bit codes
+    assert np.mean(recall) >= 0.7
+
+def test_search_handles_small_and_empty_indexes():
+    vectors = _corpus(rows=3)
+    assert len(BinaryIndex(vectors).search(vectors[0], 10)) == 3
+    assert BinaryIndex(np.zeros((0, 64), dtype='float32')).search(vectors[0], 5) == []
@@ -0,0 +1,62 @@
+"""
+Tests for context_compressor.py
+Run with: python -m pytest test_context_compressor.py
+"""
+
+from context_compressor import ContextCompressor
+
+class _Scorer:
+    """Fixed per-sentence scores instead of embeddings"""
+
+    def __init__(self, scored):
+        self.scored = scored
+
+    def score_with_tokens(self, query, chunks):
+        return self.scored
+
+def _chunks(count):
+    return [{'chunk_id': i, 'source': f'Page {i + 1}', 'content': 'full text',
+             'token_ids': {'t5': [9] * 50}} for i in range(count)]
+
+def test_best_sentences_fill_the_budget_in_chunk_order():
+    scorer = _Scorer([
+        (["Oil output was flat.", "GDP grew 2.4 percent."], [0.2, 0.9], {}),
+        (["Inflation eased to 3 percent.", "GDP growth will pick up."], [0.5, 0.8], {}),
+    ])
+    compressed, stats = ContextCompressor(scorer, max_tokens=9).compress("GDP growth?", _chunks(2))
+
+    # 4 + 5 words fit; the 0.5 sentence (5 words) no longer does
+    assert [chunk['content'] for chunk in compressed] == ["GDP grew 2.4 percent.", "GDP growth will pick up."]
+    assert stats == {'sentences_total': 4, 'sentences_kept': 2, 'compressed_tokens': 9}
+    # positions and metadata survive; full-text token IDs do not
+    assert [chunk['chunk_id'] for chunk in compressed] == [0, 1]
+    assert all('token_ids' not in chunk for chunk in compressed)
+
+def test_kept_sentences_stay_in_document_order():
+    scorer = _Scorer([(["First fact here.", "Second fact here.", "Third fact here."], [0.7, 0.1, 0.9], {})])
+    compressed, _ = ContextCompressor(scorer, max_tokens=6).compress("q", _chunks(1))
+    assert compressed[0]['content'] == "First fact here. Third fact here."
+
+def test_stored_sentence_ids_set_the_cost_and_replace_the_chunk_ids():
+    scorer = _Scorer([
+        (["GDP grew 2.4 percent.", "Oil output was flat."], [0.9, 0.8], {'t5': [[1, 2, 3], [4, 5, 6, 7]]}),
+    ])
+    counted = []
+    compressed, stats = ContextCompressor(scorer, max_tokens=5).compress(
+        "q", _chunks(1), count_tokens=counted.append, tokenizer_name='t5'
+    )
+    assert counted == []
+    assert compressed[0]['content'] == "GDP grew 2.4 percent."
+    assert compressed[0]['token_ids'] == {'t5': [1, 2, 3]}
+    assert stats['compressed_tokens'] == 3
+
+def test_min_score_drops_weak_sentences_within_budget():
+    scorer = _Scorer([(["Relevant sentence.", "Unrelated sentence."], [0.8, 0.1], {})])
+    compressed, stats = ContextCompressor(scorer, max_tokens=100, min_score=0.3).compress("q", _chunks(1))
+    assert compressed[0]['content'] == "Relevant sentence."
+    assert stats['sentences_kept'] == 1
+
+def test_chunk_with_nothing_kept_is_empty():
+    scorer = _Scorer([(["A very long sentence that does not fit."], [0.9], {}), ([], [], {})])
+    compressed, _ = ContextCompressor(scorer, max_tokens=3).compress("q", _chunks(2))
+    assert [chunk['content'] for chunk in compressed] == ["", ""]
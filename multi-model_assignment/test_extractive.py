@@ -0,0 +1,80 @@
+"""
+Tests for extractive.py
+Run with: python -m pytest test_extractive.py
+"""
+
+import pytest
+
+from extractive import SentenceScorer, split_sentences
+
+def test_split_sentences_joins_pdf_line_breaks():
+    text = ("Real GDP growth is projected to\nmoderate to 2.4 percent in 2024.\n"
+            "Mmes. Oksana Ament and Esther George provided\neditorial support.\n\n"
+            "Inflation has declined further (see Fig. 3) this year.")
+    assert split_sentences(text) == [
+        "Real GDP growth is projected to moderate to 2.4 percent in 2024.",
+        "Mmes. Oksana Ament and Esther George provided editorial support.",
+        "Inflation has declined further (see Fig. 3) this year.",
+    ]
+
+def test_split_sentences_keeps_short_text_whole():
+    assert split_sentences("GDP: 2.4%") == ["GDP: 2.4%"]
+    assert split_sentences("   ") == []
+
+WORDS = ['gdp', 'growth', 'inflation', 'oil', 'gas', 'fiscal']
+
+class _BagOfWords:
+    """Unit vectors over a tiny vocabulary, so cosine scores are predictable"""
+
+    def __init__(self):
+        self.embedded = []
+
+    def _vector(self, text):
+        import numpy as np
+
+        words = text.lower().replace('.', ' ').replace('?', ' ').split()
+        vector = np.array([words.count(word) for word in WORDS], dtype='float32') + 1e-3
+        return vector / np.linalg.norm(vector)
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+    def embed_documents(self, texts):
+        self.embedded += texts
+        return [self._vector(text) for text in texts]
+
+def test_best_sentence_picks_the_most_similar_sentence():
+    pytest.importorskip('numpy')
+    embeddings = _BagOfWords()
+    scorer = SentenceScorer(embeddings)
+    chunks = [
+        {'content': "Fiscal revenue depends on oil and gas. Spending was restrained this year."},
+        {'content': "Inflation eased during the year. GDP growth was strong in the second half."},
+    ]
+    score, index, sentence = scorer.best_sentence("What was GDP growth?", chunks)
+    assert (index, sentence) == (1, "GDP growth was strong in the second half.")
+    assert score > 0.9
+
+    # sentence vectors are cached per chunk text
+    embedded = len(embeddings.embedded)
+    scorer.best_sentence("What about inflation?", chunks)
+    assert len(embeddings.embedded) == embedded
+
+def test_ingest_time_sentences_are_used_when_available():
+    np = pytest.importorskip('numpy')
+    embeddings = _BagOfWords()
+    stored = (["Oil output was flat."], np.stack(embeddings.embed_documents(["oil"])), {'t5': [[1, 2]]})
+    embeddings.embedded = []
+    scorer = SentenceScorer(embeddings, lookup=lambda chunk: stored if chunk['chunk_id'] == 1 else None)
+
+    results = scorer.score_with_tokens("oil", [{'chunk_id': 1, 'content': "not split"}])
+    assert embeddings.embedded == []
+    sentences, scores, token_ids = results[0]
+    assert sentences == ["Oil output was flat."] and token_ids == {'t5': [[1, 2]]}
+    assert float(scores[0]) == pytest.approx(1.0, abs=1e-3)
+
+def test_chunks_without_sentences_score_nothing():
+    pytest.importorskip('numpy')
+    scorer = SentenceScorer(_BagOfWords())
+    assert scorer.best_sentence("GDP?", [{'content': "   "}]) == (float('-inf'), None, None)
+    assert scorer.best_sentence("GDP?", []) == (float('-inf'), None, None)
@@ -0,0 +1,119 @@
+"""
+Tests for index_versions.py
+Run with: python -m pytest test_index_versions.py
+"""
+
+import os
+import time
+
+import pytest
+
+import index_versions
+
+def _write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+class _FakeStore:
+    """Stands in for a VectorStore: a snapshot is a text file with its chunks"""
+
+    def __init__(self):
+        self.version = None
+        self.chunks = None
+        self.closed = False
+
+    def with_shared_models(self):
+        return _FakeStore()
+
+    def load(self, filepath):
+        prefix, self.version = index_versions.resolve(filepath)
+        self.chunks = _read(os.path.join(prefix, 'index.faiss')).split(',')
+
+    @property
+    def vectorstore(self):
+        return self.chunks
+
+    def close(self):
+        self.closed = True
+
+def _publish(filepath, chunks, keep=3):
+    def write_snapshot(prefix):
+        os.makedirs(prefix)
+        _write(os.path.join(prefix, 'index.faiss'), ','.join(chunks))
+
+    return index_versions.publish(filepath, write_snapshot, keep=keep)
+
+def test_publish_switches_the_current_version_and_prunes(tmp_path):
+    filepath = str(tmp_path / 'faiss_index')
+    assert not index_versions.index_exists(filepath)
+
+    versions = [_publish(filepath, [f'chunk-{i}'], keep=2) for i in range(3)]
+    assert versions == sorted(versions)
+    assert index_versions.current_version(filepath) == versions[-1]
+    assert index_versions.list_versions(filepath) == versions[1:]
+    assert index_versions.index_exists(filepath)
+
+    store = _FakeStore()
+    store.load(filepath)
+    assert store.version == versions[-1]
+    assert store.chunks == ['chunk-2']
+
+def test_failed_publish_leaves_the_current_version(tmp_path):
+    filepath = str(tmp_path / 'faiss_index')
+    version = _publish(filepath, ['a'])
+
+    def broken(prefix):
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        index_versions.publish(filepath, broken)
+    assert index_versions.current_version(filepath) == version
+    assert index_versions.list_versions(filepath) == [version]
+
+def test_reloader_swaps_in_new_versions_and_keeps_the_old_one_for_readers(tmp_path):
+    filepath = str(tmp_path / 'faiss_index')
+    _publish(filepath, ['a'])
+    store = _FakeStore()
+    store.load(filepath)
+    swapped = []
+    reloader = index_versions.IndexReloader(store, filepath, grace_period=0.05, on_swap=swapped.append)
+
+    assert not reloader.check()
+    held = reloader.current
+    version = _publish(filepath, ['a', 'b'])
+    assert reloader.check()
+    assert reloader.version == version
+    assert reloader.current.chunks == ['a', 'b']
+    assert swapped == [reloader.current]
+    # a reader that grabbed the old store can finish with it
+    assert held.chunks == ['a'] and not held.closed
+    time.sleep(0.2)
+    assert held.closed
+
+def test_reloader_keeps_serving_when_a_version_fails_to_load(tmp_path):
+    filepath = str(tmp_path / 'faiss_index')
+    _publish(filepath, ['a'])
+    store = _FakeStore()
+    store.load(filepath)
+    reloader = index_versions.IndexReloader(store, filepath)
+
+    version = _publish(filepath, ['b'])
+    os.remove(os.path.join(index_versions.snapshot_prefix(filepath, version), 'index.faiss'))
+    assert not reloader.check()
+    assert reloader.current is store
+    assert reloader.last_error is not None
+
+def test_version_names_are_utc(tmp_path, monkeypatch):
+    # local names repeat an hour when DST ends, so later versions could sort first
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    try:
+        monkeypatch.setattr(time, 'time', lambda: 1_793_500_200.25)
+        assert index_versions._new_version(str(tmp_path)) == '20261101-023000-250000'
+    finally:
+        monkeypatch.undo()
+        time.tzset()
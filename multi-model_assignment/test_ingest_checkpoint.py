@@ -0,0 +1,30 @@
+"""
+Tests for ingest_checkpoint.py
+Run with: python -m pytest test_ingest_checkpoint.py
+"""
+
+from ingest_checkpoint import IngestCheckpoint, chunk_key, page_positions
+
+def test_chunk_key_tells_identical_chunks_on_a_page_apart():
+    caption = {'page': 3, 'type': 'image', 'source': 'Page 3', 'content': 'Source: IMF staff'}
+    chunks = [caption, dict(caption), dict(caption, page=4)]
+    keys = [chunk_key(chunk, position) for position, chunk in page_positions(chunks)]
+    assert len(set(keys)) == 3
+    # positions restart on every page, so keys do not depend on earlier pages
+    assert keys[2] == chunk_key(dict(caption, page=4), 0)
+
+def test_checkpoint_pages_survive_a_torn_last_line(tmp_path):
+    checkpoint = IngestCheckpoint(str(tmp_path / 'checkpoint'))
+    checkpoint.reset({'pdf': 'abc'})
+    checkpoint.record_page(0, [{'page': 1, 'content': 'GDP grew.'}])
+    checkpoint.record_page(1, [])
+    with open(checkpoint.pages_path, 'a', encoding='utf-8') as f:
+        f.write('{"page": 2, "chu')
+
+    assert checkpoint.cached_pages() == {0: [{'page': 1, 'content': 'GDP grew.'}], 1: []}
+    assert checkpoint.matches({'pdf': 'abc'})
+    assert not checkpoint.matches({'pdf': 'other'})
+
+    checkpoint.clear()
+    assert checkpoint.load_state() is None
+    assert checkpoint.cached_pages() == {}
@@ -0,0 +1,46 @@
+"""
+Tests for micro_batcher.py
+Run with: python -m pytest test_micro_batcher.py
+"""
+
+import pytest
+
+from micro_batcher import MicroBatcher
+
+def test_micro_batcher_groups_concurrent_items():
+    sizes = []
+
+    def batch_fn(items):
+        sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=50)
+    try:
+        futures = [batcher.submit(i) for i in range(10)]
+        assert [future.result(5) for future in futures] == [i * 2 for i in range(10)]
+    finally:
+        batcher.close()
+    assert max(sizes) <= 4
+    assert sum(sizes) == 10
+    assert len(sizes) < 10
+
+def test_micro_batcher_fails_every_item_of_a_failed_batch():
+    def batch_fn(items):
+        raise ValueError("model crashed")
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=20)
+    try:
+        futures = [batcher.submit(i) for i in range(3)]
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result(5)
+    finally:
+        batcher.close()
+
+def test_micro_batcher_rejects_wrong_output_count():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=1)
+    try:
+        with pytest.raises(RuntimeError):
+            batcher.run('x', timeout=5)
+    finally:
+        batcher.close()
@@ -0,0 +1,68 @@
+"""
+Tests for model_registry.py
+Run with: python -m pytest test_model_registry.py
+"""
+
+import gc
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from model_registry import Holder, ModelRegistry
+
+class _Model:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+def test_registry_loads_each_key_once_under_concurrency():
+    registry = ModelRegistry()
+    loads = []
+
+    def factory():
+        loads.append(1)
+        time.sleep(0.05)
+        return _Model()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        models = list(pool.map(lambda _: registry.acquire(('llm', 'flan-t5'), factory), range(8)))
+    assert len(loads) == 1
+    assert all(model is models[0] for model in models)
+
+def test_registry_evicts_only_models_no_holder_uses():
+    registry = ModelRegistry()
+    model = registry.acquire(('llm', 'flan-t5'), _Model)
+    unheld = registry.acquire(('embeddings', 'minilm'), _Model)
+    first, second = Holder(), Holder()
+    registry.hold(first, model)
+    registry.hold(second, model)
+    assert registry.stats()[('llm', 'flan-t5')]['refs'] == 2
+
+    assert not registry.evict(('llm', 'flan-t5'))
+    registry.release(first)
+    assert registry.evict_unused() == []
+
+    # a holder that is garbage collected (e.g. an expired session) releases too
+    del second
+    gc.collect()
+    assert registry.evict_unused() == [('llm', 'flan-t5')]
+    assert model.closed
+    # never held, so never evicted as unused
+    assert ('embeddings', 'minilm') in registry.stats()
+    assert not unheld.closed
+
+def test_registry_retries_a_failed_load():
+    registry = ModelRegistry()
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("download failed")
+        return _Model()
+
+    with pytest.raises(OSError):
+        registry.acquire(('llm', 'flan-t5'), factory)
+    assert isinstance(registry.acquire(('llm', 'flan-t5'), factory), _Model)
@@ -0,0 +1,86 @@
+"""
+Tests for pipeline.py
+Run with: python -m pytest test_pipeline.py
+"""
+
+import os
+
+import pytest
+
+from pipeline import Pipeline, Stage
+
+def _write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def _two_stage_pipeline(tmp_path, runs, fail_extract=False):
+    source = str(tmp_path / 'doc.txt')
+    extracted = str(tmp_path / 'extracted.txt')
+    merged = str(tmp_path / 'merged.txt')
+
+    def extract():
+        runs.append('extract')
+        if fail_extract:
+            raise RuntimeError("extraction failed")
+        _write(extracted, _read(source).upper())
+
+    def merge():
+        runs.append('merge')
+        _write(merged, _read(extracted) + '!')
+
+    return Pipeline([
+        Stage('extract', extract, inputs=[source], outputs=[extracted]),
+        Stage('merge', merge, inputs=[extracted], outputs=[merged]),
+    ], str(tmp_path / 'state.json')), source, merged
+
+def test_pipeline_skips_stages_whose_inputs_did_not_change(tmp_path):
+    runs = []
+    pipeline, source, merged = _two_stage_pipeline(tmp_path, runs)
+    _write(source, 'qatar')
+
+    report = pipeline.run()
+    assert [report[name]['status'] for name in ('extract', 'merge')] == ['ran', 'ran']
+    assert _read(merged) == 'QATAR!'
+
+    report = pipeline.run()
+    assert [report[name]['status'] for name in ('extract', 'merge')] == ['skipped', 'skipped']
+    assert runs == ['extract', 'merge']
+
+def test_pipeline_reruns_downstream_of_a_changed_input(tmp_path):
+    runs = []
+    pipeline, source, merged = _two_stage_pipeline(tmp_path, runs)
+    _write(source, 'qatar')
+    pipeline.run()
+
+    _write(source, 'doha')
+    report = pipeline.run()
+    assert report['extract']['status'] == 'ran'
+    assert report['merge']['status'] == 'ran'
+    assert _read(merged) == 'DOHA!'
+
+    os.remove(merged)
+    report = pipeline.run(targets=['merge'])
+    assert report['extract']['status'] == 'skipped'
+    assert report['merge']['status'] == 'ran'
+
+def test_pipeline_blocks_stages_after_a_failure(tmp_path):
+    runs = []
+    pipeline, source, _ = _two_stage_pipeline(tmp_path, runs, fail_extract=True)
+    _write(source, 'qatar')
+
+    report = pipeline.run()
+    assert report['extract']['status'] == 'failed'
+    assert report['merge']['status'] == 'blocked'
+    assert runs == ['extract']
+
+def test_pipeline_rejects_cycles(tmp_path):
+    a, b = str(tmp_path / 'a'), str(tmp_path / 'b')
+    with pytest.raises(ValueError):
+        Pipeline([
+            Stage('first', lambda: None, inputs=[b], outputs=[a]),
+            Stage('second', lambda: None, inputs=[a], outputs=[b]),
+        ], str(tmp_path / 'state.json'))
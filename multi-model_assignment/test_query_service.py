@@ -0,0 +1,96 @@
+"""
+Tests for query_service.py
+Run with: python -m pytest test_query_service.py
+"""
+
+import threading
+import time
+
+import pytest
+
+from query_service import AdmissionControl, _request_args
+from search_executor import Busy
+
+def test_request_args_accepts_a_query_with_options():
+    assert _request_args({'query': 'q'}) == ('q', {})
+    assert _request_args({'query': 'q', 'k': 3, 'deadline_ms': 250.5}) == (
+        'q', {'k': 3, 'deadline_ms': 250.5}
+    )
+    assert _request_args({'query': 'q', 'deadline_ms': None}) == ('q', {})
+
+@pytest.mark.parametrize('request_body', [
+    [],
+    'q',
+    {},
+    {'query': 3},
+    {'query': 'q', 'top_k': 3},
+    {'query': 'q', 'k': 0},
+    {'query': 'q', 'k': '3'},
+    {'query': 'q', 'k': 2.5},
+    {'query': 'q', 'k': True},
+    {'query': 'q', 'deadline_ms': 0},
+    {'query': 'q', 'deadline_ms': '100'},
+    {'query': 'q', 'deadline_ms': False},
+])
+def test_request_args_rejects_malformed_bodies(request_body):
+    with pytest.raises(ValueError):
+        _request_args(request_body)
+
+def _hold_slot(admission, entered, release):
+    with admission.slot():
+        entered.set()
+        release.wait(5)
+
+def _wait_for_waiting(admission, waiting):
+    for _ in range(200):
+        if admission.stats()['waiting'] == waiting:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"expected {waiting} waiting requests")
+
+def test_admission_rejects_beyond_its_queue():
+    admission = AdmissionControl(max_concurrency=1, max_queue=1, queue_timeout=5)
+    entered, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=_hold_slot, args=(admission, entered, release))
+    holder.start()
+    assert entered.wait(5)
+    waiter = threading.Thread(target=_hold_slot, args=(admission, threading.Event(), release))
+    waiter.start()
+    _wait_for_waiting(admission, 1)
+
+    with pytest.raises(Busy, match="queue is full"):
+        with admission.slot():
+            pass
+
+    release.set()
+    holder.join(5)
+    waiter.join(5)
+    stats = admission.stats()
+    assert (stats['active'], stats['waiting'], stats['completed'], stats['rejected']) == (0, 0, 2, 1)
+
+def test_admission_times_out_waiting_for_a_slot():
+    admission = AdmissionControl(max_concurrency=1, max_queue=4, queue_timeout=0.05)
+    entered, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=_hold_slot, args=(admission, entered, release))
+    holder.start()
+    assert entered.wait(5)
+
+    with pytest.raises(Busy, match="timed out"):
+        with admission.slot():
+            pass
+
+    release.set()
+    holder.join(5)
+    stats = admission.stats()
+    assert (stats['active'], stats['waiting'], stats['rejected']) == (0, 0, 1)
+
+def test_admission_frees_the_slot_when_the_request_fails():
+    admission = AdmissionControl(max_concurrency=1, max_queue=1, queue_timeout=0.05)
+
+    with pytest.raises(RuntimeError):
+        with admission.slot():
+            raise RuntimeError("search failed")
+
+    with admission.slot():
+        pass
+    assert admission.stats()['completed'] == 2
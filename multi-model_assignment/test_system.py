@@ -72,7 +72,7 @@ def test_qa_system(results, query):
     # Try LLM-based QA first
     try:
         print("Attempting to use LLM-based QA (Flan-T5)...")
-        qa = LLMQA(model_name=config.LLM_MODEL)
+        qa = LLMQA(model_name=config.LLM_MODEL, lazy=False)
         result = qa.generate_answer_with_citations(query, results)
         print("✓ LLM-based QA successful")
         
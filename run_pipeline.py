@@ -1,34 +1,166 @@
-import subprocess
-import sys
+"""
+Runs the ingestion pipeline in-process as a DAG of cached stages
+
+    directories -> extract_text ---\
+                -> extract_tables --+-> merge_chunks -> embed
+                -> extract_images -/
+
+The three extraction stages run concurrently, each in its own process
+(PyMuPDF must not be used from several threads at once). Stages whose inputs (the PDF,
+their code, config values) have not changed since their last run are
+skipped; see pipeline.py.
+
+With --streaming the extraction and embed stages are replaced by a single
+`ingest` stage that overlaps them (streaming_ingest.py). It checkpoints
+as it goes, so rerunning after a crash resumes where it stopped:
+
+    directories -> ingest
+
+Usage: python run_pipeline.py [--force] [--only STAGE ...] [--workers N] [--streaming]
+"""
+
+import argparse
+import json
+import multiprocessing
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+from pipeline import Pipeline, Stage
+
+TEXT_PATH = os.path.join(config.PROCESSED_DATA_DIR, 'text_chunks.json')
+TABLES_PATH = os.path.join(config.PROCESSED_DATA_DIR, 'table_chunks.json')
+IMAGES_PATH = os.path.join(config.PROCESSED_DATA_DIR, 'image_chunks.json')
+STATE_PATH = os.path.join(config.PROCESSED_DATA_DIR, 'pipeline_state.json')
+
+def _code(module):
+    return os.path.join(config.BASE_DIR, module)
+
+def _write_json(path, chunks):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(chunks, f, indent=2, ensure_ascii=False)
+
+def _extract_in_process(method, path):
+    from document_processor import DocumentProcessor
+
+    processor = DocumentProcessor(config.PDF_PATH)
+    try:
+        chunks = getattr(processor, method)()
+    finally:
+        processor.close()
+    _write_json(path, chunks)
+    return len(chunks)
+
+def _extract(method, path):
+    # the pipeline runs stages on threads, but PyMuPDF is not thread-safe,
+    # so the extraction itself happens in a fresh (spawned) process
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        count = pool.submit(_extract_in_process, method, path).result()
+    print(f"{method}: {count} chunks")
 
-def run_command(command, description):
-    result = subprocess.run(command, shell=True)
-    
-    if result.returncode != 0:
-        print(f"\nError")
-        return False
-    
-    print(f"\nCompleted")
-    return True
+def extract_text():
+    _extract('extract_text_chunks', TEXT_PATH)
+
+def extract_tables():
+    _extract('extract_tables', TABLES_PATH)
+
+def extract_images():
+    _extract('extract_images_with_ocr', IMAGES_PATH)
+
+def merge_chunks():
+    # same order as DocumentProcessor.process_document
+    chunks = []
+    for path in (TEXT_PATH, TABLES_PATH, IMAGES_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            chunks += json.load(f)
+    print(f"Total chunks: {len(chunks)}")
+    _write_json(config.CHUNKS_PATH, chunks)
+
+def embed():
+    import create_embeddings
+
+    create_embeddings.main()
+
+def ingest_streaming():
+    import streaming_ingest
+
+    streaming_ingest.main()
+
+def build_pipeline(streaming=False):
+    from index_versions import POINTER_NAME, versions_dir
+
+    index_pointer = os.path.join(versions_dir(config.VECTOR_STORE_PATH), POINTER_NAME)
+    # vector_store.py and the modules it uses to build and publish the index
+    index_code = [_code(module) for module in
+                  ('vector_store.py', 'extractive.py', 'index_versions.py', 'projection.py')]
+    directories = Stage('directories', config.create_directories,
+                        outputs=[config.RAW_DATA_DIR, config.PROCESSED_DATA_DIR,
+                                 config.VECTOR_STORE_DIR, config.IMAGES_DIR])
+    if streaming:
+        return Pipeline([
+            directories,
+            Stage('ingest', ingest_streaming,
+                  inputs=[config.PDF_PATH, _code('document_processor.py'),
+                          _code('streaming_ingest.py'), _code('ingest_checkpoint.py')] + index_code,
+                  outputs=[config.CHUNKS_PATH, index_pointer], after=['directories'],
+                  params={
+                      'images_dir': config.IMAGES_DIR,
+                      'embedding_model': config.EMBEDDING_MODEL,
+                      'llm_model': config.LLM_MODEL,
+                      'batch_size': config.INGEST_BATCH_SIZE,
+                  }),
+        ], STATE_PATH)
+
+    extraction_inputs = [config.PDF_PATH, _code('document_processor.py')]
+    stages = [
+        directories,
+        Stage('extract_text', extract_text, inputs=extraction_inputs,
+              outputs=[TEXT_PATH], after=['directories']),
+        Stage('extract_tables', extract_tables, inputs=extraction_inputs,
+              outputs=[TABLES_PATH], after=['directories']),
+        Stage('extract_images', extract_images, inputs=extraction_inputs,
+              outputs=[IMAGES_PATH], after=['directories'],
+              params={'images_dir': config.IMAGES_DIR}),
+        Stage('merge_chunks', merge_chunks, inputs=[TEXT_PATH, TABLES_PATH, IMAGES_PATH],
+              outputs=[config.CHUNKS_PATH]),
+        Stage('embed', embed,
+              inputs=[config.CHUNKS_PATH, _code('create_embeddings.py')] + index_code,
+              outputs=[index_pointer],
+              params={
+                  'embedding_model': config.EMBEDDING_MODEL,
+                  'llm_model': config.LLM_MODEL,
+                  'dims': config.EMBEDDING_DIMS,
+                  'projection': config.EMBEDDING_PROJECTION,
+              }),
+    ]
+    return Pipeline(stages, STATE_PATH)
 
 def main():
+    parser = argparse.ArgumentParser(description="Multi-Modal RAG ingestion pipeline")
+    parser.add_argument('--force', action='store_true', help="rerun stages even if up to date")
+    parser.add_argument('--only', nargs='+', metavar='STAGE',
+                        help="run these stages (and what they depend on)")
+    parser.add_argument('--workers', type=int, default=3, help="stages run concurrently")
+    parser.add_argument('--streaming', action='store_true',
+                        help="overlap extraction, OCR and embedding in one stage")
+    args = parser.parse_args()
+
     print()
     print("Multi-Modal RAG Pipeline")
     print()
-    steps = [
-        ("python config.py", "Step 0: Creating directories"),
-        ("python process_document.py", "Step 1: Extracting document data"),
-        ("python create_embeddings.py", "Step 2: Creating embeddings"),
-    ]
-    
-    # Run all steps
-    for command, description in steps:
-        if not run_command(command, description):
-            print("\nPipeline failed")
-            sys.exit(1)
+
+    if not os.path.exists(config.PDF_PATH):
+        print(f"\nERROR: PDF not found at {config.PDF_PATH}")
+        sys.exit(1)
+
+    report = build_pipeline(args.streaming).run(targets=args.only, force=args.force, max_workers=args.workers)
+    if any(entry['status'] in ('failed', 'blocked') for entry in report.values()):
+        print("\nPipeline failed")
+        sys.exit(1)
     print()
     print("PIPELINE COMPLETE")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
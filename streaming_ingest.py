@@ -0,0 +1,198 @@
+"""
+Pipelined ingestion: PDF extraction overlapped with embedding
+A producer thread walks the PDF page by page (text, tables, then OCR of
+the page's images) and puts chunks on a bounded queue. The calling thread
+takes them off in batches, embeds each batch and appends it to the FAISS
+index, so tesseract (a subprocess) and MiniLM (torch releases the GIL) run
+at the same time. A full queue blocks the producer, so at most
+`queue_size` extracted chunks are waiting in memory.
+
+Chunks come out in page order rather than grouped by type, so chunk_ids
+differ from the sequential run_pipeline.py build. Embedding dimension
+reduction needs every vector up front and is not supported here.
+
+main() checkpoints as it goes and resumes an interrupted run (see
+ingest_checkpoint.py); --fresh ignores any checkpoint.
+
+Usage: python streaming_ingest.py [--batch-size N] [--queue-size N] [--fresh]
+"""
+
+import json
+import queue
+import threading
+import time
+
+_DONE = object()
+
+class StreamingIngest:
+    def __init__(self, store, batch_size=64, queue_size=256):
+        # store is a vector_store.VectorStore; batches go to store.add_chunks
+        self.store = store
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._error = None
+        self.produced = 0
+        self.consumed = 0
+        self.batches = 0
+        self.peak_queue = 0
+        self.extract_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.embed_seconds = 0.0
+        self.starved_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def _put(self, item):
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.blocked_seconds += time.perf_counter() - start
+        self.peak_queue = max(self.peak_queue, self.queue.qsize())
+
+    def _produce(self, chunks):
+        try:
+            iterator = iter(chunks)
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                chunk = next(iterator, _DONE)
+                self.extract_seconds += time.perf_counter() - start
+                if chunk is _DONE:
+                    break
+                self.produced += 1
+                self._put(chunk)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put(_DONE)
+
+    def _next_batch(self):
+        start = time.perf_counter()
+        item = self.queue.get()
+        self.starved_seconds += time.perf_counter() - start
+        batch = []
+        while item is not _DONE:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                # embed what is there rather than wait for a full batch
+                return batch, False
+        return batch, True
+
+    def run(self, chunks, on_batch=None):
+        """
+        Embed and index everything `chunks` yields; returns the chunks added
+        on_batch(batch) is called on this thread after each batch is indexed.
+        """
+        start = time.perf_counter()
+        producer = threading.Thread(target=self._produce, args=(chunks,),
+                                    name='ingest-extract', daemon=True)
+        producer.start()
+        added = []
+        try:
+            done = False
+            while not done:
+                batch, done = self._next_batch()
+                if not batch:
+                    continue
+                embed_start = time.perf_counter()
+                self.store.add_chunks(batch)
+                self.embed_seconds += time.perf_counter() - embed_start
+                self.consumed += len(batch)
+                self.batches += 1
+                added.extend(batch)
+                if on_batch is not None:
+                    on_batch(batch)
+                print(f"Indexed {self.consumed} chunks ({self.batches} batches, "
+                      f"queue {self.queue.qsize()})")
+        finally:
+            self._stop.set()
+            producer.join()
+            self.wall_seconds = time.perf_counter() - start
+        if self._error is not None:
+            raise self._error
+        return added
+
+    def stats(self):
+        return {
+            'chunks': self.consumed,
+            'batches': self.batches,
+            'peak_queue': self.peak_queue,
+            'extract_s': self.extract_seconds,
+            'producer_blocked_s': self.blocked_seconds,
+            'embed_s': self.embed_seconds,
+            'consumer_starved_s': self.starved_seconds,
+            'wall_s': self.wall_seconds,
+            # extraction and embedding time hidden by running them together
+            'overlap_s': max(0.0, self.extract_seconds + self.embed_seconds - self.wall_seconds),
+        }
+
+    def print_report(self):
+        stats = self.stats()
+        print(f"\nIndexed {stats['chunks']} chunks in {stats['batches']} batches "
+              f"({stats['wall_s']:.1f}s wall)")
+        print(f"  extraction {stats['extract_s']:.1f}s, embedding {stats['embed_s']:.1f}s, "
+              f"overlapped {stats['overlap_s']:.1f}s")
+        print(f"  producer blocked {stats['producer_blocked_s']:.1f}s (queue full, "
+              f"peak {stats['peak_queue']}), consumer starved {stats['consumer_starved_s']:.1f}s")
+
+def ingest(pdf_path, store, batch_size=64, queue_size=256):
+    """Extract `pdf_path` into `store` with extraction and embedding overlapped"""
+    from document_processor import DocumentProcessor
+
+    processor = DocumentProcessor(pdf_path)
+    try:
+        streaming = StreamingIngest(store, batch_size=batch_size, queue_size=queue_size)
+        chunks = streaming.run(processor.iter_chunks())
+    finally:
+        processor.close()
+    streaming.print_report()
+    return chunks
+
+def main(batch_size=None, queue_size=None, resume=True):
+    import config
+    from ingest_checkpoint import resumable_ingest
+    from vector_store import VectorStore
+
+    if config.EMBEDDING_DIMS:
+        print(f"Note: EMBEDDING_DIMS={config.EMBEDDING_DIMS} is ignored by pipelined ingestion")
+
+    config.create_directories()
+    store = VectorStore(model_name=config.EMBEDDING_MODEL)
+    checkpoint, chunks = resumable_ingest(
+        config.PDF_PATH,
+        store,
+        config.INGEST_CHECKPOINT_DIR,
+        batch_size=batch_size or config.INGEST_BATCH_SIZE,
+        queue_size=queue_size or config.INGEST_QUEUE_SIZE,
+        checkpoint_every=config.INGEST_CHECKPOINT_BATCHES,
+        resume=resume
+    )
+    if not chunks:
+        print("No chunks extracted")
+        return
+
+    # the chunk JSON is still written for evaluation and later embed runs
+    with open(config.CHUNKS_PATH, 'w', encoding='utf-8') as f:
+        json.dump(chunks, f, indent=2, ensure_ascii=False)
+    store.tokenize_chunks(config.LLM_MODEL)
+    store.index_sentences()
+    store.save(config.VECTOR_STORE_PATH, keep=config.INDEX_VERSIONS_TO_KEEP)
+    checkpoint.clear()
+    print("COMPLETE")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pipelined PDF extraction and embedding")
+    parser.add_argument('--batch-size', type=int, help="chunks embedded per batch")
+    parser.add_argument('--queue-size', type=int, help="extracted chunks allowed to wait")
+    parser.add_argument('--fresh', action='store_true', help="ignore any checkpoint and start over")
+    args = parser.parse_args()
+    main(batch_size=args.batch_size, queue_size=args.queue_size, resume=not args.fresh)
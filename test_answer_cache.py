@@ -0,0 +1,72 @@
+"""
+Tests for answer_cache.py
+Run with: python -m pytest test_answer_cache.py
+"""
+
+import os
+import time
+
+from answer_cache import AnswerCache, make_key
+
+def test_answer_cache_keeps_versions_apart(tmp_path):
+    cache = AnswerCache(str(tmp_path / 'answers.db'))
+    cache.put('key', {'answer': 'old'}, index_version='20260101-000000-000000')
+    assert cache.get('key', index_version='20260101-000000-000000') == {'answer': 'old'}
+
+    # a newer version prunes the old one's answers
+    assert cache.get('key', index_version='20260201-000000-000000') is None
+    cache.put('key', {'answer': 'new'}, index_version='20260201-000000-000000')
+    assert cache.get('key', index_version='20260201-000000-000000') == {'answer': 'new'}
+    assert cache.stats()['entries'] == 1
+
+    # a server still on the old version neither reads nor overwrites it
+    cache.put('key', {'answer': 'stale'}, index_version='20260101-000000-000000')
+    assert cache.get('key', index_version='20260101-000000-000000') is None
+    assert cache.get('key', index_version='20260201-000000-000000') == {'answer': 'new'}
+    cache.close()
+
+def test_answer_cache_processes_sharing_a_file_agree_on_the_newest_version(tmp_path):
+    path = str(tmp_path / 'answers.db')
+    old_server, new_server = AnswerCache(path), AnswerCache(path)
+    old_server.get('key', index_version='20260101-000000-000000')
+    new_server.put('key', {'answer': 'new'}, index_version='20260201-000000-000000')
+
+    old_server.put('key', {'answer': 'stale'}, index_version='20260101-000000-000000')
+    assert old_server.get('key', index_version='20260201-000000-000000') == {'answer': 'new'}
+    assert new_server.stats()['entries'] == 1
+    old_server.close()
+    new_server.close()
+
+def test_answer_cache_expires_and_evicts(tmp_path):
+    cache = AnswerCache(str(tmp_path / 'answers.db'), max_entries=2, ttl_seconds=3600)
+    for i in range(3):
+        cache.put(f'key-{i}', {'answer': i})
+        time.sleep(0.01)
+    assert cache.get('key-0') is None
+    assert cache.get('key-2') == {'answer': 2}
+
+    expired = AnswerCache(str(tmp_path / 'answers.db'), ttl_seconds=0)
+    assert expired.get('key-2') is None
+    cache.close()
+    expired.close()
+
+def test_keys_ignore_query_formatting_and_chunk_order():
+    key = make_key("What is Qatar's GDP growth?", ['c2', 'c1'], 'template', 'flan-t5')
+    assert key == make_key("  what is qatar's GDP   growth ", ['c1', 'c2'], 'template', 'flan-t5')
+    assert key != make_key("What is Qatar's GDP growth?", ['c1', 'c3'], 'template', 'flan-t5')
+    assert key != make_key("What is Qatar's GDP growth?", ['c1', 'c2'], 'template', 'flan-t5-large')
+
+def test_answer_cache_connects_on_first_use_in_each_process(tmp_path):
+    cache = AnswerCache(str(tmp_path / 'answers.db'))
+    assert cache._conn is None
+    cache.put('key', {'answer': 'parent'})
+
+    pid = os.fork()
+    if pid == 0:
+        # the child opens its own connection; exit code reports the result
+        ok = cache.get('key') == {'answer': 'parent'} and cache._pid == os.getpid()
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert cache.get('key') == {'answer': 'parent'}
+    cache.close()
@@ -0,0 +1,103 @@
+"""
+Tests for async_engine.py
+Run with: python -m pytest test_async_engine.py
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from async_engine import AsyncRAGEngine
+
+class _Store:
+    version = 'v1'
+
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.searched = []
+
+    def search(self, query, k=5):
+        self.searched.append(query)
+        if self.gate is not None:
+            self.gate.wait(5)
+        return [{'chunk': {'text': query}, 'score': 1.0}]
+
+class _Answerer:
+    def __init__(self):
+        self.calls = []
+
+    def generate_answer_with_citations(self, query, results, index_version=None, deadline_ms=None):
+        self.calls.append((query, index_version, deadline_ms))
+        return {'answer': query.upper(), 'sources': results}
+
+def _engine(store, answerer=None, **kwargs):
+    return AsyncRAGEngine(SimpleNamespace(current=store), answerer or _Answerer(), **kwargs)
+
+def test_answer_passes_the_time_left_as_the_generation_deadline():
+    answerer = _Answerer()
+    engine = _engine(_Store(), answerer)
+
+    answer = asyncio.run(engine.answer('gdp', timeout=10))
+    engine.close()
+
+    assert answer['answer'] == 'GDP'
+    (query, version, deadline_ms), = answerer.calls
+    assert (query, version) == ('gdp', 'v1')
+    assert 9000 < deadline_ms <= 10000
+
+def test_answer_timed_out_during_retrieval_skips_generation():
+    gate = threading.Event()
+    answerer = _Answerer()
+    engine = _engine(_Store(gate), answerer)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(engine.answer('gdp', timeout=0.05))
+    gate.set()
+    engine._search_pool.shutdown(wait=True)
+    engine.close()
+
+    assert answerer.calls == []
+
+def test_cancelled_search_that_has_not_started_never_runs():
+    gate = threading.Event()
+    store = _Store(gate)
+    engine = _engine(store, search_workers=1)
+
+    async def scenario():
+        first = asyncio.ensure_future(engine.search('first'))
+        second = asyncio.ensure_future(engine.search('second'))
+        await asyncio.sleep(0.05)
+        second.cancel()
+        # the executor future is cancelled from the loop's next iteration
+        await asyncio.sleep(0.05)
+        gate.set()
+        await first
+        with pytest.raises(asyncio.CancelledError):
+            await second
+
+    asyncio.run(scenario())
+    engine._search_pool.shutdown(wait=True)
+    engine.close()
+
+    assert store.searched == ['first']
+
+def test_answer_many_can_return_exceptions():
+    class _FailingStore(_Store):
+        def search(self, query, k=5):
+            if query == 'bad':
+                raise RuntimeError("search failed")
+            return super().search(query, k)
+
+    engine = _engine(_FailingStore())
+
+    answers = asyncio.run(engine.answer_many(['a', 'bad'], return_exceptions=True))
+    engine.close()
+
+    assert answers[0]['answer'] == 'A'
+    assert isinstance(answers[1], RuntimeError)
+
+def test_unknown_search_executor_is_rejected():
+    with pytest.raises(ValueError):
+        _engine(_Store(), search_executor='fiber')
@@ -0,0 +1,72 @@
+"""
+Tests for cascade.py
+Run with: python -m pytest test_cascade.py
+"""
+
+from cascade import NOT_FOUND_ANSWER, CascadeQA
+
+class _Scorer:
+    def __init__(self, confidence):
+        self.confidence = confidence
+
+    def best_sentence(self, query, chunks):
+        return self.confidence, len(chunks) - 1, "Growth was 2.4 percent."
+
+class _QA:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_answer_with_citations(self, query, search_results, index_version=None, deadline_ms=None):
+        self.calls += 1
+        return {'answer': 'generated', 'citations': [], 'context_used': len(search_results)}
+
+    def stream_answer_with_citations(self, query, search_results, index_version=None, deadline_ms=None):
+        self.calls += 1
+        return {'answer_stream': iter(['gener', 'ated']), 'citations': []}
+
+def _results(*scores):
+    return [
+        {'score': score, 'chunk': {'source': f'Page {i + 1}', 'page': i + 1, 'type': 'text'}}
+        for i, score in enumerate(scores)
+    ]
+
+def _cascade(confidence):
+    qa = _QA()
+    return CascadeQA(qa, _Scorer(confidence), max_distance=1.0, min_confidence=0.75, verbose=False), qa
+
+def test_distant_results_are_not_found_without_scoring():
+    cascade, qa = _cascade(confidence=None)
+    for results in (_results(), _results(1.2, 1.4)):
+        result = cascade.generate_answer_with_citations("GDP?", results)
+        assert result == {'answer': NOT_FOUND_ANSWER, 'citations': [], 'context_used': 0, 'route': 'not_found'}
+    assert qa.calls == 0
+
+def test_confident_sentence_is_answered_extractively():
+    cascade, qa = _cascade(confidence=0.75)
+    result = cascade.generate_answer_with_citations("GDP?", _results(0.4, 1.0))
+    assert result['route'] == 'extractive'
+    assert result['answer'] == "Growth was 2.4 percent."
+    # the citation is the chunk the sentence came from, at the distance boundary
+    assert result['citations'][0]['page'] == 2
+    assert result['citations'][0]['relevance_score'] == 1.0
+    assert qa.calls == 0
+
+def test_low_confidence_goes_to_the_llm():
+    cascade, qa = _cascade(confidence=0.74)
+    result = cascade.generate_answer_with_citations("GDP?", _results(0.4))
+    assert result['route'] == 'llm' and result['answer'] == 'generated'
+    assert qa.calls == 1
+
+def test_streamed_routes_and_metrics():
+    cascade, qa = _cascade(confidence=0.5)
+    result = cascade.stream_answer_with_citations("GDP?", _results(0.4))
+    assert cascade.metrics()['llm']['count'] == 0
+    assert "".join(result['answer_stream']) == 'generated'
+    assert result['route'] == 'llm'
+
+    result = cascade.stream_answer_with_citations("GDP?", _results(2.0))
+    assert list(result['answer_stream']) == [NOT_FOUND_ANSWER]
+
+    metrics = cascade.metrics()
+    assert metrics['llm']['count'] == 1 and metrics['not_found']['count'] == 1
+    assert metrics['llm']['share'] == 0.5
@@ -0,0 +1,67 @@
+"""
+Tests for context_packer.py
+Run with: python -m pytest test_context_packer.py
+"""
+
+from context_packer import ContextPacker
+
+TEMPLATE = "Context:\n{context}\nQuestion: {question}\nAnswer:"
+
+class _CharTokenizer:
+    """One token per character, so every seam between spans falls mid-word"""
+
+    def encode(self, text, add_special_tokens=True):
+        return [ord(c) for c in text] + ([0] if add_special_tokens else [])
+
+    def decode(self, token_ids, skip_special_tokens=True):
+        return "".join(chr(t) for t in token_ids if t or not skip_special_tokens)
+
+def _packer(**options):
+    return ContextPacker(_CharTokenizer(), 'chars', **options)
+
+def _chunk(source, content):
+    return {'source': source, 'content': content}
+
+def test_contiguous_spans_decode_without_seams():
+    content = "Real GDP grew by 2.4 percent in 2023 and inflation eased to 3.1 percent."
+    prompt, stats = _packer(span_tokens=4).pack(TEMPLATE, "GDP?", [_chunk('Page 1', content)])
+    assert f"[Source: Page 1]\n{content}\n" in prompt
+    assert stats['tokens_used'] == len(content)
+    assert stats['tokens_dropped'] == 0
+
+def test_budget_is_filled_in_value_order():
+    first = "a" * 40 + "b" * 40
+    second = "c" * 40 + "d" * 40
+    packer = _packer(span_tokens=40, max_input_tokens=150, safety_margin=0)
+    overhead = len(TEMPLATE.format(context="", question="q")) + 1
+    prompt, stats = packer.pack(TEMPLATE, "q", [_chunk('A', first), _chunk('B', second)])
+
+    assert stats['budget'] == 150 - overhead
+    assert stats['tokens_used'] + len("[Source: A]\n") + 2 <= stats['budget']
+    # A's second span ties with B's first (0.5 each) and wins on rank;
+    # B's span and header no longer fit
+    assert stats['chunks_used'] == [0]
+    assert first in prompt
+    assert "[Source: B]" not in prompt
+    assert stats['tokens_dropped'] == 80
+
+def test_gaps_between_selected_spans_are_marked():
+    # the middle span repeats the first and is dropped as a duplicate
+    content = "x" * 10 + "x" * 10 + "z" * 10
+    prompt, stats = _packer(span_tokens=10, safety_margin=0).pack(TEMPLATE, "q", [_chunk('A', content)])
+    assert "x" * 10 + " ... " + "z" * 10 in prompt
+    assert stats['duplicate_tokens'] == 10
+
+def test_near_duplicate_chunks_are_packed_once():
+    table = "Qatar real GDP growth 2022 4.2 2023 1.2 2024 2.4 2025 2.6"
+    chunks = [_chunk('Page 3', table), _chunk('Page 9', table), _chunk('Page 4', "Inflation fell to 3 percent.")]
+    prompt, stats = _packer(span_tokens=64).pack(TEMPLATE, "growth?", chunks)
+    assert stats['chunks_used'] == [0, 2]
+    assert stats['duplicate_tokens'] == len(table)
+    assert "Page 9" not in prompt
+
+def test_ingest_token_ids_are_used_instead_of_the_text():
+    chunk = dict(_chunk('A', "ignored"), token_ids={'chars': [ord(c) for c in "stored ids"]})
+    prompt, _ = _packer().pack(TEMPLATE, "q", [chunk])
+    assert "stored ids" in prompt
+    assert "ignored" not in prompt
@@ -0,0 +1,108 @@
+"""
+Tests for llm_qa.py (deadline handling; no model is loaded)
+Run with: python -m pytest test_llm_qa.py
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from llm_qa import DecodeSpeed, LLMQA
+
+class _WordTokenizer:
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+class _FakePipeline:
+    def __init__(self, words=3, delay=0.0):
+        self.words = words
+        self.delay = delay
+        self.calls = []
+
+    def __call__(self, prompts, **generation):
+        self.calls.append(generation)
+        time.sleep(min(self.delay, generation.get('max_time', self.delay)))
+        return [{'generated_text': ' '.join([prompt] * self.words)} for prompt in prompts]
+
+def _qa(pipe, **kwargs):
+    qa = LLMQA(lazy=True, **kwargs)
+    qa._llm = SimpleNamespace(pipeline=pipe)
+    qa.tokenizer = _WordTokenizer()
+    return qa
+
+def test_decode_speed_separates_fixed_and_per_token_cost():
+    speed = DecodeSpeed()
+    for tokens in (10, 50, 100, 200):
+        speed.record(0.5 + 0.01 * tokens, tokens)
+
+    assert speed.fixed_seconds == pytest.approx(0.5)
+    assert speed.seconds_per_token == pytest.approx(0.01)
+    assert speed.tokens_within(1.5) == pytest.approx(100, abs=1)
+    assert speed.tokens_within(0.2) == 0
+
+def test_decode_speed_charges_everything_per_token_with_few_samples():
+    speed = DecodeSpeed()
+    assert speed.tokens_within(1.0) is None
+    assert speed.typical_tokens() is None
+
+    speed.record(1.0, 100)
+    speed.record(2.0, 100)
+
+    assert speed.fixed_seconds == 0.0
+    assert speed.seconds_per_token == pytest.approx(0.015)
+    assert speed.typical_tokens() == 100
+
+def test_decoding_limits_without_a_deadline():
+    qa = LLMQA(lazy=True)
+    assert qa._decoding_limits(None) == {}
+
+def test_decoding_limits_cap_tokens_to_the_time_left():
+    qa = LLMQA(lazy=True, max_new_tokens=512)
+    for tokens in (10, 50, 100):
+        qa.decode_speed.record(0.01 * tokens, tokens)
+
+    limits = qa._decoding_limits(time.perf_counter() + 1.0)
+
+    assert 90 <= limits['max_new_tokens'] <= 100
+    assert 0.9 < limits['max_time'] <= 1.0
+
+def test_decoding_limits_never_exceed_max_new_tokens():
+    qa = LLMQA(lazy=True, max_new_tokens=64)
+    qa.decode_speed.record(0.01, 10)
+
+    assert qa._decoding_limits(time.perf_counter() + 60)['max_new_tokens'] == 64
+
+def test_expired_deadline_falls_back_only_with_an_extractive_scorer():
+    expired = time.perf_counter() - 1
+
+    assert LLMQA(lazy=True, extractive_scorer=object())._decoding_limits(expired) is None
+
+    limits = LLMQA(lazy=True, min_new_tokens=8)._decoding_limits(expired)
+    assert limits == {'max_new_tokens': 8, 'max_time': 0.01}
+
+def test_batched_requests_without_deadlines_run_unlimited():
+    pipe = _FakePipeline()
+    qa = _qa(pipe)
+
+    results = qa._generate_requests([('a', None), ('b', None)])
+
+    assert results == [('a a a', False), ('b b b', False)]
+    assert pipe.calls == [{'batch_size': 2}]
+    assert qa.decode_speed.typical_tokens() == 3
+
+def test_batch_stops_at_its_tightest_deadline():
+    pipe = _FakePipeline()
+    qa = _qa(pipe)
+    now = time.perf_counter()
+
+    qa._generate_requests([('a', now + 5.0), ('b', None), ('c', now + 1.0)])
+
+    assert 0.9 < pipe.calls[0]['max_time'] <= 1.0
+
+def test_batch_cut_short_by_a_deadline_marks_every_answer_capped():
+    qa = _qa(_FakePipeline(delay=1.0))
+
+    results = qa._generate_requests([('a', time.perf_counter() + 0.05), ('b', None)])
+
+    assert [capped for _, capped in results] == [True, True]
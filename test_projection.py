@@ -0,0 +1,58 @@
+"""
+Tests for projection.py
+Run with: python -m pytest test_projection.py
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from projection import Projection
+
+def _normalized(rng, rows, dims):
+    vectors = rng.standard_normal((rows, dims)).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_truncate_keeps_the_leading_dimensions_normalized():
+    vectors = _normalized(np.random.default_rng(0), 10, 8)
+    projection = Projection.fit(vectors, 3, method='truncate')
+    reduced = projection.transform(vectors)
+
+    assert (projection.input_dim, projection.output_dim) == (8, 3)
+    expected = vectors[:, :3] / np.linalg.norm(vectors[:, :3], axis=1, keepdims=True)
+    np.testing.assert_allclose(reduced, expected, rtol=1e-5)
+
+def test_pca_keeps_the_ranking_of_low_rank_data():
+    rng = np.random.default_rng(1)
+    # centred 64-dim vectors spanning 4 directions only: PCA to 4 dims loses nothing
+    basis = np.linalg.qr(rng.standard_normal((64, 4)))[0].T
+    vectors = _normalized(rng, 100, 4) @ basis
+    vectors = np.concatenate([vectors, -vectors]).astype('float32')
+
+    projection = Projection.fit(vectors, 4)
+    reduced = projection.transform(vectors)
+    np.testing.assert_allclose(np.linalg.norm(reduced, axis=1), 1.0, rtol=1e-5)
+
+    query = vectors[:1]
+    full_order = np.argsort(((vectors - query) ** 2).sum(axis=1))[:10]
+    reduced_order = np.argsort(((reduced - projection.transform(query)) ** 2).sum(axis=1))[:10]
+    np.testing.assert_array_equal(full_order, reduced_order)
+
+def test_projection_round_trips_through_a_file(tmp_path):
+    vectors = _normalized(np.random.default_rng(2), 50, 16)
+    projection = Projection.fit(vectors, 6)
+    path = str(tmp_path / 'projection.npz')
+    projection.save(path)
+
+    loaded = Projection.load(path)
+    assert loaded.method == 'pca'
+    np.testing.assert_array_equal(loaded.transform(vectors), projection.transform(vectors))
+
+def test_fit_rejects_bad_settings():
+    vectors = _normalized(np.random.default_rng(3), 5, 8)
+    with pytest.raises(ValueError):
+        Projection.fit(vectors, 9)
+    with pytest.raises(ValueError):
+        Projection.fit(vectors, 2, method='random')
+    with pytest.raises(ValueError):
+        Projection.fit(vectors, 6)
@@ -0,0 +1,79 @@
+"""
+Tests for search_executor.py
+Run with: python -m pytest test_search_executor.py
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from search_executor import Busy, SearchExecutor
+
+class _SlowStore:
+    def __init__(self, release):
+        self.release = release
+
+    def search(self, query, k=5):
+        self.release.wait(5)
+        return [query] * k
+
+def test_search_executor_rejects_beyond_its_queue():
+    # every search sets the FAISS thread count on its thread
+    pytest.importorskip('faiss')
+    release = threading.Event()
+    executor = SearchExecutor(max_concurrency=1, max_queue=1, queue_timeout=5, faiss_threads=1)
+    executor_threads = ThreadPoolExecutor(max_workers=2)
+    try:
+        running = executor_threads.submit(executor.search, _SlowStore(release), 'a', 1)
+        while executor.stats()['active'] < 1:
+            time.sleep(0.01)
+        queued = executor_threads.submit(executor.search, _SlowStore(release), 'b', 1)
+        while executor.stats()['queue_depth'] < 1:
+            time.sleep(0.01)
+        with pytest.raises(Busy):
+            executor.search(_SlowStore(release), 'c', 1)
+        release.set()
+        assert running.result(5) == ['a']
+        assert queued.result(5) == ['b']
+    finally:
+        release.set()
+        executor_threads.shutdown()
+    stats = executor.stats()
+    assert stats['rejected'] == 1
+    assert stats['completed'] == 2
+
+def test_search_executor_times_out_waiting_for_a_slot():
+    pytest.importorskip('faiss')
+    release = threading.Event()
+    executor = SearchExecutor(max_concurrency=1, max_queue=4, queue_timeout=0.05, faiss_threads=1)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        running = pool.submit(executor.search, _SlowStore(release), 'a', 1)
+        while executor.stats()['active'] < 1:
+            time.sleep(0.01)
+        with pytest.raises(Busy):
+            executor.search(_SlowStore(release), 'b', 1)
+        release.set()
+        running.result(5)
+    assert executor.stats()['timeouts'] == 1
+
+def test_search_executor_caps_torch_threads_once_torch_is_loaded(monkeypatch):
+    pytest.importorskip('faiss')
+    calls = []
+    monkeypatch.setitem(sys.modules, 'torch', SimpleNamespace(
+        set_num_threads=lambda n: calls.append((threading.get_ident(), n))
+    ))
+    release = threading.Event()
+    release.set()
+    executor = SearchExecutor(max_concurrency=2, faiss_threads=3)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        worker = pool.submit(threading.get_ident).result()
+        for query in ('a', 'b'):
+            pool.submit(executor.search, _SlowStore(release), query, 1).result(5)
+
+    # set once per search thread, not on every search
+    assert calls == [(worker, 3)]
@@ -0,0 +1,100 @@
+"""
+Tests for semantic_cache.py
+Run with: python -m pytest test_semantic_cache.py
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('faiss')
+
+from semantic_cache import SemanticCache
+
+OLD, NEW = '20260101-000000-000000', '20260201-000000-000000'
+
+VECTORS = {
+    "What is Qatar's GDP growth?": [1.0, 0.0, 0.0],
+    "How fast is Qatar's GDP growing?": [0.96, 0.28, 0.0],
+    "What is the inflation rate?": [0.0, 1.0, 0.0],
+}
+
+class _QA:
+    def __init__(self):
+        self.calls = []
+
+    def generate_answer_with_citations(self, query, search_results, index_version=None, deadline_ms=None):
+        self.calls.append(query)
+        return {'answer': f"answer to {query}", 'citations': []}
+
+    def stream_answer_with_citations(self, query, search_results, index_version=None, deadline_ms=None):
+        self.calls.append(query)
+        return {'answer_stream': iter(["streamed ", "answer"]), 'citations': []}
+
+def _results(*chunk_ids):
+    return [{'chunk': {'chunk_id': chunk_id}} for chunk_id in chunk_ids]
+
+def _cache(**options):
+    qa = _QA()
+    return SemanticCache(qa, lambda query: VECTORS[query], threshold=0.9, **options), qa
+
+def test_paraphrase_with_the_same_chunks_is_a_hit():
+    cache, qa = _cache()
+    first = cache.generate_answer_with_citations("What is Qatar's GDP growth?", _results(1, 2), OLD)
+    second = cache.generate_answer_with_citations("How fast is Qatar's GDP growing?", _results(1, 2), OLD)
+
+    assert qa.calls == ["What is Qatar's GDP growth?"]
+    assert second['answer'] == first['answer']
+    assert second['cached'] and second['semantic_match'] == "What is Qatar's GDP growth?"
+    assert second['similarity'] == pytest.approx(0.96)
+    assert cache.stats()['hits'] == 1
+
+def test_dissimilar_question_is_a_miss():
+    cache, qa = _cache()
+    cache.generate_answer_with_citations("What is Qatar's GDP growth?", _results(1), OLD)
+    cache.generate_answer_with_citations("What is the inflation rate?", _results(1), OLD)
+    assert len(qa.calls) == 2
+    assert cache.stats()['entries'] == 2
+    assert cache.recent_events('miss')[-1]['query'] == "What is the inflation rate?"
+
+def test_hit_on_different_chunks_is_suspect():
+    cache, qa = _cache()
+    cache.generate_answer_with_citations("What is Qatar's GDP growth?", _results(1, 2), OLD)
+    cache.generate_answer_with_citations("How fast is Qatar's GDP growing?", _results(3, 4), OLD)
+    assert len(qa.calls) == 2
+    assert cache.stats()['suspect_hits'] == 1
+    assert cache.recent_events('suspect')[0]['chunk_overlap'] == 0.0
+
+    lenient, qa = _cache(reject_suspect=False)
+    lenient.generate_answer_with_citations("What is Qatar's GDP growth?", _results(1, 2), OLD)
+    result = lenient.generate_answer_with_citations("How fast is Qatar's GDP growing?", _results(3, 4), OLD)
+    assert result['cached'] and len(qa.calls) == 1
+
+def test_streamed_answers_are_stored_once_complete():
+    cache, qa = _cache()
+    result = cache.stream_answer_with_citations("What is Qatar's GDP growth?", _results(1), OLD)
+    assert cache.stats()['entries'] == 0
+    assert "".join(result['answer_stream']) == "streamed answer"
+    hit = cache.stream_answer_with_citations("How fast is Qatar's GDP growing?", _results(1), OLD)
+    assert "".join(hit['answer_stream']) == "streamed answer"
+    assert len(qa.calls) == 1
+
+def test_deadline_limited_and_failed_answers_are_not_stored():
+    cache, qa = _cache()
+    qa.generate_answer_with_citations = lambda *args, **kwargs: {
+        'answer': 'cut short', 'citations': [], 'deadline_limited': True
+    }
+    cache.generate_answer_with_citations("What is Qatar's GDP growth?", _results(1), OLD)
+    assert cache.stats()['entries'] == 0
+
+def test_requests_on_an_older_version_do_not_wipe_the_newer_one():
+    cache, qa = _cache()
+    cache.generate_answer_with_citations("What is Qatar's GDP growth?", _results(1), OLD)
+    cache.generate_answer_with_citations("What is Qatar's GDP growth?", _results(1), NEW)
+    assert len(qa.calls) == 2
+    assert cache.stats()['entries'] == 1
+
+    # a request still finishing on the old index during the reload
+    cache.generate_answer_with_citations("What is the inflation rate?", _results(1), OLD)
+    assert cache.stats()['entries'] == 1
+    hit = cache.generate_answer_with_citations("How fast is Qatar's GDP growing?", _results(1), NEW)
+    assert hit['cached']
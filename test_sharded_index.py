@@ -0,0 +1,52 @@
+"""
+Tests for sharded_index.py
+Run with: python -m pytest test_sharded_index.py
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+def test_sharded_index_concurrent_searches_get_their_own_results():
+    np = pytest.importorskip('numpy')
+    pytest.importorskip('faiss')
+    from sharded_index import ShardedIndex
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 16)).astype('float32')
+    index = ShardedIndex(vectors, num_shards=4, transport='local')
+
+    def expected(query, k):
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        return list(np.argsort(distances)[:k])
+
+    def search(row):
+        hits = index.search(vectors[row:row + 1], 5)[0]
+        return row, [global_row for _, global_row in hits]
+
+    try:
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            for row, rows in pool.map(search, range(0, 500, 3)):
+                assert rows[0] == row
+                assert rows == expected(vectors[row], 5)
+    finally:
+        index.close()
+
+def test_sharded_index_matches_a_single_index_for_query_batches():
+    np = pytest.importorskip('numpy')
+    pytest.importorskip('faiss')
+    from sharded_index import ShardedIndex
+
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((101, 8)).astype('float32')
+    queries = rng.standard_normal((7, 8)).astype('float32')
+    single = ShardedIndex(vectors, num_shards=1, transport='local')
+    sharded = ShardedIndex(vectors, num_shards=5, transport='local')
+    try:
+        expected = [[row for _, row in hits] for hits in single.search(queries, 10)]
+        assert [[row for _, row in hits] for hits in sharded.search(queries, 10)] == expected
+        # more shards than it can fill still returns everything once
+        assert len(sharded.search(queries[:1], 500)[0]) == 101
+    finally:
+        single.close()
+        sharded.close()
@@ -0,0 +1,61 @@
+"""
+Tests for singleflight.py
+Run with: python -m pytest test_singleflight.py
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import SingleFlight, publish_stream, request_key
+
+def test_singleflight_runs_identical_requests_once():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'answer': 'shared'}
+
+    key = request_key('answer', 'What is GDP?', 5)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flights.do, key, work)
+        started.wait(5)
+        followers = [
+            pool.submit(flights.do, request_key('answer', '  what is gdp ', 5), work) for _ in range(3)
+        ]
+        while flights.stats()['coalesced'] < 3:
+            time.sleep(0.01)
+        release.set()
+        results = [leader.result(5)] + [future.result(5) for future in followers]
+
+    assert len(calls) == 1
+    assert all(result == {'answer': 'shared'} for result in results)
+    # followers get copies they may modify
+    assert all(result is not results[0] for result in results[1:])
+    assert flights.stats()['in_flight'] == 0
+
+def test_singleflight_shares_errors_and_forgets_the_key():
+    flights = SingleFlight()
+    future, leader = flights.claim('key')
+    assert leader
+    waiter, waiter_leads = flights.claim('key')
+    assert waiter is future and not waiter_leads
+    flights.finish('key', error=KeyError('boom'))
+    with pytest.raises(KeyError):
+        waiter.result(1)
+    assert flights.claim('key')[1]
+
+def test_publish_stream_hands_followers_the_full_answer():
+    flights = SingleFlight()
+    future, _ = flights.claim('key')
+    result = publish_stream(flights, 'key', {'answer_stream': iter(['Qatar ', 'grew.']), 'citations': []})
+    assert not future.done()
+    assert "".join(result['answer_stream']) == 'Qatar grew.'
+    assert future.result(1) == {'answer': 'Qatar grew.', 'citations': []}
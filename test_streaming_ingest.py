@@ -0,0 +1,81 @@
+"""
+Tests for streaming_ingest.py
+Run with: python -m pytest test_streaming_ingest.py
+"""
+
+import time
+
+import pytest
+
+from streaming_ingest import StreamingIngest
+
+class _Store:
+    def __init__(self, delay=0.0, fail_at=None):
+        self.delay = delay
+        self.fail_at = fail_at
+        self.batches = []
+
+    def add_chunks(self, batch):
+        if self.fail_at is not None and len(self.batches) == self.fail_at:
+            raise RuntimeError("embedding failed")
+        time.sleep(self.delay)
+        self.batches.append(list(batch))
+
+def _chunks(n, fail_after=None):
+    for i in range(n):
+        if i == fail_after:
+            raise ValueError("bad page")
+        yield {'chunk_id': i}
+
+def test_streaming_ingest_indexes_every_chunk_in_order():
+    store = _Store()
+    streaming = StreamingIngest(store, batch_size=4, queue_size=8)
+
+    added = streaming.run(_chunks(10))
+
+    assert [c['chunk_id'] for c in added] == list(range(10))
+    assert [c for batch in store.batches for c in batch] == added
+    assert all(len(batch) <= 4 for batch in store.batches)
+    assert streaming.stats()['chunks'] == 10
+
+def test_streaming_ingest_blocks_the_producer_when_the_queue_is_full():
+    store = _Store(delay=0.02)
+    streaming = StreamingIngest(store, batch_size=2, queue_size=3)
+    ahead = []
+
+    def chunks():
+        for chunk in _chunks(20):
+            # extracted but not yet indexed: the queue, the batch being
+            # embedded and the chunk waiting in put()
+            ahead.append(streaming.produced - streaming.consumed)
+            yield chunk
+
+    streaming.run(chunks())
+
+    assert streaming.peak_queue <= 3
+    assert max(ahead) <= 3 + 2 + 1
+    assert streaming.stats()['producer_blocked_s'] > 0
+
+def test_streaming_ingest_raises_the_producer_error_after_indexing_what_came_before():
+    store = _Store()
+    streaming = StreamingIngest(store, batch_size=2, queue_size=4)
+
+    with pytest.raises(ValueError, match="bad page"):
+        streaming.run(_chunks(10, fail_after=5))
+
+    assert [c['chunk_id'] for batch in store.batches for c in batch] == list(range(5))
+
+def test_streaming_ingest_stops_the_producer_when_indexing_fails():
+    store = _Store(fail_at=1)
+    streaming = StreamingIngest(store, batch_size=2, queue_size=2)
+    produced = []
+
+    def chunks():
+        for chunk in _chunks(1000):
+            produced.append(chunk)
+            yield chunk
+
+    with pytest.raises(RuntimeError, match="embedding failed"):
+        streaming.run(chunks())
+
+    assert len(produced) < 1000
@@ -0,0 +1,165 @@
+"""
+Tests for watch_ingest.py
+Run with: python -m pytest test_watch_ingest.py
+"""
+
+import os
+import threading
+import time
+
+from watch_ingest import WatchIngest
+
+def _write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+class _WatchStore:
+    """In-memory stand-in for the VectorStore WatchIngest maintains"""
+
+    saves = 0
+
+    def __init__(self):
+        self.chunks = []
+        self.version = None
+        self.projection = None
+        self.token_ids = {}
+        self.sentences = {}
+
+    def embed_documents(self, texts):
+        return None
+
+    def drop_chunks(self, predicate):
+        before = len(self.chunks)
+        self.chunks = [chunk for chunk in self.chunks if not predicate(chunk)]
+        return before - len(self.chunks)
+
+    def add_chunks(self, chunks, vectors=None):
+        self.chunks += chunks
+
+    def save(self, filepath, keep=3):
+        _WatchStore.saves += 1
+        self.version = f'v{_WatchStore.saves}'
+
+    def with_shared_models(self):
+        return _WatchStore()
+
+def _watcher(tmp_path, debounce=60.0):
+    folder = tmp_path / 'raw'
+    folder.mkdir(exist_ok=True)
+    watcher = WatchIngest(
+        str(folder), str(tmp_path / 'faiss_index'), str(tmp_path / 'watch_state.json'),
+        _WatchStore, str(tmp_path / 'images'), workers=2, debounce=debounce
+    )
+    extracted = []
+
+    def extract(name, path):
+        extracted.append(name)
+        if _read(path) == 'corrupt':
+            raise ValueError("cannot open PDF")
+        return [{'content': _read(path), 'document': name, 'source': name}]
+
+    # extraction needs PyMuPDF; the rest of the flow is exercised as is
+    watcher._extract = extract
+    return watcher, folder, extracted
+
+def _drain(watcher):
+    while watcher._in_flight:
+        time.sleep(0.01)
+        watcher._reap()
+
+def test_watch_waits_for_files_to_settle(tmp_path):
+    watcher, folder, extracted = _watcher(tmp_path, debounce=0.1)
+    _write(str(folder / 'report.pdf'), 'gdp')
+    assert watcher.poll() == 0
+    time.sleep(0.15)
+    assert watcher.poll() == 1
+    _drain(watcher)
+    assert extracted == ['report.pdf']
+    assert watcher.stats()['ingested'] == 1
+    watcher.close()
+
+def test_watch_ingests_changes_and_removals_once(tmp_path):
+    watcher, folder, extracted = _watcher(tmp_path)
+    path = str(folder / 'report.pdf')
+    _write(path, 'gdp')
+    watcher.run_once()
+    assert [chunk['content'] for chunk in watcher._store.chunks] == ['gdp']
+
+    # unchanged: nothing to do
+    assert watcher.poll(settled=True) == 0
+
+    _write(path, 'inflation')
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    watcher.run_once()
+    assert [chunk['content'] for chunk in watcher._store.chunks] == ['inflation']
+    assert extracted == ['report.pdf', 'report.pdf']
+
+    os.remove(path)
+    watcher.poll(settled=True)
+    assert watcher._store.chunks == []
+    assert watcher.stats()['tracked'] == 0
+    watcher.close()
+
+def test_watch_does_not_retry_a_failed_file_until_it_changes(tmp_path):
+    watcher, folder, extracted = _watcher(tmp_path)
+    _write(str(folder / 'broken.pdf'), 'corrupt')
+    watcher.run_once()
+    assert watcher.stats()['failures'] == 1
+    assert watcher.poll(settled=True) == 0
+    assert extracted == ['broken.pdf']
+    watcher.close()
+
+def test_watch_poll_runs_while_ingests_update_the_state(tmp_path):
+    watcher, folder, _ = _watcher(tmp_path)
+    for i in range(20):
+        _write(str(folder / f'report-{i:02d}.pdf'), f'chunk {i}')
+    errors = []
+    deadline = time.time() + 30
+
+    def poll_continuously():
+        # each poll compares against state the ingest threads are writing
+        try:
+            while watcher.stats()['ingested'] < 20 and time.time() < deadline:
+                watcher.poll(settled=True)
+        except Exception as e:
+            errors.append(e)
+
+    poller = threading.Thread(target=poll_continuously)
+    poller.start()
+    poller.join()
+    _drain(watcher)
+    assert errors == []
+    assert len(watcher._store.chunks) == 20
+    assert watcher.stats()['tracked'] == 20
+    watcher.close()
+
+def test_watch_drops_a_file_only_after_it_stays_missing(tmp_path):
+    watcher, folder, extracted = _watcher(tmp_path, debounce=0.1)
+    path = str(folder / 'report.pdf')
+    _write(path, 'gdp')
+    watcher.run_once()
+
+    # replaced by delete-then-copy: gone for one poll, then back unchanged
+    os.rename(path, str(tmp_path / 'report.pdf'))
+    watcher.poll()
+    assert [chunk['content'] for chunk in watcher._store.chunks] == ['gdp']
+    os.rename(str(tmp_path / 'report.pdf'), path)
+    watcher.poll()
+    time.sleep(0.15)
+    watcher.poll()
+    assert watcher.stats()['removed'] == 0
+
+    os.remove(path)
+    watcher.poll()
+    assert watcher.stats()['tracked'] == 1
+    time.sleep(0.15)
+    watcher.poll()
+    assert watcher._store.chunks == []
+    assert watcher.stats()['removed'] == 1
+    assert extracted == ['report.pdf']
+    watcher.close()
+
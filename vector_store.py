@@ -1,82 +1,466 @@
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_core.documents import Document
+import os
 import pickle
+import threading
+
+import index_versions
+
+# langchain / sentence-transformers / torch are imported inside the methods
+# that need them, so importing this module and reading chunk statistics
+# never pays for the embedding stack.
+
+def load_embeddings(model_name):
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    print(f"Loading embedding model: {model_name}")
+    embeddings = HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+    print("successfully loaded")
+    return embeddings
+
+def _metadatas(chunks, start=0):
+    metadatas = []
+    for i, chunk in enumerate(chunks):
+        metadata = {
+            'page': chunk['page'],
+            'type': chunk['type'],
+            'source': chunk['source'],
+            'chunk_id': start + i
+        }
+        # set on chunks ingested by watch_ingest.py, which holds several PDFs
+        if 'document' in chunk:
+            metadata['document'] = chunk['document']
+        metadatas.append(metadata)
+    return metadatas
 
 class VectorStore:
-    def __init__(self, model_name='sentence-transformers/all-MiniLM-L6-v2'):
-        print(f"Loading embedding model: {model_name}")
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
-        self.vectorstore = None
+    def __init__(self, model_name='sentence-transformers/all-MiniLM-L6-v2',
+                 num_shards=1, shard_transport='process', embeddings=None,
+                 search_mode='flat', binary_candidates=None,
+                 embeddings_loader=load_embeddings):
+        self.model_name = model_name
+        # embeddings_loader(model_name) is called on first use unless a loaded
+        # `embeddings` object is passed in (model_registry shares one this way)
+        self._embeddings = embeddings
+        self._embeddings_loader = embeddings_loader
+        self._load_lock = threading.RLock()
+        self._vectorstore = None
+        self._pending_path = None
+        # sharded stores leave the vectors on disk (see _load_documents)
+        self._vectors_path = None
         self.chunks = []
-        
-        print("successfully loaded")
-        
-    def create_embeddings(self, chunks):
+        self.version = None
+        # optional projection.Projection applied to every stored and query
+        # embedding; persisted next to the index as <prefix>_projection.npz
+        self.projection = None
+        # answer-model token IDs per chunk, computed at ingest so queries
+        # never re-tokenize chunk text; {tokenizer_name: [ids per chunk]}
+        self.token_ids = {}
+        self._tokenizers = {}
+        # sentence splits of every chunk with their (unprojected) embeddings
+        # and per-sentence token IDs, computed at ingest for the extractive
+        # scorer and context compressor: {'sentences': [[str] per chunk],
+        # 'vectors': [array per chunk], 'token_ids': {tokenizer: [[ids per
+        # sentence] per chunk]}}
+        self.sentences = None
+
+        # num_shards > 1 serves searches from a ShardedIndex built from the
+        # FAISS vectors on first search; the langchain store remains the
+        # source of documents and the on-disk format. A sharded store loaded
+        # from disk keeps only the documents in this process.
+        self.num_shards = num_shards
+        self.shard_transport = shard_transport
+        self._sharded = None
+
+        # search_mode='binary' prefilters with sign-bit Hamming codes and
+        # re-scores `binary_candidates` rows (default 10 * k) in float
+        if search_mode not in ('flat', 'binary'):
+            raise ValueError(f"Unknown search mode '{search_mode}'")
+        self.search_mode = search_mode
+        self.binary_candidates = binary_candidates
+        self._binary = None
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            with self._load_lock:
+                if self._embeddings is None:
+                    self._embeddings = self._embeddings_loader(self.model_name)
+        return self._embeddings
+
+    @property
+    def vectorstore(self):
+        if self._vectorstore is None and self._pending_path is not None:
+            from langchain_community.vectorstores import FAISS
+
+            with self._load_lock:
+                if self._pending_path is not None:
+                    if self.num_shards > 1:
+                        self._vectorstore = self._load_documents(self._pending_path)
+                    else:
+                        self._vectorstore = FAISS.load_local(
+                            self._pending_path,
+                            self.embeddings,
+                            allow_dangerous_deserialization=True
+                        )
+                    self._pending_path = None
+        return self._vectorstore
+
+    def _load_documents(self, path):
+        # The shard workers hold the vectors, so only the docstore half of
+        # langchain's save_local layout (index.faiss + index.pkl) is loaded
+        # here; index_vectors() reads index.faiss once to build the shards.
+        from langchain_community.vectorstores import FAISS
+
+        with open(os.path.join(path, 'index.pkl'), 'rb') as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        self._vectors_path = os.path.join(path, 'index.faiss')
+        return FAISS(self.embeddings, None, docstore, index_to_docstore_id)
+
+    @vectorstore.setter
+    def vectorstore(self, value):
+        self._vectorstore = value
+        self._pending_path = None
+        self._vectors_path = None
+        self.close()
+
+    @property
+    def models_loaded(self):
+        return self._embeddings is not None
+
+    def with_shared_models(self):
+        """Empty store with the same settings that reuses this embedding model"""
+        return VectorStore(
+            model_name=self.model_name,
+            num_shards=self.num_shards,
+            shard_transport=self.shard_transport,
+            embeddings=self.embeddings,
+            search_mode=self.search_mode,
+            binary_candidates=self.binary_candidates,
+            embeddings_loader=self._embeddings_loader
+        )
+
+    def create_embeddings(self, chunks, dims=None, projection_method='pca'):
+        import numpy as np
+        from langchain_community.vectorstores import FAISS
+
         self.chunks = chunks
-        documents = []
-        for i, chunk in enumerate(chunks):
-            doc = Document(
-                page_content=chunk['content'],
-                metadata={
-                    'page': chunk['page'],
-                    'type': chunk['type'],
-                    'source': chunk['source'],
-                    'chunk_id': i
-                }
-            )
-            documents.append(doc)
+        self.token_ids = {}
+        self.sentences = None
+        texts = [chunk['content'] for chunk in chunks]
+        metadatas = _metadatas(chunks)
+        
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype='float32')
+        self.projection = None
+        if dims is not None and dims < vectors.shape[1]:
+            from projection import Projection
+
+            print(f"Fitting {projection_method} projection {vectors.shape[1]} -> {dims} dims...")
+            self.projection = Projection.fit(vectors, dims, method=projection_method)
+            vectors = self.projection.transform(vectors)
         
         print("Building FAISS index...")
-        self.vectorstore = FAISS.from_documents(
-            documents=documents,
-            embedding=self.embeddings
+        self.vectorstore = FAISS.from_embeddings(
+            text_embeddings=list(zip(texts, vectors.tolist())),
+            embedding=self.embeddings,
+            metadatas=metadatas
         )
         
-        print(f"FAISS index with {len(documents)} vectors")
+        print(f"FAISS index with {len(texts)} vectors ({vectors.shape[1]} dims)")
+
+    def add_chunks(self, chunks, vectors=None):
+        """
+        Append `chunks` to the index (creating it if empty)
+        `vectors` from embed_documents() may be passed to skip embedding.
+        chunk_ids continue after the existing chunks, and token IDs are
+        extended for every tokenizer the store already has.
+        """
+        from langchain_community.vectorstores import FAISS
+
+        if not chunks:
+            return
+        texts = [chunk['content'] for chunk in chunks]
+        metadatas = _metadatas(chunks, start=len(self.chunks))
+        if vectors is None:
+            vectors = self.embed_documents(texts)
+        text_embeddings = list(zip(texts, vectors.tolist()))
+
+        if self.vectorstore is None:
+            self.vectorstore = FAISS.from_embeddings(
+                text_embeddings=text_embeddings,
+                embedding=self.embeddings,
+                metadatas=metadatas
+            )
+        else:
+            if self.vectorstore.index is None:
+                raise ValueError("Cannot add chunks to a sharded store loaded from disk")
+            self.vectorstore.add_embeddings(text_embeddings, metadatas=metadatas)
+            # sharded / binary copies of the vectors are now stale
+            self.close()
+        self.chunks = self.chunks + list(chunks)
+
+        for name in self.token_ids:
+            self.token_ids[name] = self.token_ids[name] + self._tokenize(name, texts)
+        if self.sentences is not None:
+            added = self._split_and_embed(texts)
+            self.sentences = {
+                'sentences': self.sentences['sentences'] + added['sentences'],
+                'vectors': self.sentences['vectors'] + added['vectors'],
+                'token_ids': {
+                    name: self.sentences['token_ids'].get(name, []) + ids
+                    for name, ids in added['token_ids'].items()
+                },
+            }
+
+    def drop_chunks(self, predicate):
+        """
+        Remove every chunk for which predicate(chunk) is true
+        The index is rebuilt from its stored vectors (nothing is re-embedded)
+        and the remaining chunks get consecutive chunk_ids again. Returns the
+        number of chunks removed.
+        """
+        from langchain_community.vectorstores import FAISS
+
+        keep = [i for i, chunk in enumerate(self.chunks) if not predicate(chunk)]
+        removed = len(self.chunks) - len(keep)
+        if not removed:
+            return 0
+
+        vectors = self.index_vectors()
+        rows = {}
+        for row in range(len(vectors)):
+            rows[self.document_at(row).metadata['chunk_id']] = row
+        chunks = [self.chunks[i] for i in keep]
+        texts = [chunk['content'] for chunk in chunks]
+        if chunks:
+            self.vectorstore = FAISS.from_embeddings(
+                text_embeddings=list(zip(texts, vectors[[rows[i] for i in keep]].tolist())),
+                embedding=self.embeddings,
+                metadatas=_metadatas(chunks)
+            )
+        else:
+            self.vectorstore = None
+        self.chunks = chunks
+        self.token_ids = {
+            name: [ids[i] for i in keep] for name, ids in self.token_ids.items()
+        }
+        if self.sentences is not None:
+            self.sentences = {
+                'sentences': [self.sentences['sentences'][i] for i in keep],
+                'vectors': [self.sentences['vectors'][i] for i in keep],
+                'token_ids': {
+                    name: [ids[i] for i in keep]
+                    for name, ids in self.sentences['token_ids'].items()
+                },
+            }
+        return removed
         
+    def embed_documents(self, texts):
+        import numpy as np
+
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype='float32')
+        if self.projection is not None:
+            vectors = self.projection.transform(vectors)
+        return vectors
+
+    def embed_query(self, query):
+        import numpy as np
+
+        vector = np.asarray(self.embeddings.embed_query(query), dtype='float32')
+        if self.projection is not None:
+            vector = self.projection.transform(vector)
+        return vector
+
+    def index_vectors(self):
+        index = self.vectorstore.index
+        if index is None:
+            import faiss
+
+            index = faiss.read_index(self._vectors_path)
+        return index.reconstruct_n(0, index.ntotal)
+
+    def document_at(self, row):
+        doc_id = self.vectorstore.index_to_docstore_id[row]
+        return self.vectorstore.docstore.search(doc_id)
+
+    def _sharded_index(self):
+        with self._load_lock:
+            if self._sharded is None:
+                from sharded_index import ShardedIndex
+
+                self._sharded = ShardedIndex(
+                    self.index_vectors(),
+                    num_shards=self.num_shards,
+                    transport=self.shard_transport
+                )
+            return self._sharded
+
+    def _binary_index(self):
+        with self._load_lock:
+            if self._binary is None:
+                from binary_index import BinaryIndex
+
+                self._binary = BinaryIndex(self.index_vectors())
+            return self._binary
+
     def search(self, query, k=5):
         if self.vectorstore is None:
             print("Vectorstore not created")
             return []
-        results = self.vectorstore.similarity_search_with_score(query, k=k)
+        if self.num_shards > 1:
+            hits = self._sharded_index().search(self.embed_query(query), k)[0]
+            results = [(self.document_at(row), score) for score, row in hits]
+        elif self.search_mode == 'binary':
+            hits = self._binary_index().search(
+                self.embed_query(query), k, candidates=self.binary_candidates
+            )
+            results = [(self.document_at(row), score) for score, row in hits]
+        else:
+            results = self.vectorstore.similarity_search_with_score_by_vector(
+                self.embed_query(query).tolist(), k=k
+            )
         
         formatted_results = []
         for i, (doc, score) in enumerate(results):
+            chunk_id = doc.metadata.get('chunk_id')
+            chunk = {
+                'content': doc.page_content,
+                'page': doc.metadata['page'],
+                'type': doc.metadata['type'],
+                'source': doc.metadata['source'],
+                'chunk_id': chunk_id
+            }
+            if 'document' in doc.metadata:
+                chunk['document'] = doc.metadata['document']
+            if self.token_ids and chunk_id is not None:
+                chunk['token_ids'] = {
+                    name: ids[chunk_id] for name, ids in self.token_ids.items()
+                }
             formatted_results.append({
-                'chunk': {
-                    'content': doc.page_content,
-                    'page': doc.metadata['page'],
-                    'type': doc.metadata['type'],
-                    'source': doc.metadata['source']
-                },
+                'chunk': chunk,
                 'score': float(score),
                 'rank': i + 1
             })
         
         return formatted_results
+
+    def tokenize_chunks(self, tokenizer_name):
+        """Store `tokenizer_name` token IDs for every chunk (done at ingest)"""
+        texts = [chunk['content'] for chunk in self.chunks]
+        self.token_ids[tokenizer_name] = self._tokenize(tokenizer_name, texts)
+        print(f"Tokenized {len(texts)} chunks for {tokenizer_name}")
+
+    def index_sentences(self):
+        """
+        Split every chunk into sentences, embed them and tokenize them for
+        every tokenizer in token_ids (done at ingest, after tokenize_chunks)
+        """
+        self.sentences = self._split_and_embed([chunk['content'] for chunk in self.chunks])
+        total = sum(len(sentences) for sentences in self.sentences['sentences'])
+        print(f"Embedded {total} sentences of {len(self.chunks)} chunks")
+
+    def _split_and_embed(self, texts):
+        import numpy as np
+        from extractive import split_sentences
+
+        split = [split_sentences(text) for text in texts]
+        flat = [sentence for sentences in split for sentence in sentences]
+        vectors = np.asarray(self.embeddings.embed_documents(flat) if flat else [], dtype='float32')
+        token_ids = {name: self._tokenize(name, flat) for name in self.token_ids}
+
+        per_chunk = []
+        per_chunk_ids = {name: [] for name in token_ids}
+        start = 0
+        for sentences in split:
+            end = start + len(sentences)
+            per_chunk.append(vectors[start:end])
+            for name, ids in token_ids.items():
+                per_chunk_ids[name].append(ids[start:end])
+            start = end
+        return {'sentences': split, 'vectors': per_chunk, 'token_ids': per_chunk_ids}
+
+    def sentence_entry(self, chunk):
+        """
+        Ingest-time (sentences, vectors, {tokenizer: [ids per sentence]}) of
+        a chunk returned by search(), or None
+        """
+        chunk_id = chunk.get('chunk_id')
+        if self.sentences is None or chunk_id is None or chunk_id >= len(self.chunks):
+            return None
+        # a chunk from another index version can have the same id
+        if self.chunks[chunk_id]['content'] != chunk['content']:
+            return None
+        return (
+            self.sentences['sentences'][chunk_id],
+            self.sentences['vectors'][chunk_id],
+            {name: ids[chunk_id] for name, ids in self.sentences['token_ids'].items()},
+        )
+
+    def _tokenize(self, tokenizer_name, texts):
+        from transformers import AutoTokenizer
+
+        tokenizer = self._tokenizers.get(tokenizer_name)
+        if tokenizer is None:
+            tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+            self._tokenizers[tokenizer_name] = tokenizer
+        if not texts:
+            return []
+        encoded = tokenizer(texts, add_special_tokens=False)['input_ids']
+        return [list(ids) for ids in encoded]
+
+    def close(self):
+        self._binary = None
+        if self._sharded is not None:
+            self._sharded.close()
+            self._sharded = None
     
-    def save(self, filepath='vector_store'):
+    def save(self, filepath='vector_store', keep=3):
+        # Publishes an immutable snapshot and flips the CURRENT pointer, so
+        # readers loading `filepath` concurrently never see a partial index.
         if self.vectorstore is None:
             print("No vectorstore to save")
             return
-        self.vectorstore.save_local(filepath)
+        self.version = index_versions.publish(filepath, self._save_snapshot, keep=keep)
+        print(f"Saved vector store version {self.version}")
+
+    def _save_snapshot(self, prefix):
+        self.vectorstore.save_local(prefix)
     
-        with open(f"{filepath}_chunks.pkl", 'wb') as f:
+        with open(f"{prefix}_chunks.pkl", 'wb') as f:
             pickle.dump(self.chunks, f)
+        if self.projection is not None:
+            self.projection.save(f"{prefix}_projection.npz")
+        if self.token_ids:
+            with open(f"{prefix}_tokens.pkl", 'wb') as f:
+                pickle.dump(self.token_ids, f)
+        if self.sentences is not None:
+            with open(f"{prefix}_sentences.pkl", 'wb') as f:
+                pickle.dump(self.sentences, f)
     
     def load(self, filepath='vector_store'):
-        self.vectorstore = FAISS.load_local(
-            filepath,
-            self.embeddings,
-            allow_dangerous_deserialization=True
-        )
-        with open(f"{filepath}_chunks.pkl", 'rb') as f:
+        # Only the chunk list is read eagerly; the FAISS index and the
+        # embedding model are loaded on first access to `vectorstore`.
+        prefix, version = index_versions.resolve(filepath)
+        with open(f"{prefix}_chunks.pkl", 'rb') as f:
             self.chunks = pickle.load(f)
+        self.vectorstore = None
+        self._pending_path = prefix
+        self.version = version
+        self.projection = None
+        if os.path.exists(f"{prefix}_projection.npz"):
+            from projection import Projection
+
+            self.projection = Projection.load(f"{prefix}_projection.npz")
+        self.token_ids = {}
+        if os.path.exists(f"{prefix}_tokens.pkl"):
+            with open(f"{prefix}_tokens.pkl", 'rb') as f:
+                self.token_ids = pickle.load(f)
+        self.sentences = None
+        if os.path.exists(f"{prefix}_sentences.pkl"):
+            with open(f"{prefix}_sentences.pkl", 'rb') as f:
+                self.sentences = pickle.load(f)
         
         print(f"Loaded vector store chunks")
 
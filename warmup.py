@@ -0,0 +1,114 @@
+"""
+Background loading and warm-up of the RAG components
+Loads the index and models on a background thread and runs a few
+representative queries through each stage, so the first real question
+does not pay for lazy loading, kernel JIT or first-call allocations.
+Progress is tracked per component so a UI can render immediately and show
+what is ready:
+
+    index       vector store (chunks and FAISS index) loaded
+    encoder     MiniLM loaded and warmed with the warm-up queries
+    search      FAISS searches run for the warm-up queries
+    generator   flan-t5 loaded and one answer generated
+"""
+
+import threading
+import time
+
+COMPONENTS = ('index', 'encoder', 'search', 'generator')
+
+class Warmup:
+    def __init__(self, index_factory, llm_factory=None, queries=()):
+        # factories return the shared IndexReloader / LLMQA (model_registry),
+        # so acquiring them is part of the background work
+        self.index_factory = index_factory
+        self.llm_factory = llm_factory
+        self.queries = list(queries)
+        self.reloader = None
+        self.llm = None
+        self._search_results = []
+
+        self._lock = threading.Lock()
+        self._status = {name: {'state': 'pending', 'seconds': None, 'error': None} for name in COMPONENTS}
+        if llm_factory is None:
+            self._status['generator']['state'] = 'skipped'
+        self._finished = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='warm-up', daemon=True)
+                self._thread.start()
+        return self
+
+    def _set(self, name, **fields):
+        with self._lock:
+            self._status[name].update(fields)
+
+    def _step(self, name, fn):
+        self._set(name, state='loading')
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+            self._set(name, state='failed', error=str(e), seconds=time.perf_counter() - start)
+            return False
+        self._set(name, state='ready', seconds=time.perf_counter() - start)
+        return True
+
+    def _run(self):
+        try:
+            if not self._step('index', self._load_index):
+                for name in COMPONENTS[1:]:
+                    self._set(name, state='failed', error="index did not load")
+                return
+            if self._step('encoder', self._warm_encoder):
+                self._step('search', self._warm_search)
+            else:
+                self._set('search', state='failed', error="encoder did not load")
+            if self.llm_factory is not None:
+                self._step('generator', self._warm_generator)
+        finally:
+            self._finished.set()
+
+    def _load_index(self):
+        self.reloader = self.index_factory()
+        self.reloader.current.vectorstore
+
+    def _warm_encoder(self):
+        store = self.reloader.current
+        store.embeddings
+        for query in self.queries:
+            store.embed_query(query)
+
+    def _warm_search(self):
+        store = self.reloader.current
+        self._search_results = [store.search(query, k=5) for query in self.queries]
+
+    def _warm_generator(self):
+        self.llm = self.llm_factory()
+        self.llm.load()
+        if self.queries and self._search_results:
+            chunks = [result['chunk'] for result in self._search_results[0]]
+            self.llm.generate_answer(self.queries[0], chunks)
+
+    def ready(self, name):
+        with self._lock:
+            return self._status[name]['state'] == 'ready'
+
+    def failed(self, name):
+        with self._lock:
+            return self._status[name]['state'] == 'failed'
+
+    @property
+    def done(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def status(self):
+        with self._lock:
+            return {name: dict(info) for name, info in self._status.items()}
@@ -0,0 +1,348 @@
+"""
+Watch-folder ingestion daemon
+Polls config.RAW_DATA_DIR for new, changed and removed PDFs and folds them
+into the live vector store without rebuilding it:
+
+  * a PDF is picked up once its size and mtime have not changed for
+    `debounce` seconds, so files still being copied are left alone, and
+    its chunks are dropped only once it has been gone for `debounce`
+    seconds, so a file replaced by delete-then-copy (or renamed away and
+    back) is not removed from the index in between
+  * at most `workers` PDFs are ingested at once; further files wait for a
+    later poll. Extraction (with OCR) runs in a process pool, since PyMuPDF
+    must not be used from several threads, and embedding on a thread pool
+  * each finished PDF is applied under one lock: chunks of its previous
+    version are dropped (using the stored vectors, nothing is re-embedded),
+    the new chunks are appended and a new index version is published.
+    Running servers swap it in through their IndexReloader.
+
+Chunks get a 'document' field (the PDF's file name) and a source prefixed
+with it. Ingested files are recorded by content hash in a state file, so an
+unchanged file is not ingested again, also across restarts. On first start,
+PDFs whose chunks are already in the index (config.PDF_PATH after
+run_pipeline.py) are adopted as they are.
+
+Usage: python watch_ingest.py [--workers N] [--debounce S] [--once]
+"""
+
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import index_versions
+from ingest_checkpoint import file_fingerprint
+
+def _extract_pdf(name, path, images_dir):
+    """Chunks of one PDF; runs in a worker process"""
+    from document_processor import DocumentProcessor
+
+    images = os.path.join(images_dir, os.path.splitext(name)[0])
+    processor = DocumentProcessor(path)
+    try:
+        chunks = list(processor.iter_chunks(images))
+    finally:
+        processor.close()
+    for chunk in chunks:
+        chunk['document'] = name
+        chunk['source'] = f"{name}: {chunk['source']}"
+    return chunks
+
+class WatchIngest:
+    def __init__(self, folder, store_path, state_path, store_factory, images_dir,
+                 workers=2, debounce=5.0, poll_interval=2.0, keep=3,
+                 legacy_document=None, tokenizer_name=None):
+        self.folder = folder
+        self.store_path = store_path
+        self.state_path = state_path
+        # store_factory() returns an empty VectorStore for the index settings
+        self.store_factory = store_factory
+        self.images_dir = images_dir
+        self.workers = workers
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.keep = keep
+        # chunks built before documents were tracked have no 'document'
+        # field and belong to this file
+        self.legacy_document = legacy_document
+        self.tokenizer_name = tokenizer_name
+
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='watch-ingest')
+        # started on first extraction; spawned, as this process has threads
+        self._extractors = None
+        self._in_flight = {}
+        self._seen = {}
+        # name -> when an ingested PDF was first found missing
+        self._missing = {}
+        self._failed = {}
+        self._store = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.state = self._load_state()
+        self.ingested = 0
+        self.removed = 0
+        self.failures = 0
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_state(self):
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.watch-state.')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def _document_of(self, chunk):
+        return chunk.get('document', self.legacy_document)
+
+    def _live_store(self):
+        # caller holds self._lock; reloads if someone else published
+        version = index_versions.current_version(self.store_path)
+        if self._store is None or (version is not None and version != self._store.version):
+            if self._store is None:
+                store = self.store_factory()
+            else:
+                store = self._store.with_shared_models()
+            if index_versions.index_exists(self.store_path):
+                store.load(self.store_path)
+            self._store = store
+        return self._store
+
+    def _pdfs(self):
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return {}
+        return {
+            name: os.path.join(self.folder, name)
+            for name in names if name.lower().endswith('.pdf') and not name.startswith('.')
+        }
+
+    def adopt_existing(self):
+        """Record PDFs already in the index so they are not ingested twice"""
+        with self._lock:
+            documents = {self._document_of(chunk) for chunk in self._live_store().chunks}
+            for name, path in self._pdfs().items():
+                if name in documents and name not in self.state:
+                    stat = os.stat(path)
+                    self.state[name] = {
+                        'sha256': file_fingerprint(path),
+                        'signature': [stat.st_size, stat.st_mtime_ns],
+                        'adopted': time.time(),
+                    }
+                    print(f"[watch] {name} is already indexed")
+            self._save_state()
+
+    def poll(self, settled=False):
+        """
+        Scan the folder once, start ingesting settled new or changed PDFs and
+        drop PDFs gone for `debounce` seconds
+        settled=True skips the debounce wait. Returns the number started.
+        """
+        self._reap()
+        now = time.time()
+        pdfs = self._pdfs()
+        # ingest threads update the state under the lock
+        with self._lock:
+            signatures = {name: entry.get('signature') for name, entry in self.state.items()}
+        started = 0
+        for name, path in sorted(pdfs.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature = [stat.st_size, stat.st_mtime_ns]
+            seen = self._seen.get(name)
+            if seen is None or seen[0] != signature:
+                self._seen[name] = (signature, now)
+                if not settled:
+                    continue
+            elif now - seen[1] < self.debounce and not settled:
+                continue
+            if name in self._in_flight or signatures.get(name) == signature:
+                continue
+            if self._failed.get(name) == signature:
+                continue
+            if len(self._in_flight) >= self.workers:
+                break
+            self._in_flight[name] = (signature, self._pool.submit(self._ingest, name, path, signature))
+            started += 1
+
+        for name in list(self._seen):
+            if name not in pdfs:
+                del self._seen[name]
+        for name in list(self._missing):
+            if name in pdfs:
+                del self._missing[name]
+        for name in sorted(set(signatures) - set(pdfs) - set(self._in_flight)):
+            missing_since = self._missing.setdefault(name, now)
+            if now - missing_since >= self.debounce or settled:
+                del self._missing[name]
+                self._remove(name)
+        return started
+
+    def _reap(self):
+        for name, (signature, future) in list(self._in_flight.items()):
+            if not future.done():
+                continue
+            del self._in_flight[name]
+            error = future.exception()
+            if error is not None:
+                # not retried until the file changes again
+                self.failures += 1
+                self._failed[name] = signature
+                print(f"[watch] ingesting {name} failed: {error}")
+
+    def _extract(self, name, path):
+        with self._lock:
+            if self._extractors is None:
+                self._extractors = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            extractors = self._extractors
+        return extractors.submit(_extract_pdf, name, path, self.images_dir).result()
+
+    def _ingest(self, name, path, signature):
+        start = time.perf_counter()
+        digest = file_fingerprint(path)
+        with self._lock:
+            if self.state.get(name, {}).get('sha256') == digest:
+                self.state[name]['signature'] = signature
+                self._save_state()
+                return
+
+        chunks = self._extract(name, path)
+        with self._lock:
+            store = self._live_store()
+        projection = store.projection
+        vectors = store.embed_documents([chunk['content'] for chunk in chunks]) if chunks else None
+
+        with self._lock:
+            store = self._live_store()
+            if store.projection is not projection:
+                # a rebuilt index was published meanwhile; embed to match it
+                vectors = None
+            dropped = store.drop_chunks(lambda chunk: self._document_of(chunk) == name)
+            store.add_chunks(chunks, vectors)
+            if self.tokenizer_name and store.chunks and self.tokenizer_name not in store.token_ids:
+                store.tokenize_chunks(self.tokenizer_name)
+            if store.chunks and store.sentences is None:
+                store.index_sentences()
+            if chunks or dropped:
+                store.save(self.store_path, keep=self.keep)
+            self.state[name] = {
+                'sha256': digest,
+                'signature': signature,
+                'chunks': len(chunks),
+                'ingested': time.time(),
+            }
+            self._save_state()
+            self.ingested += 1
+        print(f"[watch] {name}: {len(chunks)} chunks added, {dropped} replaced, "
+              f"version {store.version} ({time.perf_counter() - start:.1f}s)")
+
+    def _remove(self, name):
+        with self._lock:
+            store = self._live_store()
+            dropped = store.drop_chunks(lambda chunk: self._document_of(chunk) == name)
+            if dropped:
+                store.save(self.store_path, keep=self.keep)
+            del self.state[name]
+            self._save_state()
+            self.removed += 1
+        print(f"[watch] {name} was removed: {dropped} chunks dropped")
+
+    def run(self):
+        self.adopt_existing()
+        print(f"[watch] watching {self.folder} ({self.workers} workers, {self.debounce:g}s debounce)")
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[watch] poll failed: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def run_once(self):
+        """Ingest everything pending now, without debouncing, and return"""
+        self.adopt_existing()
+        while self.poll(settled=True) or self._in_flight:
+            wait([future for _, future in self._in_flight.values()])
+            self._reap()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        """Stop polling and wait for ingestions already running"""
+        self.stop()
+        self._pool.shutdown(wait=True)
+        if self._extractors is not None:
+            self._extractors.shutdown(wait=True)
+            self._extractors = None
+        self._reap()
+
+    def stats(self):
+        with self._lock:
+            tracked = len(self.state)
+        return {
+            'tracked': tracked,
+            'in_flight': sorted(self._in_flight),
+            'ingested': self.ingested,
+            'removed': self.removed,
+            'failures': self.failures,
+            'index_version': self._store.version if self._store else None,
+        }
+
+def main():
+    import argparse
+    import signal
+    import config
+    from vector_store import VectorStore
+
+    parser = argparse.ArgumentParser(description="Ingest PDFs dropped into the raw data folder")
+    parser.add_argument('--folder', default=config.RAW_DATA_DIR)
+    parser.add_argument('--workers', type=int, default=config.WATCH_WORKERS)
+    parser.add_argument('--debounce', type=float, default=config.WATCH_DEBOUNCE)
+    parser.add_argument('--once', action='store_true', help="ingest pending PDFs and exit")
+    args = parser.parse_args()
+
+    config.create_directories()
+    watcher = WatchIngest(
+        args.folder,
+        config.VECTOR_STORE_PATH,
+        config.WATCH_STATE_PATH,
+        lambda: VectorStore(model_name=config.EMBEDDING_MODEL),
+        config.IMAGES_DIR,
+        workers=args.workers,
+        debounce=args.debounce,
+        poll_interval=config.WATCH_POLL_INTERVAL,
+        keep=config.INDEX_VERSIONS_TO_KEEP,
+        legacy_document=os.path.basename(config.PDF_PATH),
+        tokenizer_name=config.LLM_MODEL
+    )
+    if args.once:
+        watcher.run_once()
+        watcher.close()
+        print(watcher.stats())
+        return
+
+    signal.signal(signal.SIGTERM, lambda *_: watcher.stop())
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("\n[watch] stopping")
+        watcher.close()
+
+if __name__ == "__main__":
+    main()